@@ -1,4 +1,15 @@
-from typing import Callable
+from collections import deque
+from enum import StrEnum
+from html import escape
+from timeit import timeit
+from typing import Callable, Iterable, TextIO
+import io
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import time
 
 
 
@@ -44,4 +55,346 @@ addWithLogging = addLoggingToFunction(add)
 subtractWithLogging = addLoggingToFunction(subtract)
 
 subtractWithLogging(5, 3)
-addWithLogging(5, 5)
\ No newline at end of file
+addWithLogging(5, 5)
+
+
+#==============================
+# Precompiled fragment renderer
+#==============================
+
+# The tag wrapper above glues "<", the tag, ">", the text, and the closing tag together on every call, and nesting
+# wrappers (h1 inside div inside body...) repeats that work once per level. Since the tags never change after the
+# closure is made, all of that can be done once up front: the nested tags are "compiled" into a single format string
+# like '<div class="box"><p>{}</p></div>', and the closure only has to fill in the text.
+
+# a tag is either just its name, or its name and a dictionary of attributes, e.g. ("a", {"href": "/home"})
+Tag = str | tuple[str, dict[str, str]]
+
+
+def compileTagTemplate(*tags: Tag) -> str:
+    """
+    Builds a single format template from tags given from outermost to innermost. Attribute values are escaped, and
+    any curly braces in them are doubled so that they survive str.format().
+    """
+    
+    opening = []
+    closing = []
+    
+    for tag in tags:
+        name, attributes = (tag, {}) if isinstance(tag, str) else tag
+        attributeText = "".join(f' {key}="{escape(str(value))}"' for key, value in attributes.items())
+        opening.append(f"<{name}{attributeText}>")
+        closing.append(f"</{name}>")
+    
+    closing.reverse()  # the innermost tag closes first
+    
+    return "".join(opening).replace("{", "{{").replace("}", "}}") + "{}" + "".join(closing)
+
+
+def makeFragmentRenderer(*tags: Tag, escapeText: bool = True) -> Callable[[str], str]:
+    
+    # looking up the format() method once and keeping it in the closure saves an attribute lookup per call
+    fillTemplate = compileTagTemplate(*tags).format
+    
+    if not escapeText:
+        return fillTemplate
+    
+    def renderFragment(text: str) -> str:
+        return fillTemplate(escape(text))
+    
+    return renderFragment
+
+
+# Rendering lots of fragments one at a time and adding them together (result += fragment) copies the growing string
+# over and over. Instead, the fragments are collected in a buffer -- a list or an io.StringIO -- and joined once.
+
+def renderBatch(render: Callable[[str], str], texts: Iterable[str]) -> str:
+    return "".join(map(render, texts))
+
+def renderInto(buffer: list[str] | TextIO, render: Callable[[str], str], texts: Iterable[str]) -> None:
+    """ Appends the rendered texts to a shared buffer, leaving the single final join (or getvalue()) to the caller. """
+    
+    if isinstance(buffer, list):
+        buffer.extend(map(render, texts))
+    else:
+        buffer.writelines(map(render, texts))
+
+
+renderLink = makeFragmentRenderer("li", ("a", {"href": "/home", "class": "nav"}))
+print(renderLink("home & away"))  # <li><a href="/home" class="nav">home &amp; away</a></li>
+
+sharedBuffer = io.StringIO()
+renderInto(sharedBuffer, makeFragmentRenderer("li"), ["one", "two"])
+renderInto(sharedBuffer, renderLink, ["three"])
+print(sharedBuffer.getvalue())
+print(renderBatch(makeFragmentRenderer("div", "p"), ["<first>", "second"]))
+
+
+def benchmarkFragmentRenderer(count: int = 100_000) -> None:
+    """ Compares rendering two nested tags by concatenation against the precompiled renderer. """
+    
+    texts = [f"fragment {number}" for number in range(count)]
+    
+    def concatenate(tag: str, text: str) -> str:
+        return "<" + tag + ">" + text + "</" + tag + ">"
+    
+    def renderByConcatenation() -> str:
+        result = ""
+        for text in texts:
+            result += concatenate("div", concatenate("p", escape(text)))
+        return result
+    
+    render = makeFragmentRenderer("div", "p")
+    
+    concatenationSeconds = timeit(renderByConcatenation, number=1)
+    precompiledSeconds = timeit(lambda: renderBatch(render, texts), number=1)
+    
+    print(f"concatenation: {count / concatenationSeconds:,.0f} fragments/sec")
+    print(f"precompiled:   {count / precompiledSeconds:,.0f} fragments/sec")
+
+
+
+#=========================
+# Buffered logging closure
+#=========================
+
+# addLoggingToFunction() prints on every single call, so a cheap function like add() ends up spending nearly all of its
+# time waiting on stdout. The version below only drops a record into a bounded buffer and returns right away; a
+# background thread empties the buffer in batches and does the slow formatting and writing all at once.
+#
+# The buffer is a collections.deque guarded by a threading.Condition. Checking for room and adding the record happen
+# together under its lock, so several threads logging at once can't overfill it, and callers waiting for room (the
+# BLOCK policy) sleep on the same condition the writer thread wakes them with.
+
+class BackpressurePolicy(StrEnum):
+    DROP = "drop"  # throw away new records while the buffer is full
+    BLOCK = "block"  # make the caller wait until the writer thread frees up room
+    SAMPLE = "sample"  # once the buffer is half full, only keep every n-th record (and drop when completely full)
+
+
+class MemoryMappedLog:
+    """ A log file written through a memory map, which grows (by remapping) whenever it runs out of room. """
+    
+    def __init__(self, path: str, initialSize: int = 1 << 20):
+        self.file = open(path, "w+b")
+        self.file.truncate(initialSize)
+        self.map = mmap.mmap(self.file.fileno(), initialSize)
+        self.position = 0
+    
+    def write(self, text: str) -> None:
+        data = text.encode()
+        end = self.position + len(data)
+        
+        if end > len(self.map):
+            newSize = max(end, 2 * len(self.map))
+            self.map.close()
+            self.file.truncate(newSize)
+            self.map = mmap.mmap(self.file.fileno(), newSize)
+        
+        self.map[self.position:end] = data
+        self.position = end
+    
+    def flush(self) -> None:
+        self.map.flush()
+    
+    def close(self) -> None:
+        self.map.close()
+        self.file.truncate(self.position)  # trim the unused, zero-filled tail
+        self.file.close()
+
+
+class BufferedLogger:
+    """
+    Collects records in a bounded buffer and writes them to the sink in batches from a background thread.
+    
+    If the sink raises, the writer thread records the error and stops: everything still buffered, and everything
+    logged after that, counts as dropped, and close() raises RuntimeError about it. Records logged after close() are
+    dropped too.
+    
+    :param sink: Anything with write() and flush() -- sys.stdout, an open text file, or a MemoryMappedLog.
+    :param formatRecord: Turns a record into a line of text. Runs on the writer thread, not the caller's.
+    """
+    
+    def __init__(self,
+        sink: TextIO | MemoryMappedLog = sys.stdout,
+        capacity: int = 10_000,
+        batchSize: int = 500,
+        policy: BackpressurePolicy = BackpressurePolicy.DROP,
+        sampleRate: int = 10,
+        flushInterval: float = 0.05,
+        formatRecord: Callable[[object], str] = str
+    ):
+        self.sink = sink
+        self.capacity = capacity
+        self.batchSize = batchSize
+        self.policy = policy
+        self.sampleRate = sampleRate
+        self.flushInterval = flushInterval
+        self.formatRecord = formatRecord
+        
+        self.buffer: deque[object] = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.error: Exception | None = None  # what the sink raised, once the writer thread has given up
+        
+        # accepted, dropped and sampledOut only change under the condition's lock; written and batches only in the
+        # writer thread
+        self.accepted = 0
+        self.dropped = 0
+        self.sampledOut = 0
+        self.written = 0
+        self.batches = 0
+        
+        self._seen = 0
+        self._writer = threading.Thread(target=self._drainForever, name="BufferedLogger", daemon=True)
+        self._writer.start()
+    
+    def log(self, record: object) -> None:
+        with self.condition:
+            if self.closed or self.error is not None:
+                self.dropped += 1  # nothing would ever write it
+                return
+            
+            queued = len(self.buffer)
+            
+            if self.policy is BackpressurePolicy.SAMPLE and queued >= self.capacity // 2:
+                self._seen += 1
+                if self._seen % self.sampleRate:
+                    self.sampledOut += 1
+                    return
+            
+            if queued >= self.capacity:
+                if self.policy is not BackpressurePolicy.BLOCK:
+                    self.dropped += 1
+                    return
+                
+                self.condition.wait_for(lambda: len(self.buffer) < self.capacity or self.closed or self.error is not None)
+                if self.closed or self.error is not None:
+                    self.dropped += 1
+                    return
+            
+            self.buffer.append(record)
+            self.accepted += 1
+    
+    def _takeBatch(self) -> list:
+        """ Only call it while holding ``condition``. """
+        
+        buffer = self.buffer
+        batch = [buffer.popleft() for _ in range(min(self.batchSize, len(buffer)))]
+        if batch:
+            self.condition.notify_all()  # there's room again for callers waiting under the BLOCK policy
+        return batch
+    
+    def _drainForever(self) -> None:
+        batch = []
+        try:
+            while True:
+                with self.condition:
+                    batch = self._takeBatch()
+                    if not batch and self.closed:
+                        break
+                
+                if batch:
+                    formatRecord = self.formatRecord
+                    self.sink.write("".join([formatRecord(record) + "\n" for record in batch]))
+                    self.written += len(batch)
+                    self.batches += 1
+                    batch = []
+                else:
+                    self.sink.flush()
+                    with self.condition:
+                        if not self.buffer and not self.closed:
+                            self.condition.wait(self.flushInterval)
+            
+            self.sink.flush()
+        except Exception as error:
+            with self.condition:
+                self.error = error
+                self.dropped += len(batch) + len(self.buffer)
+                self.buffer.clear()
+                self.condition.notify_all()  # callers waiting for room would otherwise wait forever
+    
+    def close(self) -> None:
+        """ Writes out whatever is still buffered and stops the writer thread. Does not close the sink itself. """
+        
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self._writer.join()
+        
+        if self.error is not None:
+            raise RuntimeError(f"BufferedLogger's sink failed, {self.dropped:,} records were dropped") from self.error
+    
+    def metrics(self) -> dict[str, int]:
+        return {
+            "queued": len(self.buffer),
+            "accepted": self.accepted,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "sampledOut": self.sampledOut
+        }
+
+
+# Same shape as addLoggingToFunction(), but the result is handed back to the caller instead of being printed, and the
+# record is a plain tuple so that building the log message also happens on the writer thread.
+def addBufferedLoggingToFunction(function: Callable[[int, int], int], logger: BufferedLogger) -> Callable[[int, int], int]:
+    
+    name = function.__name__
+    log = logger.log
+    
+    def functionToLog(*args):
+        result = function(*args)
+        log((name, args, result))
+        return result
+    
+    return functionToLog
+
+
+def formatCall(record) -> str:
+    name, args, result = record
+    return f"{name}{args} = {result}"
+
+
+logger = BufferedLogger(formatRecord=formatCall)
+addWithBufferedLogging = addBufferedLoggingToFunction(add, logger)
+subtractWithBufferedLogging = addBufferedLoggingToFunction(subtract, logger)
+
+subtractWithBufferedLogging(5, 3)
+addWithBufferedLogging(5, 5)
+logger.close()
+print(logger.metrics())
+
+
+def benchmarkBufferedLogging(calls: int = 100_000) -> None:
+    """ Compares print() per call against the buffered logger, with both writing to a temporary file. """
+    
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "print.log"), "w") as file:
+            def printEveryCall():
+                for number in range(calls):
+                    print(formatCall(("add", (number, 1), add(number, 1))), file=file, flush=True)
+            printSeconds = timeit(printEveryCall, number=1)
+        
+        for policy in BackpressurePolicy:
+            mappedLog = MemoryMappedLog(os.path.join(directory, f"{policy}.log"))
+            bufferedLogger = BufferedLogger(mappedLog, capacity=calls // 10, policy=policy, formatRecord=formatCall)
+            loggedAdd = addBufferedLoggingToFunction(add, bufferedLogger)
+            
+            def logEveryCall():
+                for number in range(calls):
+                    loggedAdd(number, 1)
+            
+            bufferedSeconds = timeit(logEveryCall, number=1)
+            bufferedLogger.close()
+            mappedLog.close()
+            
+            print(f"buffered ({policy}): {calls / bufferedSeconds:,.0f} calls/sec, {bufferedLogger.metrics()}")
+    
+    print(f"print per call: {calls / printSeconds:,.0f} calls/sec")
+
+
+# the benchmarks take a while at full size, so they're skipped when this file is only imported
+if __name__ == "__main__":
+    benchmarkFragmentRenderer()
+    benchmarkBufferedLogging()
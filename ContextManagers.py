@@ -1,3 +1,21 @@
+from collections import deque
+from contextlib import redirect_stdout
+from contextvars import ContextVar
+from enum import StrEnum
+from timeit import timeit
+from typing import Callable, Generic, TextIO, TypeVar
+import asyncio
+import io
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+
 # Context Managers
 
 # Provide a way to safely interact with external resources, such as files or network connections.
@@ -123,4 +141,696 @@ with Indenter() as indent:
         with indent:
             indent.print("level 3")
     
-    indent.print("and we're back to level 1")
\ No newline at end of file
+    indent.print("and we're back to level 1")
+
+
+#================================
+# Pooled resource context manager
+#================================
+
+# Every `with open(...)` above opens and closes the file again, which is fine once, but expensive in a hot loop that
+# enters the same kind of `with` block thousands of times (the same goes for sockets and database connections). A pool
+# keeps the handles around after the block ends and hands them back out next time. The pool itself is a context manager
+# (closing every handle on exit), and so is each checkout -- for both `with` and `async with`.
+
+Resource = TypeVar("Resource")
+
+
+class ResourcePool(Generic[Resource]):
+    """
+    Keeps between ``minSize`` and ``maxSize`` resources made by ``create``.
+    
+    :param create: Makes a new resource, e.g. ``lambda: sqlite3.connect("database.sqlite")``.
+    :param close: Releases a resource for good. Defaults to calling its close() method.
+    :param isHealthy: Checked on every checkout; unhealthy resources are closed and replaced.
+    :param idleTimeout: Seconds a resource may sit unused before it is evicted (never below ``minSize``).
+    """
+    
+    def __init__(self,
+        create: Callable[[], Resource],
+        close: Callable[[Resource], None] = lambda resource: resource.close(),  # type: ignore
+        isHealthy: Callable[[Resource], bool] = lambda resource: True,
+        minSize: int = 1,
+        maxSize: int = 10,
+        idleTimeout: float = 60.0
+    ):
+        if maxSize < 1 or not 0 <= minSize <= maxSize:
+            raise ValueError(f"need 0 <= minSize <= maxSize and maxSize >= 1, got minSize={minSize}, maxSize={maxSize}")
+        
+        self.create = create
+        self.close = close
+        self.isHealthy = isHealthy
+        self.minSize = minSize
+        self.maxSize = maxSize
+        self.idleTimeout = idleTimeout
+        
+        self.idle: deque[tuple[Resource, float]] = deque()  # (resource, time it was returned)
+        self.size = 0  # idle plus checked out
+        self.condition = threading.Condition()
+        self.closed = False
+        
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.unhealthy = 0
+        self.waits = 0
+        self.waitSeconds = 0.0
+        
+        for _ in range(minSize):
+            self.idle.append((create(), time.monotonic()))
+            self.size += 1
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exceptionType, exceptionInstance, exceptionTraceback):
+        self.closeAll()
+    
+    def checkout(self, timeout: float | None = None) -> "PooledResource[Resource]":
+        """ Used as ``with pool.checkout() as resource:`` (or ``async with``). """
+        return PooledResource(self, timeout)
+    
+    def _evictIdle(self, now: float) -> None:
+        # the oldest returned resources are on the left
+        while self.idle and self.size > self.minSize and now - self.idle[0][1] > self.idleTimeout:
+            resource, _ = self.idle.popleft()
+            self._discard(resource)
+            self.evicted += 1
+    
+    def _discard(self, resource: Resource) -> None:
+        self.size -= 1
+        self.close(resource)
+    
+    def acquire(self, timeout: float | None = None, blocking: bool = True) -> Resource | None:
+        """ Returns a resource, or None if ``blocking`` is False and the pool is exhausted. Raises TimeoutError. """
+        
+        waitStarted = None
+        
+        while True:
+            with self.condition:
+                if self.closed:
+                    raise RuntimeError("ResourcePool is closed")
+                
+                self._evictIdle(time.monotonic())
+                
+                if self.idle:
+                    resource, _ = self.idle.pop()  # the most recently used is the most likely to still be healthy
+                elif self.size < self.maxSize:
+                    self.size += 1
+                    self.misses += 1
+                    self._recordWait(waitStarted)
+                    break
+                elif not blocking:
+                    return None
+                else:
+                    if waitStarted is None:
+                        waitStarted = time.monotonic()
+                        self.waits += 1
+                    
+                    remaining = None if timeout is None else timeout - (time.monotonic() - waitStarted)
+                    if remaining is not None and remaining <= 0:
+                        self._recordWait(waitStarted)
+                        raise TimeoutError(f"no resource became available within {timeout} seconds")
+                    self.condition.wait(remaining)
+                    continue
+            
+            # a health check can be slow too (a round trip to the database, say), so it also happens outside of the
+            # lock. The resource still counts towards the size, so nobody else can take its place in the meantime
+            if self.isHealthy(resource):
+                with self.condition:
+                    self.hits += 1
+                    self._recordWait(waitStarted)
+                return resource
+            
+            with self.condition:
+                self.size -= 1
+                self.unhealthy += 1
+                self.condition.notify()
+            self.close(resource)
+        
+        # creating can be slow (connecting, opening), so it happens outside of the lock
+        try:
+            return self.create()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+    
+    def _recordWait(self, waitStarted: float | None) -> None:
+        if waitStarted is not None:
+            self.waitSeconds += time.monotonic() - waitStarted
+    
+    def release(self, resource: Resource, broken: bool = False) -> None:
+        with self.condition:
+            if broken or self.closed:
+                self._discard(resource)
+            else:
+                self.idle.append((resource, time.monotonic()))
+            self.condition.notify()
+    
+    def closeAll(self) -> None:
+        with self.condition:
+            self.closed = True
+            while self.idle:
+                self._discard(self.idle.pop()[0])
+            self.condition.notify_all()
+    
+    def metrics(self) -> dict[str, float]:
+        checkouts = self.hits + self.misses
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / checkouts if checkouts else 0.0,
+            "evicted": self.evicted,
+            "unhealthy": self.unhealthy,
+            "waits": self.waits,
+            "averageWaitSeconds": self.waitSeconds / self.waits if self.waits else 0.0
+        }
+
+
+class PooledResource(Generic[Resource]):
+    
+    def __init__(self, pool: ResourcePool[Resource], timeout: float | None):
+        self.pool = pool
+        self.timeout = timeout
+    
+    def __enter__(self) -> Resource:
+        self.resource = self.pool.acquire(self.timeout)
+        return self.resource  # type: ignore
+    
+    def __exit__(self, exceptionType, exceptionInstance, exceptionTraceback):
+        # a resource that was in use when something blew up can't be trusted, so it isn't put back
+        self.pool.release(self.resource, broken=exceptionType is not None)
+    
+    async def __aenter__(self) -> Resource:
+        # Everything acquire() might do can block the whole event loop: waiting for a free resource, creating one
+        # (connecting to a database, say) and the health check (a round trip to it), even when a resource is idle. So
+        # all of it is done on a worker thread, which costs a thread hop per checkout.
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.pool.acquire, self.timeout))
+        try:
+            resource = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # the worker thread can't be stopped, so whatever it ends up getting goes straight back to the pool
+            acquiring.add_done_callback(self._releaseAbandoned)
+            raise
+        
+        self.resource = resource
+        return resource  # type: ignore
+    
+    def _releaseAbandoned(self, acquiring: asyncio.Future) -> None:
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self.pool.release(acquiring.result())
+    
+    async def __aexit__(self, exceptionType, exceptionInstance, exceptionTraceback):
+        self.__exit__(exceptionType, exceptionInstance, exceptionTraceback)
+
+
+def readWithoutPool(times: int) -> None:
+    for _ in range(times):
+        with open("context.txt") as file:
+            file.read()
+
+def readWithPool(pool: ResourcePool, times: int) -> None:
+    for _ in range(times):
+        with pool.checkout() as file:
+            file.seek(0)
+            file.read()
+
+
+def benchmarkResourcePool(times: int = 10_000) -> None:
+    with ResourcePool(lambda: open("context.txt"), isHealthy=lambda file: not file.closed, maxSize=2) as filePool:
+        print(f"opening every time: {timeit(lambda: readWithoutPool(times), number=1):.3f} seconds")
+        print(f"pooled file handle: {timeit(lambda: readWithPool(filePool, times), number=1):.3f} seconds")
+        print(filePool.metrics())
+
+
+def isConnectionHealthy(connection: sqlite3.Connection) -> bool:
+    try:
+        connection.execute("SELECT 1")
+        return True
+    except sqlite3.Error:
+        return False
+
+async def queryConcurrently(pool: ResourcePool[sqlite3.Connection]) -> list[int]:
+    
+    async def query(number: int) -> int:
+        async with pool.checkout(timeout=5) as connection:
+            await asyncio.sleep(0.001)  # pretend to wait on the network while holding the connection
+            return connection.execute("SELECT ?", (number,)).fetchone()[0]
+    
+    return await asyncio.gather(*(query(number) for number in range(20)))
+
+
+# sqlite connections are tied to the thread that made them unless told otherwise
+with ResourcePool(lambda: sqlite3.connect(":memory:", check_same_thread=False), isHealthy=isConnectionHealthy, maxSize=4) as connectionPool:
+    print(sum(asyncio.run(queryConcurrently(connectionPool))))
+    print(connectionPool.metrics())
+
+
+
+#============================================
+# Buffered append-only writer context manager
+#============================================
+
+# Writing one line per open/write/close cycle pays for a system call (or three) on every line. This writer opens the
+# file once in append mode, collects encoded lines in memory, and only hands them to the OS when the buffer gets big
+# enough or enough time has passed. The time is kept by a background thread, so lines written just before a quiet
+# spell still reach the file within about flushInterval instead of waiting for the next write. With os.writev() the
+# collected chunks go out in a single system call without first being copied into one big bytes object.
+#
+# Whatever happens inside the block, __exit__ writes out the buffer and (depending on the fsync policy) forces it onto
+# the disk -- so nothing is lost even if an outer context manager like SampleContextManager swallows the exception.
+
+# the OS limits how many chunks one writev() call accepts (-1 means it doesn't say, so stay with a safe 1024)
+IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") and "SC_IOV_MAX" in os.sysconf_names else 1024
+if IOV_MAX <= 0:
+    IOV_MAX = 1024
+
+
+class FsyncPolicy(StrEnum):
+    NEVER = "never"  # leave it to the OS to write the data to disk eventually
+    ON_EXIT = "exit"  # fsync once, when the with block ends
+    ON_FLUSH = "flush"  # fsync after every flush (safest, slowest)
+
+
+class BufferedAppendWriter:
+    
+    def __init__(self,
+        path: str,
+        bufferSize: int = 1 << 20,
+        flushInterval: float = 1.0,
+        useWritev: bool = hasattr(os, "writev"),
+        fsyncPolicy: FsyncPolicy = FsyncPolicy.ON_EXIT
+    ):
+        self.path = path
+        self.bufferSize = bufferSize
+        self.flushInterval = flushInterval
+        self.useWritev = useWritev and hasattr(os, "writev")
+        self.fsyncPolicy = fsyncPolicy
+        
+        self.chunks: list[bytes] = []
+        self.pending = 0
+        self.flushes = 0
+        self.descriptor = -1
+        self.lock = threading.Lock()  # the flushing thread and write() both touch the buffer
+        self.stopping = threading.Event()
+        self.flusher: threading.Thread | None = None
+    
+    def __enter__(self):
+        self.descriptor = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.lastFlush = time.monotonic()
+        self.stopping.clear()
+        self.flusher = threading.Thread(target=self._flushPeriodically, name="BufferedAppendWriter", daemon=True)
+        self.flusher.start()
+        return self
+    
+    def __exit__(self, exceptionType, exceptionInstance, exceptionTraceback):
+        self.stopping.set()
+        self.flusher.join()
+        try:
+            self.flush()
+            if self.fsyncPolicy is not FsyncPolicy.NEVER:
+                os.fsync(self.descriptor)
+        finally:
+            os.close(self.descriptor)
+            self.descriptor = -1
+        
+        return False  # exceptions from the block are still passed along
+    
+    def write(self, text: str) -> None:
+        chunk = text.encode()
+        with self.lock:
+            self.chunks.append(chunk)
+            self.pending += len(chunk)
+            if self.pending >= self.bufferSize:
+                self._flush()
+    
+    def writeLine(self, line: str) -> None:
+        self.write(line + "\n")
+    
+    def _flushPeriodically(self) -> None:
+        # checking twice per interval means nothing waits much longer than flushInterval (1.5 times it at worst)
+        while not self.stopping.wait(self.flushInterval / 2):
+            with self.lock:
+                if self.chunks and time.monotonic() - self.lastFlush >= self.flushInterval:
+                    self._flush()
+    
+    def flush(self) -> None:
+        with self.lock:
+            self._flush()
+    
+    def _flush(self) -> None:
+        """ Only call it while holding ``lock``. """
+        
+        if self.chunks:
+            if self.useWritev:
+                self._writeChunks(self.chunks)
+            else:
+                self._writeAll(b"".join(self.chunks))
+            
+            self.chunks = []
+            self.pending = 0
+            self.flushes += 1
+            
+            if self.fsyncPolicy is FsyncPolicy.ON_FLUSH:
+                os.fsync(self.descriptor)
+        
+        self.lastFlush = time.monotonic()
+    
+    def _writeChunks(self, chunks: list[bytes]) -> None:
+        for start in range(0, len(chunks), IOV_MAX):
+            group = chunks[start:start + IOV_MAX]
+            written = os.writev(self.descriptor, group)
+            
+            # a partial write is rare for regular files, but the leftovers still have to go somewhere
+            if written < sum(map(len, group)):
+                self._writeAll(b"".join(group)[written:])
+    
+    def _writeAll(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.descriptor, view):]
+
+
+with tempfile.TemporaryDirectory() as directory:
+    logPath = os.path.join(directory, "append.log")
+    
+    with SampleContextManager("the writer still flushes when an exception is swallowed"):
+        with BufferedAppendWriter(logPath) as writer:
+            writer.writeLine("first line")
+            writer.writeLine("second line")
+            print(writer.chunks[100])  # IndexError, swallowed by SampleContextManager
+    
+    with open(logPath) as file:
+        print(file.read())
+
+
+def benchmarkAppendWriter(lines: int = 20_000) -> None:
+    """ Compares opening the file for every line against the buffered writer, with and without writev(). """
+    
+    with tempfile.TemporaryDirectory() as directory:
+        def writeNaively():
+            for number in range(lines):
+                with open(os.path.join(directory, "naive.log"), "a") as file:
+                    file.write(f"line {number}\n")
+        
+        def writeBuffered(useWritev: bool):
+            with BufferedAppendWriter(os.path.join(directory, f"buffered-{useWritev}.log"), useWritev=useWritev) as writer:
+                for number in range(lines):
+                    writer.writeLine(f"line {number}")
+        
+        print(f"open per line:      {lines / timeit(writeNaively, number=1):,.0f} lines/sec")
+        print(f"buffered, join:     {lines / timeit(lambda: writeBuffered(False), number=1):,.0f} lines/sec")
+        print(f"buffered, writev(): {lines / timeit(lambda: writeBuffered(True), number=1):,.0f} lines/sec")
+
+
+
+#==========================
+# Streaming indented writer
+#==========================
+
+# Indenter builds a brand new string ("    " * level + text) for every line and sends it through print(). For big
+# nested reports, IndentedWriter does less work per line:
+#   - the indentation for each level is built once and reused
+#   - the prefix and the text are written to the stream one after the other instead of being glued together first
+#   - the stream can be anything with write(): a buffered file, a socket's makefile(), or an io.StringIO
+# The nesting level is kept per thread, so several threads can share one writer without messing up each other's
+# indentation (a lock keeps their lines from being torn apart).
+
+class NestingState(threading.local):
+    """ Each thread sees its own copy of these attributes (__init__ runs again in every thread that uses it). """
+    
+    def __init__(self):
+        self.level = -1  # same starting point as Indenter, so the first `with` is level 0
+        self.prefix = ""
+        self.prefixes = [""]  # the prefix for each level this thread has been to so far
+
+
+class IndentedWriter:
+    
+    def __init__(self, stream: TextIO, indent: str = "    ", shared: bool = True):
+        """
+        :param shared: Whether several threads will print through this writer. If not, the per-line lock is skipped,
+        which is noticeably faster.
+        """
+        
+        self.stream = stream
+        self.write = stream.write
+        self.indent = indent
+        self.state = NestingState()
+        self.lock = threading.Lock() if shared else None
+    
+    @classmethod
+    def forSocket(cls, connection: socket.socket, indent: str = "    ", shared: bool = True, bufferSize: int = 1 << 16) -> "IndentedWriter":
+        return cls(connection.makefile("w", buffering=bufferSize, encoding="utf-8"), indent, shared)
+    
+    @property
+    def level(self) -> int:
+        return self.state.level
+    
+    def _setLevel(self, level: int) -> None:
+        # the prefix is looked up when the level changes, not on every printed line, and each level's prefix is only
+        # built the first time this thread gets that deep. It only touches this thread's state, so there's nothing
+        # shared between threads to lock
+        state = self.state
+        prefixes = state.prefixes
+        while len(prefixes) <= level:
+            prefixes.append(prefixes[-1] + self.indent)
+        state.level = level
+        state.prefix = prefixes[max(level, 0)]
+    
+    def __enter__(self):
+        self._setLevel(self.state.level + 1)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self._setLevel(self.state.level - 1)
+    
+    def print(self, text: str) -> None:
+        write = self.write
+        
+        if self.lock is None:
+            write(self.state.prefix)
+            write(text)
+            write("\n")
+        else:
+            with self.lock:
+                write(self.state.prefix)
+                write(text)
+                write("\n")
+    
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+report = io.StringIO()
+
+def writeSection(writer: IndentedWriter, name: str) -> None:
+    with writer:
+        writer.print(name)
+        with writer:
+            for number in range(3):
+                writer.print(f"{name} item {number}")
+
+reportWriter = IndentedWriter(report)
+threads = [threading.Thread(target=writeSection, args=(reportWriter, f"section {letter}")) for letter in "AB"]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+print(report.getvalue())
+
+
+# a socket works the same way once it is wrapped in a buffered file object
+sender, receiver = socket.socketpair()
+with sender, receiver:
+    socketWriter = IndentedWriter.forSocket(sender)
+    writeSection(socketWriter, "over a socket")
+    socketWriter.stream.close()  # flushes the buffer and lets the receiving end see the end of the data
+    sender.shutdown(socket.SHUT_WR)
+    print(receiver.makefile(encoding="utf-8").read())
+
+
+def benchmarkIndentedWriter(lines: int = 200_000) -> None:
+    """ Compares Indenter.print() against IndentedWriter, both writing to the same kind of buffered file. """
+    
+    def writeNested(indenter) -> None:
+        with indenter:
+            with indenter:
+                with indenter:
+                    for number in range(lines):
+                        indenter.print("a line of the report")
+    
+    with tempfile.TemporaryFile("w", buffering=1 << 20) as file:
+        with redirect_stdout(file):
+            indenterSeconds = timeit(lambda: writeNested(Indenter()), number=1)
+        
+        sharedSeconds = timeit(lambda: writeNested(IndentedWriter(file)), number=1)
+        unsharedSeconds = timeit(lambda: writeNested(IndentedWriter(file, shared=False)), number=1)
+    
+    print(f"Indenter:                  {lines / indenterSeconds:,.0f} lines/sec")
+    print(f"IndentedWriter (shared):   {lines / sharedSeconds:,.0f} lines/sec")
+    print(f"IndentedWriter (1 thread): {lines / unsharedSeconds:,.0f} lines/sec")
+
+
+
+#=====================================
+# Timing spans (nested tracing blocks)
+#=====================================
+
+# Nested `with indent:` blocks and an __exit__() that is told about exceptions are exactly what a tracing span needs:
+# each `with tracer.span("name"):` block records when it started and stopped, remembers which span it is nested in, and
+# notes the exception if one escaped. The finished spans can then be saved for a profiling tool:
+#   - Chrome trace JSON, which chrome://tracing or https://ui.perfetto.dev can open as a timeline
+#   - "collapsed stacks" (one `outer;inner;innermost microseconds` line per stack), the input for flame graph tools
+#
+# The current span is kept in a ContextVar instead of on the tracer, so that threads and asyncio tasks running at the
+# same time each get their own nesting.
+
+currentSpan: ContextVar["Span | None"] = ContextVar("currentSpan", default=None)
+
+
+class Span:
+    
+    def __init__(self, tracer: "Tracer", name: str, tags: dict[str, object]):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+        self.childNanoseconds = 0
+    
+    def __enter__(self):
+        self.parent = currentSpan.get()
+        self.stack = (*self.parent.stack, self.name) if self.parent else (self.name,)
+        self.threadId = threading.get_ident()
+        self.token = currentSpan.set(self)
+        self.start = time.perf_counter_ns()  # monotonic, and the last thing done so setup isn't timed
+        return self
+    
+    def __exit__(self, exceptionType, exceptionInstance, exceptionTraceback):
+        self.end = time.perf_counter_ns()
+        currentSpan.reset(self.token)
+        
+        if exceptionType is not None:
+            self.tags["error"] = exceptionType.__name__
+            self.tags["errorMessage"] = str(exceptionInstance)
+        
+        if self.parent is not None:
+            self.parent.childNanoseconds += self.duration
+        
+        self.tracer.finished.append(self)  # list.append() is atomic, so no lock is needed
+        return False  # only observe exceptions, never swallow them
+    
+    async def __aenter__(self):
+        return self.__enter__()
+    
+    async def __aexit__(self, exceptionType, exceptionInstance, exceptionTraceback):
+        return self.__exit__(exceptionType, exceptionInstance, exceptionTraceback)
+    
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+    
+    @property
+    def selfDuration(self) -> int:
+        """ Time spent in this span but not in its children (children running concurrently can push it below 0). """
+        return max(self.duration - self.childNanoseconds, 0)
+
+
+class Tracer:
+    
+    def __init__(self):
+        self.finished: list[Span] = []
+        self.origin = time.perf_counter_ns()
+    
+    def span(self, name: str, **tags) -> Span:
+        return Span(self, name, tags)
+    
+    def collapsedStacks(self) -> dict[str, int]:
+        """ Self time in microseconds, summed up per unique stack. """
+        
+        # summed in nanoseconds and only then turned into microseconds; rounding each span down first would lose up to a
+        # microsecond per span, which is most of the time of a short span
+        totals: dict[str, int] = {}
+        for span in self.finished:
+            key = ";".join(span.stack)
+            totals[key] = totals.get(key, 0) + span.selfDuration
+        return {stack: nanoseconds // 1000 for stack, nanoseconds in totals.items()}
+    
+    def exportCollapsedStacks(self, path: str) -> None:
+        with open(path, "w") as file:
+            file.writelines(f"{stack} {microseconds}\n" for stack, microseconds in self.collapsedStacks().items())
+    
+    def exportChromeTrace(self, path: str) -> None:
+        processId = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",  # a "complete" event, which has both a start and a duration
+                "ts": (span.start - self.origin) / 1000,  # microseconds
+                "dur": span.duration / 1000,
+                "pid": processId,
+                "tid": span.threadId,
+                "args": {key: str(value) for key, value in span.tags.items()}
+            }
+            for span in self.finished
+        ]
+        
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+tracer = Tracer()
+
+def handleRequest(requestId: int) -> None:
+    with tracer.span("handleRequest", requestId=requestId):
+        with tracer.span("parse"):
+            time.sleep(0.001)
+        
+        with tracer.span("query"):
+            time.sleep(0.003)
+            
+            try:
+                with tracer.span("cache"):
+                    raise KeyError(requestId)
+            except KeyError:
+                pass  # the span still recorded the error
+
+async def handleRequestAsync(requestId: int) -> None:
+    async with tracer.span("handleRequestAsync", requestId=requestId):
+        async with tracer.span("fetch"):
+            await asyncio.sleep(0.002)
+
+async def handleManyAsync() -> None:
+    await asyncio.gather(*(handleRequestAsync(requestId) for requestId in range(3)))
+
+
+def traceExample() -> None:
+    handleRequest(1)
+    asyncio.run(handleManyAsync())
+    
+    with tempfile.TemporaryDirectory() as directory:
+        tracer.exportCollapsedStacks(os.path.join(directory, "stacks.folded"))
+        tracer.exportChromeTrace(os.path.join(directory, "trace.json"))
+        
+        with open(os.path.join(directory, "stacks.folded")) as file:
+            print(file.read())
+    
+    print([span.tags for span in tracer.finished if "error" in span.tags])
+
+
+def benchmarkSpanOverhead(emptySpans: int = 100_000) -> None:
+    overheadTracer = Tracer()
+    overheadSeconds = timeit(lambda: overheadTracer.span("empty").__enter__().__exit__(None, None, None), number=emptySpans)
+    print(f"span overhead: {overheadSeconds / emptySpans * 1e9:,.0f} ns per span")
+
+
+# the benchmarks take a while at full size, so they're skipped when this file is only imported
+if __name__ == "__main__":
+    benchmarkResourcePool()
+    benchmarkAppendWriter()
+    benchmarkIndentedWriter()
+    traceExample()
+    benchmarkSpanOverhead()
@@ -1,3 +1,29 @@
+from array import array
+from collections import ChainMap, Counter, OrderedDict
+from collections.abc import Mapping, MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, chain
+from operator import itemgetter
+from timeit import timeit
+from typing import Hashable, Iterable, Iterator, Sequence
+import hashlib
+import heapq
+import os
+import pickle
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # the counting below falls back to the standard library
+
+
+
 # Dictionary
 # key-value pairs. the keys are unique and immutable (but can be deleted), the values are not.
 
@@ -94,4 +120,518 @@ print("win_count_dict = {}".format(win_count_dict))
 highest_count = max(win_count_dict.values())
 
 most_win_director = [key for key, value in win_count_dict.items() if value == highest_count]
-print(most_win_director)
\ No newline at end of file
+print(most_win_director)
+
+
+#==========================
+# Frequency counting engine
+#==========================
+
+# The loop above is the classic way to count things with a dictionary, and then it goes over the dictionary twice to
+# find the winner. The standard library already has a dictionary made for counting, collections.Counter, and for a
+# really big pile of values NumPy can count them all in compiled code. The rest of this section covers streams too
+# big to count exactly, and counting on several cores at once.
+
+def countRecords(records: Iterable[tuple[object, Iterable[Hashable]]]) -> Counter:
+    """ Counts the values of (key, values) records -- e.g. winners.items() -- without a Python-level loop. """
+    return Counter(chain.from_iterable(values for _, values in records))
+
+
+def countValues(values: Sequence) -> dict:
+    """ For large inputs, np.unique() sorts and counts everything in compiled code. Falls back to Counter without NumPy. """
+    
+    if np is None or len(values) < 10_000:
+        return Counter(values)
+    
+    uniqueValues, counts = np.unique(np.asarray(values), return_counts=True)
+    return dict(zip(uniqueValues.tolist(), counts.tolist()))
+
+
+def topK(counts: dict, k: int) -> list[tuple[object, int]]:
+    """ The k highest counts, in one pass over the counts, using a heap that never grows past k entries. """
+    return heapq.nlargest(k, counts.items(), key=itemgetter(1))
+
+
+def mostCommonWithTies(counts: dict) -> list:
+    """ Every key sharing the highest count, in a single pass (instead of max() followed by a comprehension). """
+    
+    best = 0
+    leaders = []
+    for key, count in counts.items():
+        if count > best:
+            best = count
+            leaders = [key]
+        elif count == best:
+            leaders.append(key)
+    return leaders
+
+
+winCounts = countRecords(winners.items())
+assert winCounts == win_count_dict
+print("top 3 directors:", topK(winCounts, 3))
+print(mostCommonWithTies(winCounts))
+print()
+
+
+# Approximate counting
+#
+# A stream that never ends (clicks, log lines, ...) can have more distinct keys than fit in memory. Two ways out, both
+# using a fixed amount of memory no matter how long the stream runs:
+#   - Count-Min Sketch: a small grid of counters. Each key bumps one counter per row, picked by a different hash per
+#     row, and its estimate is the smallest of those counters. Collisions only ever add, so estimates can be too high,
+#     never too low.
+#   - Space-Saving: keeps exact-ish counts for only k keys. When a new key shows up and all k slots are taken, it
+#     replaces the key with the smallest count, inheriting that count as its possible error. Any key that is more
+#     frequent than 1/k of the stream is guaranteed to be in there.
+# Both can be merged, so separate processes can each count their share of the stream and combine the results.
+
+def stableHash(key: object) -> tuple[int, int]:
+    """
+    Two 64-bit hashes of the key. Python's own hash() of a string changes from process to process, which would make
+    sketches from different processes impossible to merge, so this uses blake2b instead.
+    """
+    
+    digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class CountMinSketch:
+    
+    def __init__(self, width: int = 2048, depth: int = 4):
+        """
+        Estimates are off by at most about (2 / width) * total with probability 1 - (1/2)^depth.
+        """
+        
+        self.width = width
+        self.depth = depth
+        self.rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+    
+    def _columns(self, key: object) -> Iterator[int]:
+        first, second = stableHash(key)
+        # "double hashing": row i uses first + i * second, which works as well as i independent hashes
+        return ((first + row * second) % self.width for row in range(self.depth))
+    
+    def add(self, key: object, count: int = 1) -> None:
+        for row, column in zip(self.rows, self._columns(key)):
+            row[column] += count
+        self.total += count
+    
+    def estimate(self, key: object) -> int:
+        return min(row[column] for row, column in zip(self.rows, self._columns(key)))
+    
+    def merge(self, other: "CountMinSketch") -> None:
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("only sketches with the same width and depth can be merged")
+        
+        for row, otherRow in zip(self.rows, other.rows):
+            for column, count in enumerate(otherRow):
+                if count:
+                    row[column] += count
+        self.total += other.total
+
+
+class SpaceSaving:
+    
+    def __init__(self, k: int = 100):
+        self.k = k
+        self.counts: dict[object, int] = {}
+        self.errors: dict[object, int] = {}  # how much of each count might really belong to keys it replaced
+    
+    def add(self, key: object, count: int = 1) -> None:
+        counts = self.counts
+        
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.k:
+            counts[key] = count
+            self.errors[key] = 0
+        else:
+            # finding the minimum is O(k), which is fine for the small k this is meant for
+            smallest = min(counts, key=counts.__getitem__)
+            smallestCount = counts.pop(smallest)
+            del self.errors[smallest]
+            counts[key] = smallestCount + count
+            self.errors[key] = smallestCount
+    
+    def heavyHitters(self, n: int | None = None) -> list[tuple[object, int, int]]:
+        """ (key, estimated count, maximum overestimate), most frequent first. """
+        ranked = sorted(self.counts.items(), key=itemgetter(1), reverse=True)[:n]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+    
+    def floor(self) -> int:
+        """ The most times a key that isn't being tracked can have been seen. """
+        return min(self.counts.values()) if len(self.counts) >= self.k else 0
+    
+    def merge(self, other: "SpaceSaving") -> None:
+        # A key that one summary isn't tracking may still have been seen by it, up to that summary's floor, so the floor
+        # is added to both the key's count and its error. Only adding up the counts each summary kept would make a key
+        # that one side evicted look rarer than it really is.
+        ownFloor, otherFloor = self.floor(), other.floor()
+        counts = {}
+        errors = {}
+        for key in self.counts.keys() | other.counts.keys():
+            counts[key] = self.counts.get(key, ownFloor) + other.counts.get(key, otherFloor)
+            errors[key] = self.errors.get(key, ownFloor) + other.errors.get(key, otherFloor)
+        
+        kept = heapq.nlargest(self.k, counts, key=counts.__getitem__)
+        self.counts = {key: counts[key] for key in kept}
+        self.errors = {key: errors[key] for key in kept}
+
+
+def countChunk(chunk: Sequence) -> Counter:
+    return Counter(chunk)
+
+def countInParallel(values: Sequence, processes: int | None = None, chunkSize: int = 250_000) -> Counter:
+    """ Each process counts its own slice; the partial counts are then added up (Counter.update adds, not replaces). """
+    
+    chunks = [values[start:start + chunkSize] for start in range(0, len(values), chunkSize)]
+    total: Counter = Counter()
+    
+    with ProcessPoolExecutor(processes) as pool:
+        for partial in pool.map(countChunk, chunks):
+            total.update(partial)
+    return total
+
+
+sketch = CountMinSketch(width=256)
+heavyHitters = SpaceSaving(k=30)  # room for about half of the 63 directors
+for winner in chain.from_iterable(winners.values()):
+    sketch.add(winner)
+    heavyHitters.add(winner)
+print("Count-Min estimate for John Ford:", sketch.estimate("John Ford"), "(really", win_count_dict["John Ford"], end=")\n")
+print("Space-Saving heavy hitters:", heavyHitters.heavyHitters(3))
+print()
+
+
+def benchmarkCounting(size: int = 2_000_000, distinct: int = 10_000) -> None:
+    rng = random.Random(1)
+    values = [rng.randrange(distinct) for _ in range(size)]
+    
+    def countWithGet():
+        counts = {}
+        for value in values:
+            counts[value] = counts.get(value, 0) + 1
+        return counts
+    
+    def countWithSketch():
+        merged = CountMinSketch()
+        for start in range(0, size, size // 4):  # four "processes" worth of sketches, merged at the end
+            partial = CountMinSketch()
+            for value in values[start:start + size // 4]:
+                partial.add(value)
+            merged.merge(partial)
+        return merged
+    
+    approaches = {
+        "dict.get() loop": countWithGet,
+        "Counter": lambda: Counter(values),
+        "NumPy unique" if np is not None else "NumPy unique (not installed, Counter)": lambda: countValues(values),
+        "parallel Counter": lambda: countInParallel(values),
+        "Count-Min Sketch (merged)": countWithSketch
+    }
+    
+    expected = Counter(values)
+    for name, approach in approaches.items():
+        started = time.perf_counter()
+        result = approach()
+        seconds = time.perf_counter() - started
+        
+        exact = result == expected if isinstance(result, dict) else "approximate"
+        print(f"{name:>38}: {size / seconds:>12,.0f} values/sec, exact: {exact}")
+
+
+
+
+#==========================
+# Compact string-keyed maps
+#==========================
+
+# A dict spends well over 100 bytes per entry once the key string object, the value object and the hash table slot are
+# added up. For a map that's built once and then only read, FrozenStringMap packs it much tighter:
+#   - all the keys are encoded to UTF-8 and glued into one bytes object, with an array of where each one starts
+#   - the values go in an array.array when they're all numbers of one type (or a plain list otherwise)
+#   - the hash table is just an array of 4-byte row numbers, twice as long as the number of keys. A lookup hashes the
+#     key, jumps to that slot, and compares the packed key stored there (moving to the next slot if it's a different
+#     key), so lookups stay O(1) like a dict's
+# Python's hash() of a string is different in every run, so the table is rebuilt whenever the map is (it isn't meant
+# to be saved to disk as-is).
+#
+# Merging with {**dict1, **dict2} copies both dictionaries into a new one. collections.ChainMap gives a merged *view*
+# instead: lookups check each map in turn, and nothing is copied.
+
+EMPTY_SLOT = -1
+
+
+class FrozenStringMap(Mapping):
+    
+    def __init__(self, items: Mapping[str, object] | Iterable[tuple[str, object]], valueType: str | None = None):
+        """
+        :param valueType: An array.array type code (like "q" for ints or "d" for floats) to pack the values into.
+        """
+        
+        pairs = dict(items)  # later duplicates win, the same as in a dict
+        encodedKeys = [key.encode() for key in pairs]
+        
+        self.blob = b"".join(encodedKeys)
+        self.offsets = array("Q", accumulate(map(len, encodedKeys), initial=0))
+        self._values = array(valueType, pairs.values()) if valueType else list(pairs.values())
+        
+        self.mask = (1 << max(len(pairs) * 2 - 1, 1).bit_length()) - 1  # a power of two, at least twice the keys
+        self.slots = array("i", [EMPTY_SLOT]) * (self.mask + 1)
+        for row, key in enumerate(pairs):
+            slot = hash(key) & self.mask
+            while self.slots[slot] != EMPTY_SLOT:
+                slot = (slot + 1) & self.mask
+            self.slots[slot] = row
+    
+    def _find(self, key: str) -> int:
+        if not isinstance(key, str):
+            return EMPTY_SLOT
+        
+        try:
+            encoded = key.encode()
+        except UnicodeEncodeError:
+            return EMPTY_SLOT  # lone surrogates like "\ud800" can't be encoded, so no key in the map can be one
+        blob, offsets, slots, mask = self.blob, self.offsets, self.slots, self.mask
+        slot = hash(key) & mask
+        
+        while (row := slots[slot]) != EMPTY_SLOT:
+            start = offsets[row]
+            if offsets[row + 1] - start == len(encoded) and blob.startswith(encoded, start):
+                return row
+            slot = (slot + 1) & mask
+        return EMPTY_SLOT
+    
+    def __getitem__(self, key: str):
+        row = self._find(key)
+        if row == EMPTY_SLOT:
+            raise KeyError(key)
+        return self._values[row]
+    
+    def __contains__(self, key) -> bool:
+        return self._find(key) != EMPTY_SLOT
+    
+    def __len__(self) -> int:
+        return len(self._values)
+    
+    def __iter__(self) -> Iterator[str]:
+        blob, offsets = self.blob, self.offsets
+        return (blob[offsets[row]:offsets[row + 1]].decode() for row in range(len(self._values)))
+    
+    def memoryBytes(self) -> int:
+        return sum(map(sys.getsizeof, (self.blob, self.offsets, self._values, self.slots)))
+
+
+def mergedView(*maps: Mapping) -> ChainMap:
+    """ The same result as {**first, **second, ...} -- later maps win -- without copying anything. """
+    return ChainMap(*reversed(maps))
+
+
+hobbies = FrozenStringMap(zip(keys, values))
+print(dict(hobbies), hobbies.get("kalina"), "jeff" in hobbies, "nobody" in hobbies)
+
+merged = mergedView(dict1, dict2, {2: "TWO"})
+print(merged[2], merged[3], dict(merged))
+dict1[5] = "five"  # it's a view, so changes to the originals show up in it
+print(merged.get(5))
+print()
+
+
+def benchmarkCompactMap(size: int = 1_000_000, lookups: int = 200_000) -> None:
+    """ Memory and lookup time of a dict against FrozenStringMap, for string keys and integer values. """
+    
+    rng = random.Random(2)
+    
+    tracemalloc.start()
+    plain = {f"user:{number:09d}": number for number in range(size)}
+    dictBytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    compact = FrozenStringMap(plain, valueType="q")
+    probes = [f"user:{rng.randrange(size):09d}" for _ in range(lookups)]
+    
+    dictSeconds = timeit(lambda: [plain[key] for key in probes], number=1)
+    compactSeconds = timeit(lambda: [compact[key] for key in probes], number=1)
+    
+    print(f"dict:            {dictBytes / size:6.1f} bytes/key, {dictSeconds / lookups * 1e9:6,.0f} ns/lookup")
+    print(f"FrozenStringMap: {compact.memoryBytes() / size:6.1f} bytes/key, {compactSeconds / lookups * 1e9:6,.0f} ns/lookup")
+
+
+
+
+#======================
+# Persistent dictionary
+#======================
+
+# Everything above lives in memory. PersistentDict has the same get()/pop()/del/in/iteration API as a dictionary
+# (it's a MutableMapping, which fills in get(), pop(), setdefault() and friends from the five basic methods), but the
+# data lives in an SQLite file, so it can hold far more than fits in RAM and survives a restart.
+#   - recently used entries stay in an in-memory LRU (least recently used) cache, so hot keys skip the database. The
+#     cache holds the pickled values and every read unpickles a fresh copy, so like reading from the database, changing
+#     what you got back doesn't change what's stored (assign it back to store the change)
+#   - update() writes everything in one transaction -- committing is the expensive part, so one commit for a million
+#     keys is much faster than a million commits
+#   - values are pickled, so anything picklable can be stored. Keys can't be: equal keys have to be stored as equal
+#     bytes, and pickle doesn't promise that (1, 1.0 and True are equal keys in a dictionary but pickle differently, and
+#     so can two tuples of equal strings, depending on whether the strings are the same object). So keys are limited to
+#     str, bytes and int, which encodeKey() turns into bytes that are the same whenever the keys are equal
+
+def encodeKey(key: str | bytes | int) -> bytes:
+    """ A one-letter type tag followed by the key. bool is an int, so True and 1 are the same key, as in a dict. """
+    
+    if isinstance(key, str):
+        return b"s" + key.encode("utf-8", "surrogatepass")
+    if isinstance(key, bytes):
+        return b"b" + key
+    if isinstance(key, int):
+        return b"i" + int(key).to_bytes(key.bit_length() // 8 + 1, "little", signed=True)
+    raise TypeError(f"PersistentDict keys must be str, bytes or int, not {type(key).__name__}")
+
+
+def decodeKey(data: bytes) -> str | bytes | int:
+    tag, body = data[:1], data[1:]
+    if tag == b"s":
+        return body.decode("utf-8", "surrogatepass")
+    if tag == b"b":
+        return body
+    return int.from_bytes(body, "little", signed=True)
+
+
+class PersistentDict(MutableMapping):
+    
+    def __init__(self, path: str, cacheSize: int = 10_000):
+        self.connection = sqlite3.connect(path)
+        # write-ahead logging lets readers keep going during a write, and NORMAL only syncs at checkpoints
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS items (key BLOB PRIMARY KEY, value BLOB) WITHOUT ROWID")
+        
+        self.cache: OrderedDict = OrderedDict()
+        self.cacheSize = cacheSize
+        self.hits = 0
+        self.misses = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+    
+    def close(self) -> None:
+        self.connection.close()
+    
+    def _remember(self, key, pickledValue: bytes) -> None:
+        self.cache[key] = pickledValue
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)  # the least recently used entry is at the front
+    
+    def __getitem__(self, key):
+        encodedKey = encodeKey(key)  # even for cache hits, so unsupported keys fail the same way every time
+        try:
+            pickledValue = self.cache[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return pickle.loads(pickledValue)
+        
+        row = self.connection.execute("SELECT value FROM items WHERE key = ?", (encodedKey,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        
+        self._remember(key, row[0])
+        return pickle.loads(row[0])
+    
+    def __setitem__(self, key, value) -> None:
+        pickledValue = pickle.dumps(value)
+        with self.connection:  # commits when the block ends
+            self.connection.execute(
+                "INSERT OR REPLACE INTO items (key, value) VALUES (?, ?)",
+                (encodeKey(key), pickledValue)
+            )
+        self._remember(key, pickledValue)
+    
+    def __delitem__(self, key) -> None:
+        with self.connection:
+            deleted = self.connection.execute("DELETE FROM items WHERE key = ?", (encodeKey(key),)).rowcount
+        self.cache.pop(key, None)
+        if not deleted:
+            raise KeyError(key)
+    
+    def __contains__(self, key) -> bool:
+        encodedKey = encodeKey(key)
+        if key in self.cache:
+            return True
+        return self.connection.execute("SELECT 1 FROM items WHERE key = ?", (encodedKey,)).fetchone() is not None
+    
+    def __iter__(self) -> Iterator:
+        # a separate cursor, so iterating doesn't get mixed up with lookups made inside the loop
+        for (key,) in self.connection.cursor().execute("SELECT key FROM items"):
+            yield decodeKey(key)
+    
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    
+    def update(self, other=(), /, **extra) -> None:
+        """ Like dict.update(), but every write goes into a single transaction. """
+        
+        items = chain(other.items() if isinstance(other, Mapping) else other, extra.items())
+        pairs = [(key, pickle.dumps(value)) for key, value in items]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO items (key, value) VALUES (?, ?)",
+                ((encodeKey(key), pickledValue) for key, pickledValue in pairs)
+            )
+        
+        # only the tail end can stay in the cache anyway
+        for key, pickledValue in pairs[-self.cacheSize:]:
+            self._remember(key, pickledValue)
+
+
+with tempfile.TemporaryDirectory() as directory:
+    with PersistentDict(os.path.join(directory, "dictionary.sqlite")) as persistent:
+        persistent.update({1: "jeff", 7: "kalina", 3: ""})
+        print("safely accessing a persistent value using get():", persistent.get(2, "key 2 does not exist"))
+        print("pop(7):", persistent.pop(7), "and then:", dict(persistent))
+        persistent[2] = "dad"
+        del persistent[2]
+        print(1 in persistent, 2 in persistent, len(persistent), list(persistent.items()))
+    
+    # reopening the file finds the data still there
+    with PersistentDict(os.path.join(directory, "dictionary.sqlite")) as persistent:
+        print("after reopening:", dict(persistent))
+print()
+
+
+def benchmarkPersistentDict(keyCount: int = 1_000_000, operations: int = 100_000, cacheSize: int = 10_000) -> None:
+    """ Random get/put throughput. keyCount=100_000_000 works too, given the disk space and a lot of patience. """
+    
+    rng = random.Random(3)
+    
+    with tempfile.TemporaryDirectory() as directory, PersistentDict(os.path.join(directory, "benchmark.sqlite"), cacheSize) as persistent:
+        loadSeconds = 0.0
+        for start in range(0, keyCount, 1_000_000):
+            batch = ((f"key{number}", number) for number in range(start, min(start + 1_000_000, keyCount)))
+            loadSeconds += timeit(lambda: persistent.update(batch), number=1)
+        
+        keysToRead = [f"key{rng.randrange(keyCount)}" for _ in range(operations)]
+        getSeconds = timeit(lambda: [persistent[key] for key in keysToRead], number=1)
+        
+        keysToWrite = [f"key{rng.randrange(keyCount)}" for _ in range(operations // 10)]
+        putSeconds = timeit(lambda: [persistent.__setitem__(key, -1) for key in keysToWrite], number=1)
+        
+        print(f"bulk load: {keyCount / loadSeconds:>10,.0f} keys/sec")
+        print(f"random get: {operations / getSeconds:>9,.0f} gets/sec ({persistent.hits} cache hits, {persistent.misses} misses)")
+        print(f"random put: {len(keysToWrite) / putSeconds:>9,.0f} puts/sec (one commit each)")
+
+
+# worker processes re-run this file when they start on some systems (Windows, macOS), so the parallel parts are kept
+# behind this check
+if __name__ == "__main__":
+    print(countInParallel([winner for winner in chain.from_iterable(winners.values())], chunkSize=20).most_common(3))
+    benchmarkCounting()
+    benchmarkCompactMap()
+    benchmarkPersistentDict()
@@ -1,3 +1,20 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping, MutableMapping, MutableSequence, Sequence
+from functools import partial
+from itertools import chain, islice
+from timeit import timeit
+from typing import Iterable, Iterator
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumericList falls back to the array's own methods
+
+
+
 # List
 # mutable, easy to use, all the benefits of an array and a referenced object
 
@@ -61,3 +78,474 @@ print(nums.count(5))  # counts the occurrences of the given value in the list
 print(nums.index(22))  # returns the index of the given value
 nums.sort()
 print(nums)
+
+
+
+#=======================
+# Typed numeric sequence
+#=======================
+
+# A list of numbers is really a list of pointers to separate int/float objects (about 32 bytes each, plus 8 for the
+# pointer), and min(), count(), sort() and friends have to look at every one of those objects through Python's generic
+# machinery. NumericList stores the raw numbers back-to-back in an array.array instead, and hands the heavy lifting to
+# NumPy when it's installed (or to the array's own C-level methods when it isn't).
+#
+# insert(0, value) on a list shifts every element over by one, so it's O(n). NumericList keeps some empty room (a "gap")
+# in front of the first element, the way a deque does, so adding at the front usually just fills in one more slot of
+# the gap. When the gap runs out, it's doubled, which keeps front insertion O(1) on average.
+
+class NumericList(MutableSequence):
+    
+    def __init__(self, values: Iterable[float] = (), typecode: str = "d"):
+        """ :param typecode: An array.array type code -- "d" for floats, "q" for 64-bit ints, etc. """
+        
+        self.typecode = typecode
+        self.data = array(typecode, values)
+        self.start = 0  # data[:start] is the gap, data[start:] are the actual values
+    
+    def _view(self):
+        """
+        The values without copying them: a NumPy array when NumPy is installed, otherwise a memoryview. It must not be
+        kept around -- the array can't grow or shrink while something is still looking at its memory.
+        """
+        view = memoryview(self.data)[self.start:]
+        return np.frombuffer(view, dtype=view.format) if np is not None else view
+    
+    def _index(self, index: int) -> int:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("NumericList index out of range")
+        return self.start + index
+    
+    def __len__(self) -> int:
+        return len(self.data) - self.start
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return NumericList(self.data[self.start:][index], self.typecode)
+        return self.data[self._index(index)]
+    
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            values = self.data[self.start:]
+            values[index] = array(self.typecode, value)
+            self.data, self.start = values, 0
+        else:
+            self.data[self._index(index)] = value
+    
+    def __delitem__(self, index) -> None:
+        if isinstance(index, slice):
+            begin, end, step = index.indices(len(self))
+            if step == 1:
+                del self.data[self.start + begin:self.start + max(end, begin)]
+            else:
+                values = self.data[self.start:]
+                del values[index]
+                self.data, self.start = values, 0
+        else:
+            del self.data[self._index(index)]
+    
+    def insert(self, index: int, value: float) -> None:
+        if index == 0 or index <= -len(self):
+            if self.start == 0:
+                grow = max(len(self), 16)
+                self.data[0:0] = array(self.typecode, bytes(grow * self.data.itemsize))  # a gap of zeros
+                self.start = grow
+            self.start -= 1
+            self.data[self.start] = value
+        else:
+            self.data.insert(self.start + min(max(index + len(self) if index < 0 else index, 0), len(self)), value)
+    
+    def append(self, value: float) -> None:
+        self.data.append(value)
+    
+    def extend(self, values: Iterable[float]) -> None:
+        self.data.extend(values if isinstance(values, array) else array(self.typecode, values))
+    
+    def min(self) -> float:
+        if not len(self):
+            raise ValueError("min() of an empty NumericList")
+        view = self._view()
+        return view.min().item() if np is not None else min(view)
+    
+    def max(self) -> float:
+        if not len(self):
+            raise ValueError("max() of an empty NumericList")
+        view = self._view()
+        return view.max().item() if np is not None else max(view)
+    
+    def sum(self) -> float:
+        view = self._view()
+        return view.sum().item() if np is not None else sum(view)
+    
+    def count(self, value: float) -> int:
+        if np is not None:
+            return int(np.count_nonzero(self._view() == value))
+        
+        # array.count() runs in C, but it also sees the zeros in the gap
+        gapZeros = self.start if value == 0 else 0
+        return self.data.count(value) - gapZeros
+    
+    def index(self, value: float, start: int = 0, stop: int | None = None) -> int:
+        # same rules as list.index: negative positions count from the end, and anything past either end is clamped
+        start, stop, _ = slice(start, stop).indices(len(self))
+        
+        if np is not None:
+            matches = np.flatnonzero(self._view()[start:stop] == value)
+            if not len(matches):
+                raise ValueError(f"{value} is not in NumericList")
+            return start + int(matches[0])
+        
+        return self.data.index(value, self.start + start, self.start + stop) - self.start
+    
+    def sort(self, reverse: bool = False) -> None:
+        if np is not None:
+            view = self._view()
+            view.sort()  # sorts the array's memory in place
+            if reverse:
+                view[:] = view[::-1].copy()
+            return
+        
+        self.data = array(self.typecode, sorted(self.data[self.start:], reverse=reverse))
+        self.start = 0
+    
+    def tolist(self) -> list[float]:
+        return self.data[self.start:].tolist()
+    
+    def __eq__(self, other) -> bool:
+        # equal to any sequence with the same values in the same order, like a list; the typecodes don't have to match
+        if isinstance(other, NumericList):
+            if len(self) != len(other):
+                return False
+            if np is not None:
+                return bool(np.array_equal(self._view(), other._view()))
+            return memoryview(self.data)[self.start:] == memoryview(other.data)[other.start:]
+        if isinstance(other, Sequence):
+            return len(self) == len(other) and self.tolist() == list(other)
+        return NotImplemented
+    
+    def __repr__(self):
+        return f"NumericList({self.tolist()}, typecode={self.typecode!r})"
+
+
+# the same steps as the list examples above
+typedNums = NumericList([25, 12, 15, 55], typecode="q")
+typedNums.append(66)
+typedNums.remove(66)
+typedNums.pop(2)
+typedNums.insert(0, 22)
+del typedNums[2:]
+typedNums.extend([5, 6, 7])
+print(typedNums)
+print(typedNums.min(), typedNums.max(), typedNums.count(5), typedNums.index(22))
+typedNums.sort()
+print(typedNums)
+print()
+
+
+def benchmarkNumericList(size: int = 1_000_000, frontInserts: int = 50_000) -> None:
+    rng = random.Random(4)
+    values = [rng.randrange(1_000_000) for _ in range(size)]
+    plain = list(values)
+    typed = NumericList(values, typecode="q")
+    target = values[size // 2]
+    
+    operations = {
+        "min": (lambda: min(plain), typed.min),
+        "max": (lambda: max(plain), typed.max),
+        "count": (lambda: plain.count(target), lambda: typed.count(target)),
+        "index": (lambda: plain.index(target), lambda: typed.index(target)),
+        "sort": (lambda: list(values).sort(), lambda: NumericList(values, typecode="q").sort())
+    }
+    
+    print(f"{'':>12} {'list':>10} {'NumericList':>12}  (seconds, {size:,} elements{', NumPy' if np is not None else ''})")
+    for name, (withList, withNumericList) in operations.items():
+        print(f"{name:>12} {timeit(withList, number=1):>10.4f} {timeit(withNumericList, number=1):>12.4f}")
+    
+    def insertAtFront(sequence) -> None:
+        for number in range(frontInserts):
+            sequence.insert(0, number)
+    
+    listSeconds = timeit(lambda: insertAtFront(list(values[:100_000])), number=1)
+    typedSeconds = timeit(lambda: insertAtFront(NumericList(values[:100_000], typecode="q")), number=1)
+    print(f"{'insert(0)':>12} {listSeconds:>10.4f} {typedSeconds:>12.4f}  ({frontInserts:,} inserts)")
+
+
+
+
+#============
+# Sorted list
+#============
+
+# Ranking code tends to do insert(index, value), index(value) and sort() over and over. On a list, inserting shifts
+# everything after the insertion point, index() looks at every element, and re-sorting redoes the whole thing.
+# SortedList keeps its values sorted at all times, split into many small sorted lists ("list of lists") of around
+# ``load`` values each:
+#   - finding a value is a binary search over the last value of every small list (bisect), then a binary search inside
+#     the one small list it belongs in
+#   - inserting only shifts the values of one small list; a small list that gets too big is split in two
+#   - to turn "the 3rd value of the 41st small list" into an overall position, a Fenwick tree (below) keeps running
+#     totals of the small lists' lengths, and answers "how many values come before small list i" in O(log n)
+
+class FenwickTree:
+    """ Prefix sums that can be updated in O(log n), stored in one flat list (index 0 unused). """
+    
+    def __init__(self, values: Iterable[int] = ()):
+        self.tree = [0, *values]
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+    
+    def add(self, position: int, delta: int) -> None:
+        index = position + 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+    
+    def prefix(self, count: int) -> int:
+        """ Sum of the first ``count`` values. """
+        total = 0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+    
+    def find(self, target: int) -> tuple[int, int]:
+        """ The position whose running total first goes past ``target``, and how far past the earlier ones it is. """
+        
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            candidate = position + step
+            if candidate < len(self.tree) and self.tree[candidate] <= target:
+                position = candidate
+                target -= self.tree[candidate]
+            step >>= 1
+        return position, target
+
+
+class SortedList(Sequence):
+    
+    def __init__(self, values: Iterable = (), load: int = 1_000):
+        self.load = load
+        ordered = sorted(values)
+        self.lists = [ordered[start:start + load] for start in range(0, len(ordered), load)]
+        self.maxes = [sublist[-1] for sublist in self.lists]
+        self._reindex()
+    
+    def _reindex(self) -> None:
+        self.lengths = FenwickTree(map(len, self.lists))
+        self.size = sum(map(len, self.lists))
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def __iter__(self) -> Iterator:
+        return chain.from_iterable(self.lists)
+    
+    def add(self, value) -> None:
+        if not self.lists:
+            self.lists.append([value])
+            self.maxes.append(value)
+            self._reindex()
+            return
+        
+        position = bisect_right(self.maxes, value)
+        if position == len(self.maxes):
+            position -= 1  # bigger than everything, so it goes at the end of the last small list
+            self.lists[position].append(value)
+            self.maxes[position] = value
+        else:
+            insort(self.lists[position], value)
+        
+        self.size += 1
+        if len(self.lists[position]) > 2 * self.load:
+            sublist = self.lists[position]
+            half = len(sublist) // 2
+            self.lists[position:position + 1] = [sublist[:half], sublist[half:]]
+            self.maxes[position:position + 1] = [sublist[half - 1], sublist[-1]]
+            self._reindex()  # O(number of small lists), but only once every ``load`` inserts at most
+        else:
+            self.lengths.add(position, 1)
+    
+    def update(self, values: Iterable) -> None:
+        for value in values:
+            self.add(value)
+    
+    def remove(self, value) -> None:
+        position = bisect_left(self.maxes, value)
+        if position == len(self.maxes):
+            raise ValueError(f"{value!r} is not in SortedList")
+        
+        sublist = self.lists[position]
+        index = bisect_left(sublist, value)
+        if sublist[index] != value:
+            raise ValueError(f"{value!r} is not in SortedList")
+        
+        del sublist[index]
+        self.size -= 1
+        if sublist:
+            self.maxes[position] = sublist[-1]
+            self.lengths.add(position, -1)
+        else:
+            del self.lists[position]
+            del self.maxes[position]
+            self._reindex()
+    
+    def discard(self, value) -> None:
+        if value in self:
+            self.remove(value)
+    
+    def pop(self, index: int = -1):
+        value = self[index]
+        self.remove(value)
+        return value
+    
+    def __contains__(self, value) -> bool:
+        position = bisect_left(self.maxes, value)
+        if position == len(self.maxes):
+            return False
+        sublist = self.lists[position]
+        return sublist[bisect_left(sublist, value)] == value
+    
+    def bisect_left(self, value) -> int:
+        position = bisect_left(self.maxes, value)
+        if position == len(self.maxes):
+            return self.size
+        return self.lengths.prefix(position) + bisect_left(self.lists[position], value)
+    
+    def bisect_right(self, value) -> int:
+        position = bisect_right(self.maxes, value)
+        if position == len(self.maxes):
+            return self.size
+        return self.lengths.prefix(position) + bisect_right(self.lists[position], value)
+    
+    def count(self, value) -> int:
+        return self.bisect_right(value) - self.bisect_left(value)
+    
+    def index(self, value, start: int = 0, stop: int | None = None) -> int:
+        start, stop, _ = slice(start, stop).indices(self.size)
+        # equal values sit next to each other, so the first one at or after start is either there or nowhere
+        position = max(self.bisect_left(value), start)
+        if position < stop and self[position] == value:
+            return position
+        raise ValueError(f"{value!r} is not in SortedList")
+    
+    def _locate(self, index: int) -> tuple[int, int]:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("SortedList index out of range")
+        return self.lengths.find(index)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if step != 1:
+                return list(self)[index]
+            return list(islice(self._iterateFrom(start), max(stop - start, 0)))
+        
+        position, offset = self._locate(index)
+        return self.lists[position][offset]
+    
+    def _iterateFrom(self, index: int) -> Iterator:
+        if index >= self.size:
+            return iter(())
+        position, offset = self._locate(index)
+        return chain(islice(self.lists[position], offset, None), chain.from_iterable(self.lists[position + 1:]))
+    
+    def irange(self, minimum, maximum) -> list:
+        """ Every value from ``minimum`` up to and including ``maximum``. """
+        return self[self.bisect_left(minimum):self.bisect_right(maximum)]
+    
+    def __repr__(self):
+        return f"SortedList({list(self)})"
+
+
+class SortedDict(MutableMapping):
+    """ A dict whose keys always iterate in sorted order, with SortedList's searches over the keys. """
+    
+    def __init__(self, items: Mapping | Iterable[tuple] = ()):
+        self.data = dict(items)
+        self.sortedKeys = SortedList(self.data)
+    
+    def __getitem__(self, key):
+        return self.data[key]
+    
+    def __setitem__(self, key, value) -> None:
+        if key not in self.data:
+            self.sortedKeys.add(key)
+        self.data[key] = value
+    
+    def __delitem__(self, key) -> None:
+        del self.data[key]
+        self.sortedKeys.remove(key)
+    
+    def __iter__(self) -> Iterator:
+        return iter(self.sortedKeys)
+    
+    def __len__(self) -> int:
+        return len(self.data)
+    
+    def peekitem(self, index: int = -1) -> tuple:
+        key = self.sortedKeys[index]
+        return key, self.data[key]
+    
+    def irange(self, minimum, maximum) -> list:
+        return self.sortedKeys.irange(minimum, maximum)
+
+
+ranked = SortedList([25, 12, 15, 55], load=2)
+ranked.add(22)
+ranked.update([5, 6, 7, 22])
+print(ranked, "index of 22:", ranked.index(22), "count of 22:", ranked.count(22), "between 6 and 22:", ranked.irange(6, 22))
+scores = SortedDict({"kalina": 88, "jeff": 91})
+scores["dad"] = 75
+print(list(scores.items()), scores.peekitem(0))
+print()
+
+
+def benchmarkSortedList(sizes: Iterable[int] = (1_000_000,), operations: int = 100_000) -> None:
+    """ Mixed insert/remove/search workloads on a SortedList already holding ``size`` values. Try (1_000_000, 10_000_000) too. """
+    
+    rng = random.Random(5)
+    
+    for size in sizes:
+        values = [rng.random() for _ in range(size)]
+        started = time.perf_counter()
+        sortedValues = SortedList(values)
+        print(f"{size:,} values: built in {time.perf_counter() - started:.2f}s")
+        
+        for insertShare, removeShare in ((0.9, 0.0), (0.5, 0.25), (0.1, 0.1)):
+            steps = [rng.random() for _ in range(operations)]
+            newValues = [rng.random() for _ in range(operations)]
+            
+            def runMix(container, add, remove, search) -> None:
+                for step, value in zip(steps, newValues):
+                    if step < insertShare:
+                        add(value)
+                    elif step < insertShare + removeShare:
+                        remove(container[int(value * (len(container) - 1))])
+                    else:
+                        search(value)
+            
+            plainList = sorted(values)
+            mixName = f"{insertShare:.0%} insert / {removeShare:.0%} remove / {1 - insertShare - removeShare:.0%} search"
+            sortedSeconds = timeit(lambda: runMix(sortedValues, sortedValues.add, sortedValues.remove, sortedValues.bisect_left), number=1)
+            
+            # a plain list with bisect is fine for searching, but every insert and remove shifts half the list on average
+            # (so it only gets a tenth of the operations, or it would take minutes)
+            listOperations = operations // 10
+            steps, newValues = steps[:listOperations], newValues[:listOperations]
+            removeFromList = lambda value: plainList.pop(bisect_left(plainList, value))
+            listSeconds = timeit(lambda: runMix(plainList, partial(insort, plainList), removeFromList, partial(bisect_left, plainList)), number=1)
+            
+            print(f"    {mixName}: SortedList {operations / sortedSeconds:>10,.0f} ops/sec, list + bisect {listOperations / listSeconds:>10,.0f} ops/sec")
+
+
+if __name__ == "__main__":
+    benchmarkNumericList()
+    benchmarkSortedList()
@@ -1,4 +1,22 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from importlib.metadata import entry_points
+from timeit import timeit
+from typing import Callable, Iterable, Iterator
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+import zlib
+
+try:
+    import resource  # only exists on Unix-like systems
+except ImportError:
+    resource = None
 
 
 
@@ -109,13 +127,538 @@ def readExporter() -> ExporterFactory:
         print("unknown quality")
 
 
+
+#======================
+# Registry of factories
+#======================
+
+
+# readExporter() builds every factory on every call, and each getVideoExporter()/getAudioExporter() call builds a new
+# exporter. The registry below only stores *how* to build each factory, builds it the first time it's asked for, and
+# then keeps it (and the exporters it hands out) around for next time.
+#
+# Some exporters keep state between prepareExport() and doExport(), which makes sharing one instance between threads a
+# bad idea -- those can be registered with perThread=True so that every thread gets its own cached instance.
+#
+# Plugins can add qualities without this file knowing about them, through the "entry points" in their package metadata:
+#
+#   [project.entry-points."pythonFundamentals.exporters"]
+#   lossless = "losslessPlugin:LosslessExporterFactory"
+#
+# Only the names are read at startup; a plugin module is imported the first time its quality is requested.
+
+ENTRY_POINT_GROUP = "pythonFundamentals.exporters"
+
+
+class ThreadExporters(threading.local):
+    """ threading.local runs __init__ again in every thread that touches it, so each thread gets its own dict. """
+    
+    def __init__(self):
+        self.exporters: dict[tuple[str, str], VideoExporter | AudioExporter] = {}
+
+
+class ExporterRegistry:
+    
+    def __init__(self):
+        self.loaders: dict[str, Callable[[], ExporterFactory]] = {}
+        self.perThread: dict[str, bool] = {}
+        self.factories: dict[str, ExporterFactory] = {}
+        self.exporters: dict[tuple[str, str], VideoExporter | AudioExporter] = {}
+        self.threadExporters = ThreadExporters()
+        self.lock = threading.RLock()  # re-entrant, because building an exporter first builds its factory
+        
+        self.built = 0
+        self.buildSeconds = 0.0
+        self.reused = 0
+    
+    def register(self, quality: str, loader: Callable[[], ExporterFactory], perThread: bool = False) -> None:
+        """ ``loader`` is anything that returns a factory when called -- usually the factory class itself. """
+        self.loaders[quality] = loader
+        self.perThread[quality] = perThread
+    
+    def loadEntryPoints(self, group: str = ENTRY_POINT_GROUP) -> None:
+        for entryPoint in entry_points(group=group):
+            # entryPoint.load() imports the plugin, so it's wrapped to only happen when the factory is first needed
+            self.register(entryPoint.name, lambda entryPoint=entryPoint: entryPoint.load()())
+    
+    def qualities(self) -> list[str]:
+        return list(self.loaders)
+    
+    def _build(self, cache: dict, key: tuple[str, str], build: Callable):
+        with self.lock:
+            instance = cache.get(key)  # another thread may have built it while this one waited on the lock
+            if instance is None:
+                started = time.perf_counter()
+                instance = cache[key] = build()
+                self.buildSeconds += time.perf_counter() - started
+                self.built += 1
+        return instance
+    
+    def getFactory(self, quality: str) -> ExporterFactory:
+        factory = self.factories.get(quality)
+        if factory is None:
+            return self._build(self.factories, quality, self.loaders[quality])  # type: ignore
+        self.reused += 1
+        return factory
+    
+    def _getExporter(self, quality: str, kind: str) -> VideoExporter | AudioExporter:
+        cache = self.threadExporters.exporters if self.perThread[quality] else self.exporters
+        exporter = cache.get((quality, kind))
+        
+        if exporter is None:
+            factory = self.getFactory(quality)
+            build = factory.getVideoExporter if kind == "video" else factory.getAudioExporter
+            return self._build(cache, (quality, kind), build)
+        
+        self.reused += 1
+        return exporter
+    
+    def getVideoExporter(self, quality: str) -> VideoExporter:
+        return self._getExporter(quality, "video")  # type: ignore
+    
+    def getAudioExporter(self, quality: str) -> AudioExporter:
+        return self._getExporter(quality, "audio")  # type: ignore
+    
+    def savedSeconds(self) -> float:
+        """ Roughly how much building time reusing has avoided, going by the average time it took to build things. """
+        return self.reused * self.buildSeconds / self.built if self.built else 0.0
+
+
+registry = ExporterRegistry()
+registry.register("low", LowQExporterFactory)
+registry.register("high", HighQExporterFactory, perThread=True)
+registry.loadEntryPoints()
+
+
+def readExporterFromRegistry(registry: ExporterRegistry) -> str:
+    """ Same as readExporter(), but the options come from the registry, and nothing is built until it's chosen. """
+    
+    quality: str
+    while True:
+        quality = input(f"select quality {registry.qualities()}: ")
+        if quality in registry.qualities():
+            return quality
+        print("unknown quality")
+
+
+# The exporters above are empty, so building them costs next to nothing. A real one would do some work up front (load
+# codec presets, probe the hardware, ...), which is what this one pretends to do.
+class PresetLoadingExporterFactory(HighQExporterFactory):
+    def __init__(self):
+        time.sleep(0.001)
+
+
+def measureRegistry(exports: int = 1_000) -> None:
+    """ Compares building a new factory and exporters for every export against reusing them from the registry. """
+    
+    measured = ExporterRegistry()
+    measured.register("presets", PresetLoadingExporterFactory)
+    
+    def buildEveryTime():
+        for _ in range(exports):
+            factory = PresetLoadingExporterFactory()
+            factory.getVideoExporter()
+            factory.getAudioExporter()
+    
+    def reuseFromRegistry():
+        for _ in range(exports):
+            measured.getVideoExporter("presets")
+            measured.getAudioExporter("presets")
+    
+    print(f"building every time: {timeit(buildEveryTime, number=1):.3f} seconds")
+    print(f"registry:            {timeit(reuseFromRegistry, number=1):.3f} seconds")
+    print(f"built {measured.built}, reused {measured.reused}, saved about {measured.savedSeconds():.3f} seconds of building")
+
+
+
+#===============================
+# Concurrent export orchestrator
+#===============================
+
+
+# main() prepares and exports one thing at a time, even though the video and the audio don't depend on each other. The
+# orchestrator runs each exporter as its own job, with all jobs sharing two pools:
+#   - a thread pool, where each job runs prepareExport() and doExport() (mostly waiting on disks and devices)
+#   - a process pool, for encoding the job's chunks (pure computation, which threads can't run in parallel)
+# Encoded chunks flow from the encoder to the writer through a bounded queue, so the first chunks are already being
+# written while later ones are still encoding, and a fast encoder can't pile up more than ``queueSize`` chunks in memory.
+
+@dataclass
+class ExportJob:
+    name: str
+    # called on the thread that runs the job, so a registry quality registered with perThread=True really gets that
+    # thread's own exporter
+    getExporter: Callable[[], VideoExporter | AudioExporter]
+    data: object
+    path: str
+    chunks: Iterable[bytes] = ()
+    encode: Callable[[bytes], bytes] | None = None  # runs in another process, so it must be a module-level function
+
+
+@dataclass
+class StageTimings:
+    prepare: float = 0.0
+    encode: float = 0.0  # summed over all chunks, as measured inside the worker processes
+    write: float = 0.0
+    export: float = 0.0
+    total: float = 0.0
+    
+    def __str__(self):
+        return ", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in vars(self).items())
+
+
+def encodeTimed(encode: Callable[[bytes], bytes], chunk: bytes) -> tuple[bytes, float]:
+    started = time.perf_counter()
+    encoded = encode(chunk)
+    return encoded, time.perf_counter() - started
+
+
+class ExportOrchestrator:
+    
+    def __init__(self, cpuWorkers: int | None = None, ioWorkers: int = 8, queueSize: int = 8):
+        self.cpuPool = ProcessPoolExecutor(cpuWorkers)
+        self.ioPool = ThreadPoolExecutor(ioWorkers)
+        self.queueSize = queueSize
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exceptionType, exceptionInstance, exceptionTraceback):
+        self.ioPool.shutdown()
+        self.cpuPool.shutdown()
+    
+    def run(self, jobs: list[ExportJob]) -> dict[str, StageTimings]:
+        """ Runs every job concurrently and returns the timings per job (raising the first failure, if any). """
+        
+        futures = {job.name: self.ioPool.submit(self._runJob, job) for job in jobs}
+        return {name: future.result() for name, future in futures.items()}
+    
+    def _runJob(self, job: ExportJob) -> StageTimings:
+        timings = StageTimings()
+        started = time.perf_counter()
+        
+        exporter = job.getExporter()
+        exporter.prepareExport(job.data)
+        timings.prepare = time.perf_counter() - started
+        
+        if job.encode is not None:
+            self._pipeChunks(job, timings)
+        
+        exportStarted = time.perf_counter()
+        exporter.doExport(job.path)
+        timings.export = time.perf_counter() - exportStarted
+        
+        timings.total = time.perf_counter() - started
+        return timings
+    
+    def _pipeChunks(self, job: ExportJob, timings: StageTimings) -> None:
+        encoded: queue.Queue[Future | None] = queue.Queue(maxsize=self.queueSize)
+        writerFailed = threading.Event()
+        submitterFailures: list[BaseException] = []
+        
+        def submitChunks():
+            try:
+                for chunk in job.chunks:
+                    if writerFailed.is_set():
+                        break  # nothing is going to write the encoded chunks out anymore
+                    encoded.put(self.cpuPool.submit(encodeTimed, job.encode, chunk))  # blocks while the queue is full
+            except BaseException as error:
+                # the writer can't tell this apart from running out of chunks, so it's raised again once it's done
+                submitterFailures.append(error)
+            finally:
+                encoded.put(None)  # tells the writer there's nothing more coming
+        
+        # the submitting side gets its own thread, outside the shared pool, so jobs can't starve each other of writers
+        submitter = threading.Thread(target=submitChunks, name=f"{job.name} encoder")
+        submitter.start()
+        
+        try:
+            with open(job.path, "wb") as file:
+                while (future := encoded.get()) is not None:
+                    chunk, seconds = future.result()  # futures come out in chunk order, so the file stays in order
+                    timings.encode += seconds
+                    
+                    writeStarted = time.perf_counter()
+                    file.write(chunk)
+                    timings.write += time.perf_counter() - writeStarted
+            
+            if submitterFailures:
+                raise submitterFailures[0]
+        except BaseException:
+            writerFailed.set()
+            # whichever stage failed, the file only has the chunks from before the failure
+            if os.path.exists(job.path):
+                os.remove(job.path)
+            raise
+        finally:
+            # on a failure, keep emptying the queue so the submitter isn't left blocked on a full queue forever
+            while submitter.is_alive():
+                try:
+                    future = encoded.get(timeout=0.1)
+                    if future is not None:
+                        future.cancel()
+                except queue.Empty:
+                    pass
+            submitter.join()
+
+
+def makeChunks(count: int, size: int = 1 << 18) -> Iterator[bytes]:
+    for number in range(count):
+        yield bytes([number % 256]) * size
+
+
+def exportConcurrently(chunksPerJob: int = 64) -> None:
+    
+    with tempfile.TemporaryDirectory() as directory, ExportOrchestrator() as orchestrator:
+        jobs = [
+            ExportJob(
+                f"{quality} {kind}",
+                partial(registry.getVideoExporter if kind == "video" else registry.getAudioExporter, quality),
+                f"{kind} data sample",
+                os.path.join(directory, f"{quality}-{kind}.bin"),
+                makeChunks(chunksPerJob),
+                zlib.compress
+            )
+            for quality in ("low", "high")
+            for kind in ("video", "audio")
+        ]
+        
+        started = time.perf_counter()
+        timings = orchestrator.run(jobs)
+        print(f"{len(jobs)} jobs in {time.perf_counter() - started:.3f} seconds")
+        
+        for name, timing in timings.items():
+            print(f"    {name}: {timing}")
+
+
+
+#====================
+# Streaming exporters
+#====================
+
+
+# VideoExporter and AudioExporter take the whole payload in one go, so a 10 GB video has to fit in memory. The streaming
+# versions take an iterator of buffers instead, handle them one at a time, and write each result out before asking for
+# the next one -- memory use stays at about one buffer no matter how big the input is.
+#
+# Exports can also be resumed. Every so often the exporter saves a checkpoint next to the output (how far into the
+# input it got, and how long the output was at that point). After a crash, exportStream(..., resume=True) cuts the
+# output back to the last checkpoint, skips the input that was already handled, and carries on from there. When the
+# input is a file, its size and modification time go into the checkpoint too, so a checkpoint left behind by an export
+# of some other (or since changed) input isn't trusted.
+
+@dataclass
+class ExportProgress:
+    inputBytes: int = 0
+    outputBytes: int = 0
+    inputFingerprint: str = field(default="-", repr=False)  # size and modification time of the input file
+
+
+class StreamingExporter(ABC):
+    
+    @abstractmethod
+    def transform(self, buffer: memoryview) -> bytes | memoryview: ...
+    
+    def exportStream(self,
+        buffers: Iterable[memoryview],
+        path: str,
+        resume: bool = False,
+        checkpointEvery: int = 64 << 20,
+        source: str | None = None
+    ) -> ExportProgress:
+        """
+        Writes the transformed buffers to ``path``. With ``resume``, ``buffers`` must start from the beginning of the
+        input again; the part that was already exported is skipped over.
+        
+        :param checkpointEvery: Input bytes between checkpoints (each one flushes and fsyncs the output first).
+        :param source: The file ``buffers`` are read from, if there is one; a checkpoint is only resumed from if this
+        file still has the size and modification time it had when the checkpoint was taken.
+        """
+        
+        checkpointPath = path + ".checkpoint"
+        fingerprint = self._fingerprint(source)
+        if resume:
+            progress = self._readCheckpoint(checkpointPath)
+            if progress.inputFingerprint != fingerprint:
+                progress = ExportProgress()  # the checkpoint belongs to an export of different input
+        else:
+            progress = ExportProgress()
+            if os.path.exists(checkpointPath):
+                os.remove(checkpointPath)  # from an earlier export, which this one is about to overwrite
+        progress.inputFingerprint = fingerprint
+        outputSize = os.path.getsize(path) if os.path.exists(path) else -1
+        if outputSize < progress.outputBytes:
+            # the output is gone or shorter than the checkpoint says, so what it had can't be trusted; start over
+            progress = ExportProgress(inputFingerprint=fingerprint)
+        toSkip = progress.inputBytes
+        nextCheckpoint = progress.inputBytes + checkpointEvery
+        
+        with open(path, "r+b" if resume and outputSize >= 0 else "wb") as file:
+            file.truncate(progress.outputBytes)  # throw away anything written after the last checkpoint
+            file.seek(progress.outputBytes)
+            
+            for buffer in buffers:
+                if toSkip >= len(buffer):
+                    toSkip -= len(buffer)
+                    continue
+                
+                # checkpoints are only taken on buffer boundaries, so an already-exported buffer is skipped whole
+                if toSkip:
+                    raise ValueError("resumed with differently sized buffers than the original export")
+                
+                progress.outputBytes += file.write(self.transform(buffer))
+                progress.inputBytes += len(buffer)
+                
+                if progress.inputBytes >= nextCheckpoint:
+                    # the output has to be on disk before a checkpoint claims it is
+                    file.flush()
+                    os.fsync(file.fileno())
+                    self._writeCheckpoint(checkpointPath, progress)
+                    nextCheckpoint = progress.inputBytes + checkpointEvery
+        
+        if os.path.exists(checkpointPath):
+            os.remove(checkpointPath)  # finished, so there's nothing left to resume
+        
+        return progress
+    
+    @staticmethod
+    def _fingerprint(source: str | None) -> str:
+        if source is None:
+            return "-"
+        status = os.stat(source)
+        return f"{status.st_size}:{status.st_mtime_ns}"
+    
+    def _readCheckpoint(self, checkpointPath: str) -> ExportProgress:
+        if not os.path.exists(checkpointPath):
+            return ExportProgress()
+        with open(checkpointPath) as file:
+            inputBytes, outputBytes, inputFingerprint = file.read().split()
+        return ExportProgress(int(inputBytes), int(outputBytes), inputFingerprint)
+    
+    def _writeCheckpoint(self, checkpointPath: str, progress: ExportProgress) -> None:
+        # written to a temporary file first and then renamed, so a crash can't leave a half-written checkpoint
+        with open(checkpointPath + ".tmp", "w") as file:
+            file.write(f"{progress.inputBytes} {progress.outputBytes} {progress.inputFingerprint}")
+        os.replace(checkpointPath + ".tmp", checkpointPath)
+
+
+class StreamingVideoExporter(StreamingExporter):
+    """ Video frames as raw bytes. """
+
+class StreamingAudioExporter(StreamingExporter):
+    """ Audio as 16-bit little-endian samples. """
+
+
+class LowQStreamingVideoExporter(StreamingVideoExporter):
+    def transform(self, buffer: memoryview) -> bytes:
+        return bytes(buffer[::2])  # keep every other byte -- half the resolution
+
+class HighQStreamingVideoExporter(StreamingVideoExporter):
+    def transform(self, buffer: memoryview) -> memoryview:
+        return buffer  # written as-is, without copying
+
+class LowQStreamingAudioExporter(StreamingAudioExporter):
+    def transform(self, buffer: memoryview) -> bytes:
+        return bytes(buffer[1::2])  # keep the high byte of each sample -- 8-bit audio
+
+class HighQStreamingAudioExporter(StreamingAudioExporter):
+    def transform(self, buffer: memoryview) -> memoryview:
+        return buffer
+
+
+def readBuffers(path: str, bufferSize: int = 1 << 20) -> Iterator[memoryview]:
+    """
+    Reads the file into the same buffer over and over, so only one buffer's worth is ever in memory. Each memoryview is
+    only valid until the next one is requested.
+    """
+    
+    buffer = bytearray(bufferSize)
+    view = memoryview(buffer)
+    
+    with open(path, "rb", buffering=0) as file:
+        while read := file.readinto(buffer):
+            yield view[:read]
+
+
+def exportWholePayload(exporter: StreamingExporter, source: str, path: str) -> None:
+    """ The original approach for comparison: read everything, then export it. """
+    
+    with open(source, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(exporter.transform(memoryview(data)))
+
+
+def peakMemory(function: Callable, *args) -> float:
+    """ Runs ``function`` in a fresh process and returns that process's peak memory (RSS) in MB. """
+    
+    def runAndReport(results: multiprocessing.Queue) -> None:
+        function(*args)
+        results.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)  # ru_maxrss is in KB on Linux
+    
+    results = multiprocessing.get_context("fork").Queue()
+    process = multiprocessing.get_context("fork").Process(target=runAndReport, args=(results,))
+    process.start()
+    process.join()  # waiting on results.get() instead would wait forever if function() raised
+    if process.exitcode != 0:
+        raise RuntimeError(f"measuring {function.__name__}() failed, its process exited with code {process.exitcode}")
+    return results.get()
+
+
+def benchmarkStreamingExport(gigabytes: float = 2.0) -> None:
+    if resource is None:
+        print("peak memory can only be measured where the resource module exists (not on Windows)")
+        return
+    
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.raw")
+        with open(source, "wb") as file:
+            file.truncate(int(gigabytes * (1 << 30)))  # a sparse file: takes no disk space, but reads back as zeros
+        
+        for exporter in (LowQStreamingVideoExporter(), HighQStreamingAudioExporter()):
+            name = type(exporter).__name__
+            output = os.path.join(directory, "output.raw")
+            
+            streamedPeak = peakMemory(lambda: exporter.exportStream(readBuffers(source), output))
+            wholePeak = peakMemory(exportWholePayload, exporter, source, output)
+            print(f"{name}, {gigabytes} GB: streamed peak {streamedPeak:,.0f} MB, whole payload peak {wholePeak:,.0f} MB")
+
+
+def resumeExport() -> None:
+    
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.raw")
+        output = os.path.join(directory, "output.raw")
+        with open(source, "wb") as file:
+            file.write(os.urandom(10 << 20))
+        
+        def crashHalfway() -> Iterator[memoryview]:
+            for number, buffer in enumerate(readBuffers(source)):
+                if number == 6:
+                    raise ConnectionError("lost the connection to the source")
+                yield buffer
+        
+        exporter = LowQStreamingAudioExporter()
+        try:
+            exporter.exportStream(crashHalfway(), output, checkpointEvery=4 << 20, source=source)
+        except ConnectionError as error:
+            print(f"export failed: {error}, output is {os.path.getsize(output):,} bytes")
+        
+        progress = exporter.exportStream(readBuffers(source), output, resume=True, checkpointEvery=4 << 20, source=source)
+        
+        with open(source, "rb") as file:
+            expected = exporter.transform(memoryview(file.read()))
+        with open(output, "rb") as file:
+            print(f"resumed export finished at {progress}, identical to a clean export: {file.read() == expected}")
+
+
 def main():
-    # choose the specific factory
-    factory = readExporter()
+    # choose the quality; the registry builds the factory behind it (or reuses it, if it was built before)
+    quality = readExporterFromRegistry(registry)
 
-    # get exporter from the factory
-    video = factory.getVideoExporter()
-    audio = factory.getAudioExporter()
+    # get exporter from the registry
+    video = registry.getVideoExporter(quality)
+    audio = registry.getAudioExporter(quality)
 
     # prepare the exporters
     video.prepareExport("video data sample")
@@ -128,5 +671,9 @@ def main():
 
 
 if __name__ == "__main__":
+    measureRegistry()
+    exportConcurrently()
+    resumeExport()
+    benchmarkStreamingExport(0.25)  # the default is 2 GB, which takes a while
     main()
 
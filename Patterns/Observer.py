@@ -0,0 +1,891 @@
+from array import array
+from collections.abc import Awaitable
+from dataclasses import dataclass, field
+from enum import StrEnum
+from queue import SimpleQueue
+from timeit import timeit
+from typing import Callable
+import asyncio
+import inspect
+import logging
+import multiprocessing
+import os
+import pickle
+import socket
+import statistics
+import struct
+import tempfile
+import threading
+import time
+import weakref
+
+
+logger = logging.getLogger(__name__)
+
+
+
+# Observer Pattern
+# Objects (subscribers, or observers) ask to be told when something happens, and whoever makes it happen (the
+# publisher) tells all of them, without knowing who they are or what they do about it. Here, the go-between is an event
+# bus: publishers send events to a topic like "orders.created", and subscribers listen to topics or topic patterns.
+#
+# The bus is built to handle a lot of events:
+#   - topics are split on "." and stored in a tree (a trie), so matching an event against thousands of patterns only
+#     walks the few branches that can match -- and the result is cached per topic until the subscriptions change
+#   - subscribers are held with weak references, so subscribing doesn't keep an object alive forever (a classic memory
+#     leak with observers); when the object is garbage collected, its subscription disappears by itself
+#   - in asyncio mode, every subscriber gets its own bounded queue and task. Publishing only drops the event into the
+#     queues, so a slow subscriber falls behind (and eventually loses events) instead of holding up the publisher
+#   - subscribers can ask for events in batches, paying the cost of a call once per batch instead of once per event
+
+
+#===============
+# Topic patterns
+#===============
+
+
+# A pattern is a topic where some segments can be wildcards:
+#   "*" matches exactly one segment  -- "orders.*" matches "orders.created" but not "orders.created.late"
+#   "#" matches any number of them (even none) -- "orders.#" matches "orders", "orders.created", "orders.created.late"
+
+SINGLE_WILDCARD = "*"
+MULTI_WILDCARD = "#"
+
+
+class TopicNode:
+    __slots__ = ("children", "subscriptions")
+    
+    def __init__(self):
+        self.children: dict[str, TopicNode] = {}
+        self.subscriptions: list[Subscription] = []
+
+
+class TopicTrie:
+    
+    def __init__(self):
+        self.root = TopicNode()
+    
+    def add(self, pattern: str, subscription: "Subscription") -> None:
+        node = self.root
+        for segment in pattern.split("."):
+            node = node.children.setdefault(segment, TopicNode())
+        node.subscriptions.append(subscription)
+    
+    def remove(self, pattern: str, subscription: "Subscription") -> None:
+        path = [self.root]
+        for segment in pattern.split("."):
+            path.append(path[-1].children[segment])
+        path[-1].subscriptions.remove(subscription)
+        
+        # prune branches that no longer lead to any subscriptions
+        for parent, segment, node in zip(reversed(path[:-1]), reversed(pattern.split(".")), reversed(path)):
+            if node.subscriptions or node.children:
+                break
+            del parent.children[segment]
+    
+    def match(self, topic: str) -> list["Subscription"]:
+        found: list[Subscription] = []
+        self._collect(self.root, topic.split("."), 0, found)
+        return list(dict.fromkeys(found))  # "#" can reach the same node more than one way, so drop duplicates
+    
+    def _collect(self, node: TopicNode, segments: list[str], index: int, found: list["Subscription"]) -> None:
+        children = node.children
+        
+        multi = children.get(MULTI_WILDCARD)
+        if multi is not None:
+            for rest in range(index, len(segments) + 1):  # "#" swallows zero or more of the remaining segments
+                self._collect(multi, segments, rest, found)
+        
+        if index == len(segments):
+            found.extend(node.subscriptions)
+            return
+        
+        exact = children.get(segments[index])
+        if exact is not None:
+            self._collect(exact, segments, index + 1, found)
+        
+        single = children.get(SINGLE_WILDCARD)
+        if single is not None:
+            self._collect(single, segments, index + 1, found)
+
+
+#============
+# Subscribers
+#============
+
+
+class DispatchMode(StrEnum):
+    SYNC = "sync"  # handlers run inside publish(), one after the other
+    ASYNC = "async"  # handlers run in their own asyncio tasks, fed through bounded queues
+
+
+@dataclass(eq=False)
+class Subscription:
+    pattern: str
+    reference: Callable[[], Callable | None]  # calling it returns the handler, or None once it's been collected
+    batchSize: int = 1
+    queueSize: int = 1_000
+    delivered: int = 0
+    dropped: int = 0
+    failed: int = 0  # events whose handler raised
+    pending: list = field(default_factory=list)  # SYNC mode: events waiting for the batch to fill up
+    queue: asyncio.Queue | None = None  # ASYNC mode
+    task: asyncio.Task | None = None  # ASYNC mode
+
+
+class EventBus:
+    
+    def __init__(self, mode: DispatchMode = DispatchMode.SYNC):
+        self.mode = mode
+        self.trie = TopicTrie()
+        self.cache: dict[str, list[Subscription]] = {}
+        self.subscriptions: list[Subscription] = []
+        self.published = 0
+    
+    def subscribe(self,
+        pattern: str,
+        handler: Callable,
+        batchSize: int = 1,
+        queueSize: int = 1_000,
+        weak: bool = True
+    ) -> Subscription:
+        """
+        :param handler: Called with one event, or a list of events if ``batchSize`` is over 1. In ASYNC mode it may be
+        a coroutine function.
+        :param weak: Hold the handler weakly. Turn this off for lambdas and inner functions, which are only alive as
+        long as something else refers to them. Builtins (print, [].append) and other callables that can't be weakly
+        referenced are always held strongly.
+        """
+        
+        subscription = Subscription(pattern, lambda: None, batchSize, queueSize)
+        unsubscribeWhenCollected = lambda _: self.unsubscribe(subscription)
+        
+        if not weak:
+            subscription.reference = lambda: handler
+        elif inspect.ismethod(handler):
+            # a bound method is a new object every time it's looked up, so it needs a WeakMethod to stay referable
+            subscription.reference = weakref.WeakMethod(handler, unsubscribeWhenCollected)
+        elif inspect.isbuiltin(handler):
+            # builtin functions never go away, and builtin methods like [].append are new objects on every lookup
+            # (like bound methods, but WeakMethod doesn't accept them), so a weak reference would die straight away
+            subscription.reference = lambda: handler
+        else:
+            try:
+                subscription.reference = weakref.ref(handler, unsubscribeWhenCollected)
+            except TypeError:
+                subscription.reference = lambda: handler  # some callables don't support weak references at all
+        
+        if self.mode is DispatchMode.ASYNC:
+            subscription.queue = asyncio.Queue(queueSize)
+            subscription.task = asyncio.get_running_loop().create_task(self._consume(subscription))
+        
+        self.trie.add(pattern, subscription)
+        self.subscriptions.append(subscription)
+        self.cache.clear()
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription not in self.subscriptions:
+            return
+        
+        self.subscriptions.remove(subscription)
+        self.trie.remove(subscription.pattern, subscription)
+        self.cache.clear()
+        
+        if subscription.task is not None:
+            subscription.task.cancel()
+    
+    def matching(self, topic: str) -> list[Subscription]:
+        subscriptions = self.cache.get(topic)
+        if subscriptions is None:
+            subscriptions = self.cache[topic] = self.trie.match(topic)
+        return subscriptions
+    
+    def publish(self, topic: str, event: object) -> None:
+        """
+        In SYNC mode, a handler that raises doesn't keep the event from the subscribers after it: once all of them have
+        had it, the errors are raised together in an ExceptionGroup.
+        """
+        
+        self.published += 1
+        
+        if self.mode is DispatchMode.ASYNC:
+            for subscription in self.matching(topic):
+                try:
+                    subscription.queue.put_nowait(event)  # type: ignore
+                except asyncio.QueueFull:
+                    subscription.dropped += 1  # the subscriber is too far behind; the publisher doesn't wait for it
+            return
+        
+        errors: list[Exception] = []
+        for subscription in self.matching(topic):
+            if subscription.batchSize == 1:
+                handler = subscription.reference()
+                if handler is not None:
+                    try:
+                        handler(event)
+                        subscription.delivered += 1
+                    except Exception as error:
+                        subscription.failed += 1
+                        errors.append(error)
+            else:
+                subscription.pending.append(event)
+                if len(subscription.pending) >= subscription.batchSize:
+                    self._deliverPending(subscription, errors)
+        
+        if errors:
+            raise ExceptionGroup(f"handlers for {topic!r} failed", errors)
+    
+    def publishMany(self, topic: str, events: list) -> None:
+        """ Publishes several events to one topic, looking up the subscribers only once. """
+        
+        if self.mode is DispatchMode.SYNC:
+            errors: list[Exception] = []
+            for subscription in self.matching(topic):
+                if subscription.batchSize > 1:
+                    self._deliverInBatches(subscription, events, errors)
+                    continue
+                handler = subscription.reference()
+                if handler is not None:
+                    failed = len(errors)
+                    for event in events:
+                        try:
+                            handler(event)
+                        except Exception as error:
+                            errors.append(error)
+                    subscription.failed += len(errors) - failed
+                    subscription.delivered += len(events) - (len(errors) - failed)
+            self.published += len(events)
+            
+            if errors:
+                raise ExceptionGroup(f"handlers for {topic!r} failed", errors)
+            return
+        
+        for event in events:
+            self.publish(topic, event)
+    
+    def _deliverPending(self, subscription: Subscription, errors: list[Exception]) -> None:
+        batch = subscription.pending[:subscription.batchSize]
+        del subscription.pending[:subscription.batchSize]
+        
+        handler = subscription.reference()
+        if handler is not None:
+            try:
+                handler(batch)
+                subscription.delivered += len(batch)
+            except Exception as error:
+                subscription.failed += len(batch)
+                errors.append(error)
+    
+    def _deliverInBatches(self, subscription: Subscription, events: list, errors: list[Exception]) -> None:
+        pending = subscription.pending
+        pending.extend(events)
+        size = subscription.batchSize
+        full = len(pending) - len(pending) % size
+        
+        # slicing out every full batch and deleting them all at once, rather than one batch at a time from the front
+        handler = subscription.reference()
+        if handler is not None:
+            for start in range(0, full, size):
+                try:
+                    handler(pending[start:start + size])
+                    subscription.delivered += size
+                except Exception as error:
+                    subscription.failed += size
+                    errors.append(error)
+        del pending[:full]
+    
+    def flush(self) -> None:
+        """ SYNC mode: delivers partly filled batches. Handler errors are raised together, like publish() does. """
+        
+        errors: list[Exception] = []
+        for subscription in self.subscriptions:
+            while subscription.pending:
+                self._deliverPending(subscription, errors)
+        
+        if errors:
+            raise ExceptionGroup("handlers failed while flushing", errors)
+    
+    async def _consume(self, subscription: Subscription) -> None:
+        queue: asyncio.Queue = subscription.queue  # type: ignore
+        
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < subscription.batchSize and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            handler = subscription.reference()
+            try:
+                if handler is not None:
+                    result = handler(batch if subscription.batchSize > 1 else batch[0])
+                    if isinstance(result, Awaitable):
+                        await result
+                    subscription.delivered += len(batch)
+            except Exception:
+                # one bad event mustn't end the task, or everything queued after it would wait forever (and so would
+                # drain())
+                subscription.failed += len(batch)
+                logger.exception("handler for %r failed", subscription.pattern)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+    
+    async def drain(self) -> None:
+        """ ASYNC mode: waits until every queued event has been handled. """
+        for subscription in list(self.subscriptions):
+            await subscription.queue.join()  # type: ignore
+    
+    async def close(self) -> None:
+        tasks = [subscription.task for subscription in self.subscriptions if subscription.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            f"{subscription.pattern} #{number}": {
+                "delivered": subscription.delivered,
+                "dropped": subscription.dropped,
+                "failed": subscription.failed,
+                "queued": subscription.queue.qsize() if subscription.queue else len(subscription.pending)
+            }
+            for number, subscription in enumerate(self.subscriptions)
+        }
+
+
+#========================
+# Cross-process transport
+#========================
+
+
+# An EventBus only reaches subscribers in its own process. To spread the work over several cores, the publishing
+# process runs a ProcessPublisher: it listens on a Unix domain socket (a socket that is just a file path, only reachable
+# from the same machine, and a lot cheaper than TCP), and every event published through it is also sent to each
+# connected process. There, a ProcessSubscriber reads the events off the socket and republishes them into that
+# process's own EventBus, so subscribers on either side look exactly the same.
+#
+# Events cross the socket in a compact binary format instead of pickle. Each one is a "frame":
+#   header: length of the rest (4 bytes), time it was sent (8 bytes), length of the topic (2 bytes)
+#   body:   the topic in UTF-8, then the event, encoded with encodeValue() below
+# Frames are collected in a buffer and sent in batches, so a burst of small events doesn't cost one system call each.
+
+FRAME_HEADER = struct.Struct("!IqH")
+
+# one byte in front of every value says what it is; small numbers get smaller encodings
+NONE, TRUE, FALSE, INT8, INT32, INT64, BIG_INT, FLOAT, STRING, BYTES, LIST, DICT = b"NTFbiqIdsylm"
+INT_8 = struct.Struct("!b")
+INT_32 = struct.Struct("!i")
+INT_64 = struct.Struct("!q")
+FLOAT_64 = struct.Struct("!d")
+
+
+# Lengths are "varints": 7 bits per byte, with the top bit meaning "more bytes follow". Anything under 128 -- most
+# strings, lists and dicts in an event -- takes a single byte.
+
+def encodeLength(length: int, out: bytearray) -> None:
+    while length >= 0x80:
+        out.append((length & 0x7F) | 0x80)
+        length >>= 7
+    out.append(length)
+
+def decodeLength(data: memoryview, offset: int) -> tuple[int, int]:
+    length = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        length |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return length, offset
+        shift += 7
+
+
+def encodeValue(value: object, out: bytearray) -> None:
+    """ Supports None, bools, ints, floats, strings, bytes, lists/tuples and dicts of those. """
+    
+    if value is None:
+        out.append(NONE)
+    elif value is True:
+        out.append(TRUE)
+    elif value is False:
+        out.append(FALSE)
+    elif isinstance(value, int):
+        if -0x80 <= value < 0x80:
+            out.append(INT8)
+            out += INT_8.pack(value)
+        elif -0x8000_0000 <= value < 0x8000_0000:
+            out.append(INT32)
+            out += INT_32.pack(value)
+        elif -(1 << 63) <= value < (1 << 63):
+            out.append(INT64)
+            out += INT_64.pack(value)
+        else:
+            digits = str(value).encode()
+            out.append(BIG_INT)
+            encodeLength(len(digits), out)
+            out += digits
+    elif isinstance(value, float):
+        out.append(FLOAT)
+        out += FLOAT_64.pack(value)
+    elif isinstance(value, str):
+        data = value.encode()
+        out.append(STRING)
+        encodeLength(len(data), out)
+        out += data
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        # len() of a memoryview counts its items, which are only bytes when its format is "B"
+        data = memoryview(value)
+        data = data.cast("B") if data.c_contiguous else memoryview(data.tobytes())
+        out.append(BYTES)
+        encodeLength(data.nbytes, out)
+        out += data
+    elif isinstance(value, (list, tuple)):
+        out.append(LIST)
+        encodeLength(len(value), out)
+        for item in value:
+            encodeValue(item, out)
+    elif isinstance(value, dict):
+        out.append(DICT)
+        encodeLength(len(value), out)
+        for key, item in value.items():
+            encodeValue(key, out)
+            encodeValue(item, out)
+    else:
+        raise TypeError(f"can't encode {type(value).__name__} for another process")
+
+
+def decodeValue(data: memoryview, offset: int = 0) -> tuple[object, int]:
+    """ Returns the value starting at ``offset``, and the offset just past it. """
+    
+    tag = data[offset]
+    offset += 1
+    
+    if tag == NONE:
+        return None, offset
+    if tag == TRUE:
+        return True, offset
+    if tag == FALSE:
+        return False, offset
+    if tag == INT8:
+        return INT_8.unpack_from(data, offset)[0], offset + 1
+    if tag == INT32:
+        return INT_32.unpack_from(data, offset)[0], offset + 4
+    if tag == INT64:
+        return INT_64.unpack_from(data, offset)[0], offset + 8
+    if tag == FLOAT:
+        return FLOAT_64.unpack_from(data, offset)[0], offset + 8
+    
+    length, offset = decodeLength(data, offset)
+    
+    if tag == STRING:
+        return str(data[offset:offset + length], "utf-8"), offset + length
+    if tag == BIG_INT:
+        return int(str(data[offset:offset + length], "utf-8")), offset + length
+    if tag == BYTES:
+        return bytes(data[offset:offset + length]), offset + length
+    if tag == LIST:
+        items = []
+        for _ in range(length):
+            item, offset = decodeValue(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == DICT:
+        mapping = {}
+        for _ in range(length):
+            key, offset = decodeValue(data, offset)
+            mapping[key], offset = decodeValue(data, offset)
+        return mapping, offset
+    
+    raise ValueError(f"unknown type tag {tag!r} at offset {offset - 1}")
+
+
+def encodeFrame(topic: str, event: object, out: bytearray, sentNanoseconds: int) -> None:
+    """ :param sentNanoseconds: time.monotonic_ns() when the event was published, for measuring latency """
+    start = len(out)
+    topicData = topic.encode()
+    out += bytes(FRAME_HEADER.size)  # filled in once the length is known
+    out += topicData
+    encodeValue(event, out)
+    FRAME_HEADER.pack_into(out, start, len(out) - start - FRAME_HEADER.size, sentNanoseconds, len(topicData))
+
+
+class SubscriberConnection:
+    """
+    One connected process. Chunks wait in its own queue and its own thread writes them, so a process that reads slowly
+    only holds itself up instead of every other subscriber along with it.
+    """
+    
+    def __init__(self, connection: socket.socket, maxBacklog: int, sendTimeout: float):
+        self.connection = connection
+        self.maxBacklog = maxBacklog
+        self.sendTimeout = sendTimeout
+        self.backlog = 0  # bytes queued but not written yet
+        self.overSince: float | None = None  # when the backlog went over maxBacklog (None while it's under)
+        self.closed = False
+        self.chunks: SimpleQueue[bytearray | None] = SimpleQueue()
+        self.lock = threading.Lock()  # the backlog goes up in the publishing thread and down in the writing one
+        self.writer = threading.Thread(target=self._write, name="SubscriberConnection", daemon=True)
+        self.writer.start()
+    
+    def send(self, chunk: bytearray) -> bool:
+        """
+        Queues a chunk for writing, without ever waiting for this subscriber. Returns False once the connection is gone,
+        so the publisher can forget it.
+        """
+        
+        with self.lock:
+            if self.closed:
+                return False
+            
+            # Going over maxBacklog now and then is fine (a burst it will catch up on), but one that has stayed over it
+            # for sendTimeout isn't catching up, and buffering for it without a limit would eventually take all the
+            # memory, so it's cut off (it sees the connection close and can reconnect).
+            if self.backlog + len(chunk) <= self.maxBacklog:
+                self.overSince = None
+            elif self.overSince is None:
+                self.overSince = time.monotonic()
+            elif time.monotonic() - self.overSince > self.sendTimeout:
+                self.closed = True
+                try:
+                    self.connection.shutdown(socket.SHUT_RDWR)  # makes the writer's sendall() fail right away
+                except OSError:
+                    pass  # the writer has already closed it
+                self.chunks.put(None)
+                return False
+            
+            self.backlog += len(chunk)
+        self.chunks.put(chunk)
+        return True
+    
+    def _write(self) -> None:
+        while (chunk := self.chunks.get()) is not None:
+            try:
+                self.connection.sendall(chunk)
+            except OSError:
+                with self.lock:
+                    self.closed = True  # that process went away
+                break
+            with self.lock:
+                self.backlog -= len(chunk)
+        self.connection.close()
+    
+    def close(self) -> None:
+        """ Writes everything that's still queued, then closes the connection. """
+        
+        with self.lock:
+            self.closed = True
+        self.chunks.put(None)
+        self.writer.join()
+
+
+class ProcessPublisher:
+    """
+    Publishes to a local EventBus and to every process connected to ``path``.
+    
+    Frames are collected into chunks of ``flushBytes``, because one write per event would make sending cost much more
+    than encoding. A chunk is also sent once it's been waiting for ``maxDelay`` seconds, so a quiet stretch doesn't
+    leave the last few events sitting in the buffer until the next burst. Each subscriber can fall up to
+    ``maxBacklog`` bytes behind; one that stays further behind than that for ``sendTimeout`` seconds is disconnected.
+    Nothing ever waits for a subscriber, so a publisher that's faster than its subscribers for long enough will
+    disconnect them; give maxBacklog room for the bursts you expect.
+    """
+    
+    def __init__(self,
+                 bus: EventBus,
+                 path: str,
+                 flushBytes: int = 1 << 16,
+                 maxDelay: float = 0.005,
+                 maxBacklog: int = 1 << 26,
+                 sendTimeout: float = 5.0):
+        self.bus = bus
+        self.path = path
+        self.flushBytes = flushBytes
+        self.maxDelay = maxDelay
+        self.maxBacklog = maxBacklog
+        self.sendTimeout = sendTimeout
+        self.buffer = bytearray()
+        self.subscribers: list[SubscriberConnection] = []
+        self.lock = threading.Lock()  # the accepting thread adds subscribers while flush() sends to them
+        self.bufferLock = threading.Lock()  # the flushing thread sends the buffer while publish() adds to it
+        self.stopping = threading.Event()
+        
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen()
+        threading.Thread(target=self._accept, name="ProcessPublisher", daemon=True).start()
+        self.flusher = threading.Thread(target=self._flushPeriodically, name="ProcessPublisher flush", daemon=True)
+        self.flusher.start()
+    
+    def _accept(self) -> None:
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return  # the server socket was closed
+            with self.lock:
+                self.subscribers.append(SubscriberConnection(connection, self.maxBacklog, self.sendTimeout))
+    
+    def _flushPeriodically(self) -> None:
+        while not self.stopping.wait(self.maxDelay):
+            self.flush()
+    
+    def waitForSubscribers(self, count: int, timeout: float = 10.0) -> None:
+        deadline = time.monotonic() + timeout
+        while len(self.subscribers) < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"only {len(self.subscribers)} of {count} subscribers connected")
+            time.sleep(0.01)
+    
+    def publish(self, topic: str, event: object) -> None:
+        sentNanoseconds = time.monotonic_ns()
+        self.bus.publish(topic, event)
+        with self.bufferLock:
+            encodeFrame(topic, event, self.buffer, sentNanoseconds)
+            if len(self.buffer) >= self.flushBytes:
+                self._send()
+    
+    def flush(self) -> None:
+        with self.bufferLock:
+            self._send()
+    
+    def _send(self) -> None:
+        """ Hands the buffer to every subscriber's queue. Only call it while holding ``bufferLock``. """
+        
+        if not self.buffer:
+            return
+        
+        # the subscribers' threads write the chunk later, so it gets a new buffer rather than being cleared
+        chunk, self.buffer = self.buffer, bytearray()
+        with self.lock:
+            subscribers = list(self.subscribers)
+        gone = [subscriber for subscriber in subscribers if not subscriber.send(chunk)]
+        if gone:
+            with self.lock:
+                self.subscribers = [subscriber for subscriber in self.subscribers if subscriber not in gone]
+    
+    def close(self) -> None:
+        self.stopping.set()
+        self.flusher.join()
+        self.flush()
+        self.server.close()
+        with self.lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for subscriber in subscribers:
+            subscriber.close()
+        os.unlink(self.path)
+
+
+@dataclass
+class LatencyStats:
+    """ Time from publishing an event in one process to handing it to the bus in another, in microseconds. """
+    
+    samples: array = field(default_factory=lambda: array("d"))
+    
+    def add(self, microseconds: float) -> None:
+        self.samples.append(microseconds)
+    
+    def summary(self) -> dict[str, float]:
+        if len(self.samples) < 2:
+            return {"count": len(self.samples)}
+        percentiles = statistics.quantiles(self.samples, n=100)
+        return {
+            "count": len(self.samples),
+            "mean": round(statistics.fmean(self.samples), 1),
+            "p50": round(percentiles[49], 1),
+            "p99": round(percentiles[98], 1),
+            "max": round(max(self.samples), 1)
+        }
+
+
+class ProcessSubscriber:
+    """ Connects to a ProcessPublisher and republishes everything it receives into a local EventBus. """
+    
+    def __init__(self, bus: EventBus, path: str):
+        self.bus = bus
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(path)
+        self.reader = self.connection.makefile("rb", buffering=1 << 16)
+        self.latency = LatencyStats()
+        self.received = 0
+    
+    def receiveAll(self) -> None:
+        """ Keeps receiving until the publisher closes the connection. Call it from the thread that uses the bus. """
+        
+        header = bytearray(FRAME_HEADER.size)
+        
+        while self.reader.readinto(header) == FRAME_HEADER.size:
+            length, sentNanoseconds, topicLength = FRAME_HEADER.unpack(header)
+            data = self.reader.read(length)
+            if len(data) < length:
+                break  # the connection ended partway through a frame (the publisher closed or cut off this subscriber)
+            body = memoryview(data)
+            
+            topic = str(body[:topicLength], "utf-8")
+            event, _ = decodeValue(body, topicLength)
+            
+            # time.monotonic_ns() uses the same system-wide clock in every process on the machine
+            self.latency.add((time.monotonic_ns() - sentNanoseconds) / 1000)
+            self.received += 1
+            self.bus.publish(topic, event)
+        
+        self.reader.close()
+        self.connection.close()
+
+
+#=========
+# Examples
+#=========
+
+
+class OrderLogger:
+    def __init__(self, name: str):
+        self.name = name
+    
+    def onOrder(self, event: dict) -> None:
+        print(f"{self.name} saw order {event['id']}")
+    
+    def onOrders(self, events: list[dict]) -> None:
+        print(f"{self.name} saw a batch of {len(events)} orders")
+
+
+def syncExample() -> None:
+    bus = EventBus()
+    everything = OrderLogger("everything logger")
+    created = OrderLogger("created logger")
+    batched = OrderLogger("batch logger")
+    
+    bus.subscribe("orders.#", everything.onOrder)
+    bus.subscribe("orders.*.created", created.onOrder)
+    bus.subscribe("orders.#", batched.onOrders, batchSize=2)
+    
+    bus.publish("orders.web.created", {"id": 1})
+    bus.publish("orders.web.cancelled", {"id": 2})
+    bus.publish("orders", {"id": 3})
+    bus.flush()
+    
+    # nothing else refers to the created logger, so its subscription goes away along with it
+    del created
+    bus.publish("orders.phone.created", {"id": 4})
+    print(bus.stats())
+    print()
+
+
+async def asyncExample() -> None:
+    bus = EventBus(DispatchMode.ASYNC)
+    
+    async def slowHandler(event: int) -> None:
+        await asyncio.sleep(0.01)
+    
+    fastEvents: list[int] = []
+    bus.subscribe("ticks", slowHandler, queueSize=5, weak=False)
+    bus.subscribe("ticks", fastEvents.extend, batchSize=50, weak=False)
+    
+    for tick in range(100):
+        bus.publish("ticks", tick)  # never waits, even though the slow handler can't keep up
+    
+    await bus.drain()
+    print(f"fast subscriber got {len(fastEvents)} events", bus.stats())
+    await bus.close()
+    print()
+
+
+def benchmarkEventBus(deliveries: int = 1_000_000) -> None:
+    """ Events published per second with 1, 100 and 10,000 subscribers, keeping the total deliveries the same. """
+    
+    counter = [0]
+    
+    def countEvent(event) -> None:
+        counter[0] += 1
+    
+    def countBatch(events) -> None:
+        counter[0] += len(events)
+    
+    for subscriberCount in (1, 100, 10_000):
+        events = max(deliveries // subscriberCount, 10)
+        results = []
+        
+        bus = EventBus()
+        for number in range(subscriberCount):
+            bus.subscribe(f"sensors.{number % 10}.temperature" if number % 2 else "sensors.*.temperature", countEvent)
+        seconds = timeit(lambda: [bus.publish("sensors.3.temperature", number) for number in range(events)], number=1)
+        results.append(f"sync {events / seconds:>12,.0f}")
+        
+        bus = EventBus()
+        for _ in range(subscriberCount):
+            bus.subscribe("sensors.#", countBatch, batchSize=100)
+        seconds = timeit(lambda: bus.publishMany("sensors.3.temperature", list(range(events))), number=1)
+        results.append(f"sync batched {events / seconds:>12,.0f}")
+        
+        async def publishAsync() -> float:
+            bus = EventBus(DispatchMode.ASYNC)
+            for _ in range(subscriberCount):
+                bus.subscribe("sensors.*.temperature", countBatch, batchSize=100, queueSize=events)
+            seconds = timeit(lambda: [bus.publish("sensors.3.temperature", number) for number in range(events)], number=1)
+            await bus.drain()
+            await bus.close()
+            return seconds
+        
+        results.append(f"async {events / asyncio.run(publishAsync()):>12,.0f}")
+        print(f"{subscriberCount:>6} subscribers, events/sec: " + ", ".join(results))
+
+
+def runWorker(path: str, results: multiprocessing.Queue) -> None:
+    """ Runs in each worker process: counts the orders it receives from the publishing process. """
+    
+    bus = EventBus()
+    totals = {"orders": 0, "items": 0}
+    
+    def countOrder(event: dict) -> None:
+        totals["orders"] += 1
+        totals["items"] += len(event["items"])
+    
+    bus.subscribe("orders.#", countOrder, weak=False)
+    subscriber = ProcessSubscriber(bus, path)
+    subscriber.receiveAll()
+    results.put((os.getpid(), totals, subscriber.latency.summary()))
+
+
+def crossProcessExample(workers: int = 4, events: int = 100_000, eventsPerSecond: float | None = None) -> None:
+    """
+    Sends orders to worker processes, as fast as possible or at ``eventsPerSecond``. Flat out, the latency is mostly
+    time spent queued behind earlier events; at a steady rate the workers keep up, and it's mostly how long a frame
+    waits in the buffer before the time-based flush sends it.
+    """
+    
+    order = {"id": 12345, "customer": "Rick Sanchez", "total": 19.99, "items": ["portal gun", "fluid"], "rush": True}
+    encoded = bytearray()
+    encodeValue(order, encoded)
+    print(f"an order is {len(encoded)} bytes encoded, {len(pickle.dumps(order))} bytes pickled")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.sock")
+        publisher = ProcessPublisher(EventBus(), path)
+        
+        results: multiprocessing.Queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=runWorker, args=(path, results)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        publisher.waitForSubscribers(workers)
+        
+        started = time.perf_counter()
+        for number in range(events):
+            publisher.publish("orders.web.created", {**order, "id": number})
+            if eventsPerSecond:
+                time.sleep(max(started + (number + 1) / eventsPerSecond - time.perf_counter(), 0))
+        publisher.close()
+        
+        for _ in processes:
+            processId, totals, latency = results.get()
+            print(f"process {processId}: {totals}, latency (us): {latency}")
+        for process in processes:
+            process.join()
+        
+        seconds = time.perf_counter() - started
+        print(f"{events:,} events to {workers} processes: {events / seconds:,.0f} events/sec")
+
+
+if __name__ == "__main__":
+    syncExample()
+    asyncio.run(asyncExample())
+    benchmarkEventBus()
+    crossProcessExample()
+    crossProcessExample(events=10_000, eventsPerSecond=2_000)
@@ -1,6 +1,21 @@
 from abc import ABC, abstractmethod
-from random import shuffle
-from typing import Callable
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from heapq import heappop, heappush
+from itertools import count
+from random import Random, shuffle
+from timeit import timeit
+from typing import Callable, Iterable, Iterator, Sequence, TypeVar
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import tracemalloc
 
 
 
@@ -140,4 +155,520 @@ print()
 processTicketsWithFunctions(tickets, filoStrategy)
 print()
 processTicketsWithFunctions(tickets, randomStrategy)
-print()
\ No newline at end of file
+print()
+
+
+#=====================
+# Streaming strategies
+#=====================
+
+
+# The strategies above re-sort a copy of the whole list every time they are called, which is fine for a batch of 3
+# tickets, but not when tickets keep arriving while others are being worked on. A streaming strategy is a queue instead:
+# tickets are pushed in as they arrive and popped out one at a time, in O(1) (deque) or O(log n) (heap), without ever
+# touching the rest of the backlog.
+
+class StreamingStrategy(ABC):
+    
+    @abstractmethod
+    def push(self, ticket: Ticket) -> None: ...
+    
+    @abstractmethod
+    def pop(self) -> Ticket: ...
+    
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+
+class FIFOQueue(StreamingStrategy):
+    def __init__(self):
+        self.tickets: deque[Ticket] = deque()
+    
+    def push(self, ticket: Ticket) -> None:
+        self.tickets.append(ticket)
+    
+    def pop(self) -> Ticket:
+        return self.tickets.popleft()
+    
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+class FILOQueue(FIFOQueue):
+    def pop(self) -> Ticket:
+        return self.tickets.pop()
+
+
+class PriorityQueue(StreamingStrategy):
+    """ Lowest priority number first. Ties keep their arrival order, thanks to the running sequence number. """
+    
+    def __init__(self, priorityOf: Callable[[Ticket], float]):
+        self.priorityOf = priorityOf
+        self.heap: list[tuple[float, int, Ticket]] = []
+        self.sequence = count()
+    
+    def push(self, ticket: Ticket) -> None:
+        heappush(self.heap, (self.priorityOf(ticket), next(self.sequence), ticket))
+    
+    def pop(self) -> Ticket:
+        return heappop(self.heap)[2]
+    
+    def __len__(self) -> int:
+        return len(self.heap)
+
+class DeadlineQueue(PriorityQueue):
+    """ Earliest SLA deadline first, where the deadline is the arrival time plus the customer's allowed response time. """
+    
+    def __init__(self, slaSeconds: dict[str, float], defaultSlaSeconds: float = 86_400, clock: Callable[[], float] = time.monotonic):
+        super().__init__(lambda ticket: clock() + slaSeconds.get(ticket.customer, defaultSlaSeconds))
+
+
+class WeightedFairQueue(StreamingStrategy):
+    """
+    Shares the support team between customers according to their weights, so one customer filing a thousand tickets
+    can't starve everyone else. A customer with weight 2 gets served twice as often as one with weight 1 while both
+    have tickets waiting.
+    
+    Each ticket gets a "virtual finish time": the later of now (in virtual time) or when the customer's previous
+    ticket finishes, plus 1 / weight. Tickets are served in order of that time.
+    """
+    
+    def __init__(self, weights: dict[str, float], defaultWeight: float = 1.0):
+        self.weights = weights
+        self.defaultWeight = defaultWeight
+        self.heap: list[tuple[float, int, Ticket]] = []
+        self.sequence = count()
+        self.virtualTime = 0.0
+        self.lastFinish: dict[str, float] = {}
+    
+    def push(self, ticket: Ticket) -> None:
+        start = max(self.virtualTime, self.lastFinish.get(ticket.customer, 0.0))
+        finish = start + 1 / self.weights.get(ticket.customer, self.defaultWeight)
+        self.lastFinish[ticket.customer] = finish
+        heappush(self.heap, (finish, next(self.sequence), ticket))
+    
+    def pop(self) -> Ticket:
+        finish, _, ticket = heappop(self.heap)
+        self.virtualTime = finish
+        return ticket
+    
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+def processTicketsStreaming(arrivals: Iterable[list[Ticket]], strategy: StreamingStrategy, perArrival: int = 1) -> None:
+    """ After each group of new tickets arrives, handle ``perArrival`` of the waiting ones; then drain the rest. """
+    
+    for newTickets in arrivals:
+        for ticket in newTickets:
+            strategy.push(ticket)
+        
+        for _ in range(min(perArrival, len(strategy))):
+            print(strategy.pop())
+    
+    while strategy:
+        print(strategy.pop())
+
+
+print("Using weighted fair queue (Rick gets twice the share):")
+moreTickets = [Ticket(x, "Rick Sanchez" if x % 2 else "Morty Smith", "I got lost in space") for x in range(3, 7)]
+processTicketsStreaming([tickets, moreTickets], WeightedFairQueue({"Rick Sanchez": 2}))
+print()
+
+
+def benchmarkStreamingStrategies(ticketCount: int = 1_000_000) -> None:
+    """ Queues ``ticketCount`` tickets and then drains them, timing each strategy. """
+    
+    customers = [f"customer {number}" for number in range(1_000)]
+    generatedTickets = [Ticket(x, customers[x % len(customers)], "benchmark") for x in range(ticketCount)]
+    
+    strategies: dict[str, Callable[[], StreamingStrategy]] = {
+        "FIFO": FIFOQueue,
+        "FILO": FILOQueue,
+        "priority": lambda: PriorityQueue(lambda ticket: ticket.id % 5),
+        "deadline": lambda: DeadlineQueue({customers[0]: 60}),
+        "weighted fair": lambda: WeightedFairQueue({customers[0]: 10})
+    }
+    
+    for name, makeStrategy in strategies.items():
+        strategy = makeStrategy()
+        
+        started = time.perf_counter()
+        for ticket in generatedTickets:
+            strategy.push(ticket)
+        pushed = time.perf_counter()
+        while strategy:
+            strategy.pop()
+        popped = time.perf_counter()
+        
+        print(f"{name:>13}: push {ticketCount / (pushed - started):>12,.0f}/sec, pop {ticketCount / (popped - pushed):>12,.0f}/sec")
+
+
+
+
+#=====================================
+# Compact tickets and a columnar store
+#=====================================
+
+
+# Every Ticket object carries its own __dict__ (a whole dictionary per ticket), and the list strategies copy lists of
+# those objects around. With millions of tickets both add up, so there are two more compact options:
+#   - SlottedTicket: the same fields, but __slots__ instead of a __dict__ (dataclass(slots=True) generates them)
+#   - TicketStore: no ticket objects at all, just one column per field. Ids go in an array of 64-bit integers, and since
+#     the same customers and issues show up over and over, each string is stored once and the column only holds a
+#     small integer code pointing at it.
+# Strategies for the store return an ordering of row numbers (a permutation) rather than a reordered copy of tickets.
+
+@dataclass(slots=True)
+class SlottedTicket:
+    id: int
+    customer: str
+    issue: str
+    
+    __str__ = Ticket.__str__
+
+
+class TicketStore:
+    
+    def __init__(self):
+        self.ids = array("q")
+        self.customerCodes = array("I")
+        self.issueCodes = array("I")
+        self.strings: list[str] = []  # code -> string
+        self.codes: dict[str, int] = {}  # string -> code
+    
+    def _encode(self, text: str) -> int:
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self.strings)
+            self.strings.append(sys.intern(text))
+        return code
+    
+    def add(self, id: int, customer: str, issue: str) -> None:
+        self.ids.append(id)
+        self.customerCodes.append(self._encode(customer))
+        self.issueCodes.append(self._encode(issue))
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def customer(self, row: int) -> str:
+        return self.strings[self.customerCodes[row]]
+    
+    def issue(self, row: int) -> str:
+        return self.strings[self.issueCodes[row]]
+    
+    def ticket(self, row: int) -> SlottedTicket:
+        """ Builds a ticket object for one row, only when it's actually needed (e.g. to print it). """
+        return SlottedTicket(self.ids[row], self.customer(row), self.issue(row))
+
+
+# Strategies over the store: they return row numbers in the order they should be handled.
+
+def fifoRows(store: TicketStore) -> Sequence[int]:
+    return range(len(store))
+
+def filoRows(store: TicketStore) -> Sequence[int]:
+    return range(len(store) - 1, -1, -1)
+
+def randomRows(store: TicketStore) -> Sequence[int]:
+    rows = array("q", range(len(store)))  # 8 bytes per ticket instead of a list of object references plus the objects
+    shuffle(rows)  # type: ignore
+    return rows
+
+
+def processTicketStore(store: TicketStore, strategy: Callable[[TicketStore], Sequence[int]]) -> None:
+    for row in strategy(store):
+        print(store.ticket(row))
+
+
+store = TicketStore()
+for ticket in tickets:
+    store.add(ticket.id, ticket.customer, ticket.issue)
+
+print("Using FILO strategy on the ticket store:")
+processTicketStore(store, filoRows)
+print()
+
+
+def compareTicketMemory(ticketCount: int = 1_000_000) -> None:
+    """ Peak memory to hold ``ticketCount`` tickets each way, plus the time for a FILO pass over them. """
+    
+    customers = [f"customer {number}" for number in range(1_000)]
+    issues = [f"issue {number}" for number in range(100)]
+    
+    def buildObjects(ticketClass) -> list:
+        return [ticketClass(x, customers[x % 1_000], issues[x % 100]) for x in range(ticketCount)]
+    
+    def buildStore() -> TicketStore:
+        columns = TicketStore()
+        for x in range(ticketCount):
+            columns.add(x, customers[x % 1_000], issues[x % 100])
+        return columns
+    
+    for name, build, order in (
+        ("Ticket", lambda: buildObjects(Ticket), lambda built: [ticket.id for ticket in reversed(built)]),
+        ("SlottedTicket", lambda: buildObjects(SlottedTicket), lambda built: [ticket.id for ticket in reversed(built)]),
+        ("TicketStore", buildStore, lambda built: [built.ids[row] for row in filoRows(built)])
+    ):
+        tracemalloc.start()
+        built = build()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        
+        seconds = timeit(lambda: order(built), number=1)
+        print(f"{name:>13}: {peak / ticketCount:6.1f} bytes/ticket, FILO pass {ticketCount / seconds:>12,.0f} tickets/sec")
+        del built
+
+
+
+
+#=========================
+# Parallel ticket pipeline
+#=========================
+
+
+# processTicketsWithFunctions() handles one ticket at a time. In the pipeline version the strategy still decides the
+# order, but the tickets are handed to a pool of workers -- a ThreadPoolExecutor for handlers that mostly wait (network,
+# disk), or a ProcessPoolExecutor for handlers that mostly compute, since threads can't run Python code in parallel.
+#
+# Results come back either in the strategy's order (ordered=True, a slow ticket holds up the ones behind it) or as soon
+# as each one finishes. Only ``maxInFlight`` tickets are submitted at a time, so a huge backlog doesn't all end up
+# sitting in the executor's internal queue at once.
+
+Result = TypeVar("Result")
+
+
+@dataclass
+class PipelineStats:
+    tickets: int = 0
+    seconds: float = 0.0
+    perWorker: dict[str, list[float]] = field(default_factory=dict)  # worker -> [tickets handled, seconds busy]
+    
+    def record(self, worker: str, seconds: float) -> None:
+        handled = self.perWorker.setdefault(worker, [0, 0.0])
+        handled[0] += 1
+        handled[1] += seconds
+        self.tickets += 1
+    
+    def __str__(self):
+        rate = self.tickets / self.seconds if self.seconds else 0  # seconds is only filled in once the stream is done
+        lines = [f"{self.tickets} tickets in {self.seconds:.3f}s ({rate:,.0f}/sec)"]
+        for worker, (handled, busy) in sorted(self.perWorker.items()):
+            lines.append(f"    {worker}: {handled:.0f} tickets, {handled / busy if busy else 0:,.0f}/sec while busy")
+        return "\n".join(lines)
+
+
+def runTimed(handler: Callable[[Ticket], Result], ticket: Ticket) -> tuple[Result, str, float]:
+    """ Runs on the worker. Module-level (not a closure) so that it can be pickled and sent to worker processes. """
+    
+    started = time.perf_counter()
+    result = handler(ticket)
+    worker = f"process {os.getpid()}" if multiprocessing.parent_process() else threading.current_thread().name
+    return result, worker, time.perf_counter() - started
+
+
+def processTicketsInPipeline(
+        tickets: list[Ticket],
+        strategy: Callable[[list[Ticket]], list[Ticket]],
+        handler: Callable[[Ticket], Result],  # for a process pool this must be a module-level function
+        executor: Executor,
+        ordered: bool = True,
+        maxInFlight: int = 32,
+        stats: PipelineStats | None = None
+    ) -> Iterator[tuple[Ticket, Result]]:
+    
+    stats = stats if stats is not None else PipelineStats()
+    started = time.perf_counter()
+    inFlight: deque[tuple[Future, Ticket]] = deque()  # kept in submission (strategy) order
+    
+    def collect(future: Future, ticket: Ticket) -> tuple[Ticket, Result]:
+        result, worker, seconds = future.result()
+        stats.record(worker, seconds)
+        return ticket, result
+    
+    def nextDone() -> tuple[Ticket, Result]:
+        if ordered:
+            future, ticket = inFlight.popleft()  # wait for the oldest, even if newer ones are already done
+        else:
+            done, _ = wait([future for future, _ in inFlight], return_when=FIRST_COMPLETED)
+            future, ticket = next(pair for pair in inFlight if pair[0] in done)
+            inFlight.remove((future, ticket))
+        return collect(future, ticket)
+    
+    for ticket in strategy(tickets):
+        if len(inFlight) >= maxInFlight:
+            yield nextDone()  # backpressure: don't submit more until something finishes
+        inFlight.append((executor.submit(runTimed, handler, ticket), ticket))
+    
+    while inFlight:
+        yield nextDone()
+    
+    stats.seconds = time.perf_counter() - started
+
+
+def describeTicket(ticket: Ticket) -> str:
+    return str(ticket)
+
+def waitOnNetwork(ticket: Ticket) -> int:
+    time.sleep(0.01)
+    return ticket.id
+
+def crunchNumbers(ticket: Ticket) -> int:
+    return sum(number * number for number in range(50_000 + ticket.id))
+
+
+with ThreadPoolExecutor(max_workers=3) as threadPool:
+    for ticket, description in processTicketsInPipeline(tickets, filoStrategy, describeTicket, threadPool):
+        print(description)
+print()
+
+
+def benchmarkTicketPipeline(ticketCount: int = 200, workers: int = 4) -> None:
+    """ Serial handling against thread and process pools, for an I/O-bound and a CPU-bound handler. """
+    
+    generatedTickets = [Ticket(x, "Rick Sanchez", "benchmark") for x in range(ticketCount)]
+    
+    results = []
+    with redirect_stdout(io.StringIO()):  # hide the strategies' "Using ... strategy" lines
+        for handler in (waitOnNetwork, crunchNumbers):
+            serialSeconds = timeit(lambda: [handler(ticket) for ticket in fifoStrategy(generatedTickets)], number=1)
+            results.append(f"{handler.__name__}, serial: {ticketCount / serialSeconds:,.0f} tickets/sec")
+            
+            for executorClass in (ThreadPoolExecutor, ProcessPoolExecutor):
+                for ordered in (True, False):
+                    stats = PipelineStats()
+                    with executorClass(max_workers=workers) as executor:
+                        for _ in processTicketsInPipeline(generatedTickets, fifoStrategy, handler, executor, ordered, stats=stats):
+                            pass
+                    results.append(f"{handler.__name__}, {executorClass.__name__}, ordered={ordered}: {stats}")
+    
+    print("\n".join(results))
+
+
+
+
+#===========================
+# Adaptive strategy selector
+#===========================
+
+
+# Instead of the caller picking a strategy, AdaptiveStrategy tries the registered ones (objects or functions, both work)
+# on the live workload and learns which does best. Picking is a "multi-armed bandit" problem -- like a row of slot
+# machines with unknown payouts, where every pull spent testing a worse machine is a pull not spent on the best one.
+# The epsilon-greedy approach used here:
+#   - every strategy is tried once to get a first measurement
+#   - after that, the best-scoring strategy is used most of the time, and a random one ``epsilon`` of the time so the
+#     others keep getting re-measured
+#   - scores are exponential moving averages, so old measurements fade out and a change in load can flip the winner
+#
+# "Best" is whatever the ``score`` function says (higher is better) -- by default, the fastest sort.
+
+StrategyLike = Strategy | Callable[[list[Ticket]], list[Ticket]]
+
+
+@dataclass
+class ArmStats:
+    pulls: int = 0
+    score: float = 0.0  # moving average
+    latency: float = 0.0  # moving average, seconds
+
+
+class AdaptiveStrategy(Strategy):
+    
+    def __init__(self,
+        strategies: dict[str, StrategyLike],
+        score: Callable[[list[Ticket], float], float] = lambda sortedTickets, seconds: -seconds,
+        epsilon: float = 0.1,
+        smoothing: float = 0.2,
+        rng: Random | None = None
+    ):
+        """
+        :param score: Given the sorted tickets and how long the sort took, returns how good the result was.
+        :param smoothing: Weight of the newest measurement in the moving averages (higher adapts faster).
+        """
+        
+        # objects and functions are both stored as plain functions from here on
+        self.strategies = {
+            name: strategy.sort if isinstance(strategy, Strategy) else strategy
+            for name, strategy in strategies.items()
+        }
+        self.score = score
+        self.epsilon = epsilon
+        self.smoothing = smoothing
+        self.rng = rng or Random()
+        self.stats = {name: ArmStats() for name in strategies}
+        self.decisions: list[tuple[str, str, float]] = []  # (chosen strategy, why, score)
+    
+    def choose(self) -> tuple[str, str]:
+        untried = [name for name, arm in self.stats.items() if arm.pulls == 0]
+        if untried:
+            return untried[0], "untried"
+        if self.rng.random() < self.epsilon:
+            return self.rng.choice(list(self.strategies)), "explore"
+        return max(self.stats, key=lambda name: self.stats[name].score), "exploit"
+    
+    def sort(self, tickets: list[Ticket]) -> list[Ticket]:
+        name, reason = self.choose()
+        
+        started = time.perf_counter()
+        sortedTickets = self.strategies[name](tickets)
+        seconds = time.perf_counter() - started
+        
+        score = self.score(sortedTickets, seconds)
+        arm = self.stats[name]
+        if arm.pulls == 0:
+            arm.score, arm.latency = score, seconds
+        else:
+            arm.score += self.smoothing * (score - arm.score)
+            arm.latency += self.smoothing * (seconds - arm.latency)
+        arm.pulls += 1
+        
+        self.decisions.append((name, reason, score))
+        return sortedTickets
+    
+    # lets the same object be passed to processTicketsWithFunctions() as well
+    __call__ = sort
+    
+    def best(self) -> str:
+        return max(self.stats, key=lambda name: self.stats[name].score)
+
+
+# A workload where the right answer changes: Rick's tickets should be handled as early as possible. At first they arrive
+# at the end of each batch (FILO is best), then the load shifts and they arrive first (FIFO is best).
+
+def rickGoesFirst(sortedTickets: list[Ticket], seconds: float) -> float:
+    positions = [position for position, ticket in enumerate(sortedTickets) if ticket.customer == "Rick Sanchez"]
+    if not positions:
+        return 0.0  # no Rick in this batch, so any order is as good as any other
+    return -sum(positions) / len(positions)
+
+def makeBatch(rickFirst: bool) -> list[Ticket]:
+    batch = [Ticket(x, "Morty Smith", "I got lost in space") for x in range(8)]
+    ricks = [Ticket(x, "Rick Sanchez", "It doesn't print me money") for x in range(8, 10)]
+    return ricks + batch if rickFirst else batch + ricks
+
+
+adaptive = AdaptiveStrategy(
+    {"FIFO": FIFOStrategy(), "FILO": filoStrategy, "Random": randomStrategy},
+    score=rickGoesFirst,
+    epsilon=0.2,
+    rng=Random(42)
+)
+
+progress = []
+with redirect_stdout(io.StringIO()):  # hide the "Using ... strategy" line printed on every round
+    for roundNumber in range(200):
+        processTicketsWithObjects(makeBatch(rickFirst=roundNumber >= 100), adaptive)
+        if roundNumber in (99, 199):
+            progress.append(f"after round {roundNumber + 1} the best is {adaptive.best()}: {adaptive.stats}")
+print("\n".join(progress))
+
+print("last decisions:", adaptive.decisions[-5:])
+print()
+
+
+# the benchmarks take a while at full size, so they're skipped when this file is only imported
+if __name__ == "__main__":
+    benchmarkStreamingStrategies()
+    compareTicketMemory()
+    benchmarkTicketPipeline()
@@ -1,3 +1,30 @@
+from collections import Counter
+from collections.abc import Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from operator import methodcaller
+from timeit import timeit
+from typing import Iterable, Iterator, Sequence
+import os
+import random
+import re
+import tempfile
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy string arrays just aren't accepted then
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None  # same for Arrow arrays
+
+
+
 print("split()")
 string1 = "Lightning".split("-")  # ["Lightning"]
 string2 = "USB-A".split("-")  # ["USB", "A"]
@@ -8,3 +35,436 @@ print("replace()")
 string3 = "USB-A".replace("-", " - ")  # "USB - A"
 print()
 
+
+
+
+
+#========================
+# Batch string operations
+#========================
+
+# The calls above work on one string at a time. Normalizing a whole column of them (tens of millions of connector
+# names, say) with a loop like [value.strip().upper().replace("-", " - ") for value in column] runs the loop in Python
+# for every string. StringPipeline describes the steps once and then runs them a column at a time:
+#   - the steps are chained into a single function, each one a closure calling its method on what the steps before it
+#     returned, and map() runs it over the column. (Running each step over the whole column separately, as
+#     map(str.upper, column) and so on, sounds faster but isn't: every step builds another list of strings)
+#   - columns like these are mostly repeats (there are only so many connectors), so only the distinct values are
+#     worked out, and the results are remembered across batches; the column is then rebuilt from those with one more
+#     map(). The lists split() makes are copied on the way out, so changing one doesn't change every repeat of it (or
+#     the remembered result). A column that turns out to be mostly distinct values (judging by its first few thousand)
+#     skips all that, since there would be nothing to reuse
+#   - with an executor, the values still to be worked out are cut into chunks and worked out in other processes
+#   - NumPy string arrays go through numpy.char and Arrow arrays through pyarrow.compute, which already run a whole
+#     array in compiled code
+
+class StringPipeline:
+    
+    # each one takes the function doing the steps before it, and returns one that does this step too
+    STEPS = {
+        "split": lambda previous, separator, maxsplit: lambda value: previous(value).split(separator, maxsplit),
+        "replace": lambda previous, old, new: lambda value: previous(value).replace(old, new),
+        "strip": lambda previous, characters: lambda value: previous(value).strip(characters),
+        "lower": lambda previous: lambda value: previous(value).lower(),
+        "upper": lambda previous: lambda value: previous(value).upper(),
+        "title": lambda previous: lambda value: previous(value).title(),
+    }
+    
+    ARROW_STEPS = {
+        "split": lambda values, separator, maxsplit: (
+            pc.utf8_split_whitespace(values, max_splits=None if maxsplit < 0 else maxsplit) if separator is None
+            else pc.split_pattern(values, pattern=separator, max_splits=None if maxsplit < 0 else maxsplit)),
+        "replace": lambda values, old, new: pc.replace_substring(values, pattern=old, replacement=new),
+        "strip": lambda values, characters: (
+            pc.utf8_trim_whitespace(values) if characters is None else pc.utf8_trim(values, characters=characters)),
+        "lower": lambda values: pc.utf8_lower(values),
+        "upper": lambda values: pc.utf8_upper(values),
+        "title": lambda values: pc.utf8_title(values),
+    }
+    
+    def __init__(self, steps: Sequence[tuple[str, tuple]] = (), cacheSize: int = 1_000_000):
+        """
+        :param steps: (str method name, arguments) pairs; easier built with the methods below
+        :param cacheSize: how many distinct inputs to remember results for (0 to remember nothing)
+        """
+        self.steps = tuple(steps)
+        self.cacheSize = cacheSize
+        self.cache: dict[str, object] = {}
+        self.function = self._compile()
+    
+    def _compile(self):
+        """ One function doing every step to a single string, so no intermediate lists get built. """
+        
+        function = None
+        for operation, arguments in self.steps:
+            if operation not in self.STEPS:
+                raise ValueError(f"{operation!r} isn't an operation StringPipeline supports")
+            if function is None:
+                function = methodcaller(operation, *arguments)  # calls the method from C, with no Python function around it
+            else:
+                function = self.STEPS[operation](function, *arguments)
+        return function if function is not None else lambda value: value
+    
+    def _then(self, operation: str, *arguments) -> "StringPipeline":
+        if self.steps and self.steps[-1][0] == "split":
+            raise ValueError("split() turns each string into a list, so it has to be the last step")
+        return StringPipeline((*self.steps, (operation, arguments)), self.cacheSize)
+    
+    def split(self, separator: str | None = None, maxsplit: int = -1) -> "StringPipeline":
+        return self._then("split", separator, maxsplit)
+    
+    def replace(self, old: str, new: str) -> "StringPipeline":
+        return self._then("replace", old, new)
+    
+    def strip(self, characters: str | None = None) -> "StringPipeline":
+        return self._then("strip", characters)
+    
+    def lower(self) -> "StringPipeline":
+        return self._then("lower")
+    
+    def upper(self) -> "StringPipeline":
+        return self._then("upper")
+    
+    def title(self) -> "StringPipeline":
+        return self._then("title")
+    
+    def applyToList(self, values: list[str]) -> list:
+        """ Run the pipeline over a list, without the cache. """
+        return list(map(self.function, values))
+    
+    def _applyToNumpy(self, values: "np.ndarray") -> "np.ndarray":
+        for operation, arguments in self.steps:
+            if operation == "split":
+                separator, maxsplit = arguments
+                values = np.char.split(values, separator, None if maxsplit < 0 else maxsplit)
+            else:
+                values = getattr(np.char, operation)(values, *arguments)
+        return values
+    
+    def _applyToArrow(self, values):
+        for operation, arguments in self.steps:
+            values = self.ARROW_STEPS[operation](values, *arguments)
+        return values
+    
+    def __call__(self, values: Iterable[str], executor: Executor | None = None, chunkSize: int = 50_000):
+        """
+        Run the pipeline over a whole column.
+        
+        :param values: a list (or any iterable) of strings, a NumPy string array or an Arrow string array
+        :param executor: a process pool to work out new distinct values in, chunkSize of them per task
+        :return: the same kind of column, with each string replaced by its result
+        """
+        
+        if np is not None and isinstance(values, np.ndarray):
+            return self._applyToNumpy(values)
+        if pa is not None and isinstance(values, (pa.Array, pa.ChunkedArray)):
+            return self._applyToArrow(values)
+        
+        values = values if isinstance(values, list) else list(values)
+        sample = values[:5_000]
+        if self.cacheSize <= 0 or len(set(sample)) > len(sample) // 2:
+            return self._run(values, executor, chunkSize)
+        
+        cache = self.cache
+        missing = [value for value in dict.fromkeys(values) if value not in cache]
+        cache.update(zip(missing, self._run(missing, executor, chunkSize)))
+        column = list(map(cache.__getitem__, values))
+        if self.steps and self.steps[-1][0] == "split":
+            column = list(map(list.copy, column))  # every repeat gets its own list, not the remembered one
+        
+        if len(cache) > self.cacheSize:
+            # forget the oldest results first (a dict remembers the order things were put in)
+            for value in list(islice(cache, len(cache) - self.cacheSize)):
+                del cache[value]
+        return column
+    
+    def _run(self, values: list[str], executor: Executor | None, chunkSize: int) -> list:
+        if executor is None or len(values) <= chunkSize:
+            return self.applyToList(values)
+        chunks = [values[start:start + chunkSize] for start in range(0, len(values), chunkSize)]
+        return [result for chunkResults in executor.map(self.applyToList, chunks) for result in chunkResults]
+    
+    def __reduce__(self):
+        # only the steps get sent to other processes; the compiled function can't be pickled, and the cache stays here
+        return StringPipeline, (self.steps, self.cacheSize)
+    
+    def __repr__(self):
+        return "StringPipeline()" + "".join(f".{operation}({', '.join(map(repr, arguments))})" for operation, arguments in self.steps)
+
+
+print("batch operations over a column")
+normalize = StringPipeline().strip().upper().replace("-", " - ")
+connectors = ["usb-a ", " USB-C", "Lightning", "usb-a ", "hdmi"]
+print(normalize, normalize(connectors))
+print(StringPipeline().strip().split("-")(connectors))
+print()
+
+
+def benchmarkStringPipeline(size: int = 2_000_000, distinct: int = 500) -> None:
+    """ Strings per second for a per-string loop against StringPipeline, with and without repeats and processes. """
+    
+    rng = random.Random(3)
+    names = [f"{rng.choice(['usb', 'hdmi', 'dp', 'rj'])}-{rng.choice('abc')}{index} " for index in range(distinct)]
+    repetitive = [rng.choice(names) for _ in range(size)]
+    allDistinct = [f" usb-c{index} " for index in range(size)]
+    
+    def loop(column: list[str]) -> list:
+        return [value.strip().upper().replace("-", " - ").split(" - ") for value in column]
+    
+    pipeline = StringPipeline().strip().upper().replace("-", " - ").split(" - ")
+    assert pipeline(repetitive) == loop(repetitive)
+    
+    for name, column in ((f"{distinct} distinct values", repetitive), ("all distinct", allDistinct)):
+        print(f"{size:,} strings, {name}:")
+        candidates = {
+            "per-string loop": lambda: loop(column),
+            "StringPipeline, no cache": lambda: StringPipeline(pipeline.steps, cacheSize=0)(column),
+            "StringPipeline, cold cache": lambda: StringPipeline(pipeline.steps)(column),
+            "StringPipeline, warm cache": lambda: pipeline(column),
+        }
+        for label, run in candidates.items():
+            seconds = timeit(run, number=1)
+            print(f"    {label:<28} {size / seconds:>12,.0f} strings/sec")
+    
+    with ProcessPoolExecutor() as executor:
+        seconds = timeit(lambda: StringPipeline(pipeline.steps)(allDistinct, executor=executor), number=1)
+        print(f"    {'StringPipeline, processes':<28} {size / seconds:>12,.0f} strings/sec "
+              f"(gains need more than one core, and the strings still have to be pickled both ways)")
+
+
+
+
+
+#==========================
+# Multi-pattern replacement
+#==========================
+
+# replace() handles one pattern. With a table of 500 replacement rules, calling replace() for each rule goes over the
+# whole text 500 times. MultiReplacer compiles the whole table into one regular expression, so re.sub() finds every
+# rule in a single pass, in C:
+#   - the patterns are merged into a trie first ("USB-A", "USB-C" and "USB" become USB(?:-[AC])?), so at each position
+#     the regex engine follows one path of characters instead of trying all 500 alternatives one after the other.
+#     Where one pattern continues another, the longer one is tried first, so the longest match wins
+#   - one pass also means replacements are never themselves replaced by a later rule, which a chain of replace()
+#     calls does (usually by accident)
+#   - replaceStream() works through text in chunks (a huge file, say) without ever having all of it in memory. A
+#     match can straddle two chunks, so the last (longest pattern - 1) characters of each chunk are held back and
+#     go in front of the next one; only matches that start early enough to be complete are replaced straight away
+
+def trieRegex(words: Iterable[str]) -> str:
+    """ A regex matching any of the words, with shared prefixes merged and longer words preferred. """
+    
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for character in word:
+            node = node.setdefault(character, {})
+        node[""] = {}  # a word ends here
+    
+    def render(node: dict) -> str:
+        children = {character: child for character, child in node.items() if character}
+        if not children:
+            return ""
+        
+        branches = [re.escape(character) + render(child) for character, child in children.items()]
+        if len(branches) == 1:
+            body = branches[0]
+        elif all(len(character) == 1 and child.keys() == {""} for character, child in children.items()):
+            body = "[" + "".join(re.escape(character) for character in children) + "]"  # only single characters left
+        else:
+            body = "(?:" + "|".join(branches) + ")"
+        
+        if "" in node:
+            # a word could also end right here; the ? is greedy, so the longer words get tried first
+            return f"(?:{body})?" if len(branches) > 1 or len(body) > 1 else f"{body}?"
+        return body
+    
+    return render(trie)
+
+
+@dataclass
+class ReplaceStats:
+    characters: int = 0
+    replacements: int = 0
+    seconds: float = 0.0
+    
+    @property
+    def charactersPerSecond(self) -> float:
+        return self.characters / self.seconds if self.seconds else 0.0
+
+
+class MultiReplacer:
+    
+    def __init__(self, rules: Mapping[str, str] | Iterable[tuple[str, str]], ignoreCase: bool = False):
+        """
+        :param rules: what to replace -> what to replace it with
+        :param ignoreCase: match the patterns in any case (the replacement is used as given)
+        """
+        
+        self.rules = dict(rules)
+        if "" in self.rules:
+            raise ValueError("can't replace an empty string")
+        
+        self.ignoreCase = ignoreCase
+        self.lookup = {old.casefold() if ignoreCase else old: new for old, new in self.rules.items()}
+        self.found: dict[str, str] = {}  # matched text -> replacement, for text _findRule() has worked out
+        if ignoreCase:
+            # casefold() puts more strings together than IGNORECASE matches: "ß" and "ss" both fold to "ss", but "ß"
+            # only matches "ß" and "ẞ". Folded keys that more than one rule shares would hand every one of those rules'
+            # matches the same replacement, so they're left out, and their matches go through _findRule() instead.
+            folds = Counter(old.casefold() for old in self.rules)
+            self.lookup = {folded: new for folded, new in self.lookup.items() if folds[folded] == 1}
+        self.longest = max(map(len, self.rules), default=0)
+        # built from the rules as written, not from the folded keys: folding can change a string's length ("İ" folds to
+        # "i" plus a combining dot), and replaceStream() relies on matches being no longer than the longest rule
+        self.pattern = re.compile(trieRegex(self.rules) if self.rules else "(?!)", re.IGNORECASE if ignoreCase else 0)
+        
+        lookup = self.lookup
+        if ignoreCase:
+            def replacement(match: re.Match) -> str:
+                try:
+                    return lookup[match[0].casefold()]
+                except KeyError:
+                    return self._findRule(match[0])
+            self.replacement = replacement
+        else:
+            self.replacement = lambda match: lookup[match[0]]
+    
+    def _findRule(self, matched: str) -> str:
+        """
+        The replacement for matched text whose casefold() isn't in the lookup: either several rules fold the same, or
+        the text folds differently from the rule it matched (IGNORECASE compares one character at a time, so "i"
+        matches a rule's "İ" even though their casefold() differs). This finds the rule the slow way and remembers it.
+        """
+        
+        try:
+            return self.found[matched]
+        except KeyError:
+            pass
+        for old, new in reversed(self.rules.items()):  # later rules win, as they would in a dict
+            if re.fullmatch(re.escape(old), matched, re.IGNORECASE):
+                self.found[matched] = new
+                return new
+        raise KeyError(matched)
+    
+    def replace(self, text: str) -> str:
+        return self.pattern.sub(self.replacement, text)
+    
+    def replaceCounting(self, text: str) -> tuple[str, int]:
+        return self.pattern.subn(self.replacement, text)
+    
+    def findAll(self, text: str) -> Iterator[tuple[int, str]]:
+        """ Where each pattern occurs in the text, and which one it is. """
+        for match in self.pattern.finditer(text):
+            yield match.start(), match[0]
+    
+    def count(self, text: str) -> Counter:
+        return Counter(match.casefold() if self.ignoreCase else match for match in self.pattern.findall(text))
+    
+    def replaceStream(self, chunks: Iterable[str], stats: ReplaceStats | None = None) -> Iterator[str]:
+        """ Replace across a stream of chunks, as if they were one string, yielding the replaced text bit by bit. """
+        
+        stats = ReplaceStats() if stats is None else stats
+        carried = ""
+        for chunk in chunks:
+            stats.characters += len(chunk)
+            text = carried + chunk
+            # a match starting before here fits in the text, so it's the same match the whole string would give
+            limit = len(text) - self.longest + 1
+            
+            parts = []
+            position = 0
+            for match in self.pattern.finditer(text):
+                if match.start() >= limit:
+                    break
+                parts.append(text[position:match.start()])
+                parts.append(self.replacement(match))
+                position = match.end()
+                stats.replacements += 1
+            
+            if position < limit:
+                parts.append(text[position:limit])  # no match starts in here, or the loop would have stopped on it
+            carried = text[max(position, limit):]
+            yield "".join(parts)
+        
+        text, replacements = self.replaceCounting(carried)
+        stats.replacements += replacements
+        yield text
+    
+    def replaceFile(self, source: str, destination: str, chunkSize: int = 1 << 20, encoding: str = "utf-8") -> ReplaceStats:
+        stats = ReplaceStats()
+        started = time.perf_counter()
+        with open(source, encoding=encoding, newline="") as reader, open(destination, "w", encoding=encoding, newline="") as writer:
+            chunks = iter(lambda: reader.read(chunkSize), "")
+            writer.writelines(self.replaceStream(chunks, stats))
+        stats.seconds = time.perf_counter() - started
+        return stats
+    
+    def __repr__(self):
+        return f"MultiReplacer({len(self.rules)} rules, longest {self.longest} characters)"
+
+
+print("replacing many patterns at once")
+connectorNames = MultiReplacer({"USB-A": "USB Type-A", "USB-C": "USB Type-C", "USB": "Universal Serial Bus", "HDMI": "High-Definition Multimedia Interface"})
+print(connectorNames, connectorNames.pattern.pattern)
+print(connectorNames.replace("USB-C to USB-A, USB hub, HDMI"))
+print("".join(connectorNames.replaceStream(["USB-C to US", "B-A, USB hu", "b, HD", "MI"])))
+print()
+
+
+def benchmarkMultiReplace(ruleCount: int = 500, megabytes: int = 20) -> None:
+    """ Characters per second for a chain of replace() calls against MultiReplacer, in memory and streaming a file. """
+    
+    rng = random.Random(9)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    rules = {}
+    while len(rules) < ruleCount:
+        word = "".join(rng.choices(letters, k=rng.randint(3, 10)))
+        rules[word] = word.upper()
+    vocabulary = [*rules, *("".join(rng.choices(letters, k=rng.randint(2, 9))) for _ in range(5 * ruleCount))]
+    
+    words = []
+    length = 0
+    while length < megabytes * 1_000_000:
+        words.append(rng.choice(vocabulary))
+        length += len(words[-1]) + 1
+    text = " ".join(words)
+    
+    def replaceOneByOne(text: str) -> str:
+        for old, new in rules.items():
+            text = text.replace(old, new)
+        return text
+    
+    started = time.perf_counter()
+    replacer = MultiReplacer(rules)
+    result = replacer.replace(text)
+    trieSeconds = time.perf_counter() - started
+    
+    # the other two are slow enough that a tenth of the text will do
+    sample = text[:len(text) // 10]
+    chainSeconds = timeit(lambda: replaceOneByOne(sample), number=1)
+    started = time.perf_counter()
+    plainAlternation = re.compile("|".join(map(re.escape, sorted(rules, key=len, reverse=True))))
+    alternationResult = plainAlternation.sub(lambda match: rules[match[0]], sample)
+    alternationSeconds = time.perf_counter() - started
+    assert alternationResult == replacer.replace(sample)
+    
+    print(f"{ruleCount} rules over {len(text) / 1e6:.0f} million characters:")
+    print(f"    one replace() per rule   {len(sample) / chainSeconds / 1e6:8.1f} million characters/sec")
+    print(f"    plain alternation regex  {len(sample) / alternationSeconds / 1e6:8.1f} million characters/sec")
+    print(f"    MultiReplacer (trie)     {len(text) / trieSeconds / 1e6:8.1f} million characters/sec")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        source, destination = os.path.join(directory, "in.txt"), os.path.join(directory, "out.txt")
+        with open(source, "w", encoding="utf-8", newline="") as file:
+            file.write(text)
+        stats = replacer.replaceFile(source, destination, chunkSize=64 * 1024)
+        with open(destination, encoding="utf-8", newline="") as file:
+            matches = file.read() == result
+    print(f"    streaming a file, 64 KB chunks: {stats.charactersPerSecond / 1e6:.1f} million characters/sec, "
+          f"{stats.replacements:,} replacements, same result as in memory: {matches}")
+
+
+if __name__ == "__main__":
+    benchmarkStringPipeline()
+    benchmarkMultiReplace()
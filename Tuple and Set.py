@@ -1,3 +1,29 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, MutableSet
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from timeit import timeit
+import hashlib
+import math
+import mmap
+import os
+import pickle
+import random
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # the batch methods of the filters fall back to plain loops
+
+
+
 # Tuple
 # Essentially, immutable version of a list.
 
@@ -25,3 +51,1162 @@ try:
     s[0]  # type: ignore
 except TypeError:
     print("sets do not support indexing (subscripting)")
+
+
+
+
+#========================
+# Compressed integer sets
+#========================
+
+# A set of ints costs a hash table slot plus an int object per value, well over 30 bytes each, so hundreds of millions of
+# user IDs don't fit. RoaringSet (after "roaring bitmaps") stores non-negative ints much tighter. Each value is split in
+# two: the high bits pick a chunk of 65,536 possible values, and the low 16 bits are stored in that chunk's container,
+# which is whichever of three shapes is smallest for what's in it:
+#   - ArrayContainer: a sorted array of 2-byte values, for chunks with up to 4,096 values
+#   - BitmapContainer: one bit for each of the 65,536 possible values (8 KB), for fuller chunks. The bits are kept in a
+#     single Python int, so union/intersection/difference of two bitmaps is one |, & or & ~ done in C, and
+#     int.bit_count() counts them
+#   - RunContainer: (start, length) pairs, for chunks made of long stretches of consecutive values. Nothing is turned
+#     into runs until runOptimize() is called, usually once the set is built
+# Set algebra works one chunk at a time, and chunks only one side has are skipped (intersection) or copied whole
+# (union, difference), so the cost follows the number of chunks rather than the number of values.
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+LOW_MASK = CHUNK_SIZE - 1
+BITMAP_BYTES = CHUNK_SIZE // 8
+ARRAY_LIMIT = 4096  # past this many values, an array of 2-byte values is bigger than the 8 KB bitmap
+VALUE_LIMIT = 1 << (32 + CHUNK_BITS)  # chunk numbers are saved as 4-byte ints, so values must stay below 2^48
+
+# the positions of the set bits in every possible byte, so bitmaps can be turned back into values a byte at a time
+BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def setBits(bits: int) -> Iterator[int]:
+    """ Positions of the set bits of a chunk's bitmap, in increasing order. """
+    for byteIndex, byte in enumerate(bits.to_bytes(BITMAP_BYTES, "little")):
+        if byte:
+            base = byteIndex << 3
+            for bit in BYTE_BITS[byte]:
+                yield base | bit
+
+
+def littleEndian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class ArrayContainer:
+    kind = 0
+    __slots__ = ("values",)
+    
+    def __init__(self, values: array):
+        self.values = values  # a sorted array("H")
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def __contains__(self, low: int) -> bool:
+        index = bisect_left(self.values, low)
+        return index < len(self.values) and self.values[index] == low
+    
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.values)
+    
+    def toBits(self) -> int:
+        buffer = bytearray(BITMAP_BYTES)
+        for low in self.values:
+            buffer[low >> 3] |= 1 << (low & 7)
+        return int.from_bytes(buffer, "little")
+    
+    def copy(self) -> "ArrayContainer":
+        return ArrayContainer(array("H", self.values))
+    
+    @property
+    def nbytes(self) -> int:
+        return 2 * len(self.values)
+    
+    def payload(self) -> tuple[int, bytes]:
+        return len(self.values), littleEndian(self.values)
+
+
+class BitmapContainer:
+    kind = 1
+    __slots__ = ("bits", "cardinality")
+    
+    def __init__(self, bits: int, cardinality: int):
+        self.bits = bits
+        self.cardinality = cardinality
+    
+    def __len__(self) -> int:
+        return self.cardinality
+    
+    def __contains__(self, low: int) -> bool:
+        return self.bits >> low & 1 == 1
+    
+    def __iter__(self) -> Iterator[int]:
+        return setBits(self.bits)
+    
+    def toBits(self) -> int:
+        return self.bits
+    
+    def copy(self) -> "BitmapContainer":
+        return self  # ints can't be changed, so this one can be shared
+    
+    @property
+    def nbytes(self) -> int:
+        return BITMAP_BYTES
+    
+    def payload(self) -> tuple[int, bytes]:
+        return self.cardinality, self.bits.to_bytes(BITMAP_BYTES, "little")
+
+
+class RunContainer:
+    kind = 2
+    __slots__ = ("starts", "lengths", "cardinality")
+    
+    def __init__(self, starts: array, lengths: array):
+        self.starts = starts  # array("H") of where each run begins
+        self.lengths = lengths  # array("H") of each run's length minus one, so a full chunk of 65,536 still fits
+        self.cardinality = sum(lengths) + len(lengths)
+    
+    def __len__(self) -> int:
+        return self.cardinality
+    
+    def __contains__(self, low: int) -> bool:
+        index = bisect_right(self.starts, low) - 1
+        return index >= 0 and low <= self.starts[index] + self.lengths[index]
+    
+    def __iter__(self) -> Iterator[int]:
+        for start, length in zip(self.starts, self.lengths):
+            yield from range(start, start + length + 1)
+    
+    def toBits(self) -> int:
+        bits = 0
+        for start, length in zip(self.starts, self.lengths):
+            bits |= ((1 << (length + 1)) - 1) << start
+        return bits
+    
+    def copy(self) -> "RunContainer":
+        return self  # runs are never changed in place (adding to one rebuilds the container)
+    
+    @property
+    def nbytes(self) -> int:
+        return 4 * len(self.starts)
+    
+    def payload(self) -> tuple[int, bytes]:
+        return len(self.starts), littleEndian(self.starts) + littleEndian(self.lengths)
+
+
+Container = ArrayContainer | BitmapContainer | RunContainer
+
+
+def fromBits(bits: int) -> Container | None:
+    """ The array or bitmap container holding exactly these bits (None for no bits at all). """
+    
+    cardinality = bits.bit_count()
+    if cardinality == 0:
+        return None
+    if cardinality <= ARRAY_LIMIT:
+        return ArrayContainer(array("H", setBits(bits)))
+    return BitmapContainer(bits, cardinality)
+
+
+def fromSortedLows(lows: list[int]) -> Container:
+    """ The array or bitmap container for a sorted list of low halves (duplicates allowed). """
+    
+    if len(lows) <= ARRAY_LIMIT:
+        return ArrayContainer(array("H", dict.fromkeys(lows)))
+    buffer = bytearray(BITMAP_BYTES)
+    for low in lows:
+        buffer[low >> 3] |= 1 << (low & 7)
+    return fromBits(int.from_bytes(buffer, "little"))
+
+
+def runCount(container: Container) -> int:
+    if isinstance(container, ArrayContainer):
+        values = container.values
+        return 1 + sum(1 for previous, low in zip(values, values[1:]) if low != previous + 1)
+    bits = container.toBits()
+    return (bits & ~(bits << 1)).bit_count()  # a run starts wherever a set bit has no set bit just below it
+
+
+def runsOf(container: Container) -> RunContainer:
+    bits = container.toBits()
+    starts = array("H", setBits(bits & ~(bits << 1)))
+    ends = setBits(bits & ~(bits >> 1))
+    return RunContainer(starts, array("H", (end - start for start, end in zip(starts, ends))))
+
+
+class RoaringSet(MutableSet):
+    
+    HEADER = struct.Struct("<4sI")  # magic, number of containers
+    CONTAINER_HEADER = struct.Struct("<IBI")  # chunk, kind, number of values (or runs)
+    MAGIC = b"RST1"
+    
+    def __init__(self, values: Iterable[int] = ()):
+        self.containers: dict[int, Container] = {}
+        
+        ordered = sorted(values)
+        if ordered and (ordered[0] < 0 or ordered[-1] >= VALUE_LIMIT):
+            raise ValueError(f"RoaringSet only holds ints from 0 up to 2^{32 + CHUNK_BITS}")
+        
+        # sorted, so every chunk's values sit next to each other; find where each chunk ends with a binary search
+        start = 0
+        while start < len(ordered):
+            chunk = ordered[start] >> CHUNK_BITS
+            end = bisect_left(ordered, (chunk + 1) << CHUNK_BITS, start)
+            self.containers[chunk] = fromSortedLows([value & LOW_MASK for value in ordered[start:end]])
+            start = end
+    
+    @classmethod
+    def _fromContainers(cls, containers: dict[int, Container]) -> "RoaringSet":
+        result = cls()
+        result.containers = containers
+        return result
+    
+    def __len__(self) -> int:
+        return sum(map(len, self.containers.values()))
+    
+    def __contains__(self, value: int) -> bool:
+        try:
+            container = self.containers.get(value >> CHUNK_BITS)
+        except TypeError:
+            return False  # not an int, so it can't be in here (like "a" in {1, 2})
+        return container is not None and (value & LOW_MASK) in container
+    
+    def __iter__(self) -> Iterator[int]:
+        for chunk in sorted(self.containers):
+            base = chunk << CHUNK_BITS
+            for low in self.containers[chunk]:
+                yield base | low
+    
+    def add(self, value: int) -> None:
+        if not 0 <= value < VALUE_LIMIT:
+            raise ValueError(f"RoaringSet only holds ints from 0 up to 2^{32 + CHUNK_BITS}")
+        
+        chunk, low = value >> CHUNK_BITS, value & LOW_MASK
+        container = self.containers.get(chunk)
+        if container is None:
+            self.containers[chunk] = ArrayContainer(array("H", [low]))
+        elif low not in container:
+            if isinstance(container, ArrayContainer) and len(container) < ARRAY_LIMIT:
+                container.values.insert(bisect_left(container.values, low), low)
+            else:
+                self.containers[chunk] = fromBits(container.toBits() | (1 << low))
+    
+    def discard(self, value: int) -> None:
+        chunk, low = value >> CHUNK_BITS, value & LOW_MASK
+        container = self.containers.get(chunk)
+        if container is None or low not in container:
+            return
+        
+        if isinstance(container, ArrayContainer):
+            del container.values[bisect_left(container.values, low)]
+            remaining = container if container.values else None
+        else:
+            remaining = fromBits(container.toBits() & ~(1 << low))
+        
+        if remaining is None:
+            del self.containers[chunk]
+        else:
+            self.containers[chunk] = remaining
+    
+    def __or__(self, other: "RoaringSet") -> "RoaringSet":
+        if not isinstance(other, RoaringSet):
+            return super().__or__(other)  # the Set mixin handles other sets, one value at a time
+        
+        containers = {chunk: container.copy() for chunk, container in self.containers.items()}
+        for chunk, theirs in other.containers.items():
+            mine = containers.get(chunk)
+            if mine is None:
+                containers[chunk] = theirs.copy()
+            elif isinstance(mine, ArrayContainer) and isinstance(theirs, ArrayContainer) and len(mine) + len(theirs) <= ARRAY_LIMIT:
+                containers[chunk] = ArrayContainer(array("H", sorted(set(mine.values).union(theirs.values))))
+            else:
+                containers[chunk] = fromBits(mine.toBits() | theirs.toBits())
+        return self._fromContainers(containers)
+    
+    def __and__(self, other: "RoaringSet") -> "RoaringSet":
+        if not isinstance(other, RoaringSet):
+            return super().__and__(other)  # the Set mixin handles other sets, one value at a time
+        
+        containers = {}
+        for chunk in self.containers.keys() & other.containers.keys():
+            mine, theirs = self.containers[chunk], other.containers[chunk]
+            if isinstance(mine, ArrayContainer) and isinstance(theirs, ArrayContainer):
+                common = set(mine.values).intersection(theirs.values)
+                container = ArrayContainer(array("H", sorted(common))) if common else None
+            elif isinstance(mine, ArrayContainer) or isinstance(theirs, ArrayContainer):
+                # a short array against anything else: just look each of its values up
+                small, big = (mine, theirs) if isinstance(mine, ArrayContainer) else (theirs, mine)
+                common = array("H", [low for low in small.values if low in big])
+                container = ArrayContainer(common) if common else None
+            else:
+                container = fromBits(mine.toBits() & theirs.toBits())
+            if container is not None:
+                containers[chunk] = container
+        return self._fromContainers(containers)
+    
+    def __sub__(self, other: "RoaringSet") -> "RoaringSet":
+        if not isinstance(other, RoaringSet):
+            return super().__sub__(other)  # the Set mixin handles other sets, one value at a time
+        
+        containers = {}
+        for chunk, mine in self.containers.items():
+            theirs = other.containers.get(chunk)
+            if theirs is None:
+                container = mine.copy()
+            elif isinstance(mine, ArrayContainer):
+                remaining = array("H", [low for low in mine.values if low not in theirs])
+                container = ArrayContainer(remaining) if remaining else None
+            else:
+                container = fromBits(mine.toBits() & ~theirs.toBits())
+            if container is not None:
+                containers[chunk] = container
+        return self._fromContainers(containers)
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RoaringSet):
+            return super().__eq__(other)
+        return self.containers.keys() == other.containers.keys() and all(
+            len(container) == len(other.containers[chunk]) and container.toBits() == other.containers[chunk].toBits()
+            for chunk, container in self.containers.items()
+        )
+    
+    __hash__ = None  # it's mutable, like set
+    
+    @staticmethod
+    def _members(values: Iterable) -> "RoaringSet":
+        """ The values that could be in a RoaringSet, as one. Anything else can't be in both, so it's left out. """
+        if isinstance(values, RoaringSet):
+            return values
+        return RoaringSet(value for value in values if isinstance(value, int) and 0 <= value < VALUE_LIMIT)
+    
+    # like set's methods of the same names, these take any number of iterables, where the operators only take sets
+    
+    def union(self, *others: Iterable[int]) -> "RoaringSet":
+        return self.unionAll([self, *(other if isinstance(other, RoaringSet) else RoaringSet(other) for other in others)])
+    
+    def intersection(self, *others: Iterable) -> "RoaringSet":
+        result = self.union()
+        for other in others:
+            result &= self._members(other)
+        return result
+    
+    def difference(self, *others: Iterable) -> "RoaringSet":
+        result = self.union()
+        for other in others:
+            result -= self._members(other)
+        return result
+    
+    def intersectionSize(self, other: "RoaringSet") -> int:
+        """ len(self & other), without building the intersection. """
+        
+        total = 0
+        for chunk in self.containers.keys() & other.containers.keys():
+            mine, theirs = self.containers[chunk], other.containers[chunk]
+            if isinstance(mine, ArrayContainer) and isinstance(theirs, ArrayContainer):
+                total += len(set(mine.values).intersection(theirs.values))
+            elif isinstance(mine, ArrayContainer) or isinstance(theirs, ArrayContainer):
+                small, big = (mine, theirs) if isinstance(mine, ArrayContainer) else (theirs, mine)
+                total += sum(1 for low in small.values if low in big)
+            else:
+                total += (mine.toBits() & theirs.toBits()).bit_count()
+        return total
+    
+    @classmethod
+    def unionAll(cls, sets: Iterable["RoaringSet"]) -> "RoaringSet":
+        """ The union of any number of sets, ORing each chunk's bits together once instead of one pair at a time. """
+        
+        bitsByChunk: dict[int, int] = {}
+        for roaringSet in sets:
+            for chunk, container in roaringSet.containers.items():
+                bitsByChunk[chunk] = bitsByChunk.get(chunk, 0) | container.toBits()
+        return cls._fromContainers({chunk: fromBits(bits) for chunk, bits in bitsByChunk.items()})
+    
+    def runOptimize(self) -> None:
+        """ Swap any container for a run container if that's smaller. """
+        
+        for chunk, container in self.containers.items():
+            if isinstance(container, RunContainer):
+                continue
+            # count the runs first, and only build the run container if it's going to be smaller
+            if 4 * runCount(container) < container.nbytes:
+                self.containers[chunk] = runsOf(container)
+    
+    @property
+    def nbytes(self) -> int:
+        """ Bytes used by the containers' values (what toBytes() writes, minus the small headers). """
+        return sum(container.nbytes for container in self.containers.values())
+    
+    def toBytes(self) -> bytes:
+        parts = [self.HEADER.pack(self.MAGIC, len(self.containers))]
+        for chunk in sorted(self.containers):
+            container = self.containers[chunk]
+            count, payload = container.payload()
+            parts.append(self.CONTAINER_HEADER.pack(chunk, container.kind, count))
+            parts.append(payload)
+        return b"".join(parts)
+    
+    @classmethod
+    def fromBytes(cls, data: bytes) -> "RoaringSet":
+        def readArray(offset: int, count: int) -> array:
+            values = array("H")
+            values.frombytes(data[offset:offset + 2 * count])
+            if sys.byteorder == "big":
+                values.byteswap()
+            return values
+        
+        magic, containerCount = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError("not a serialized RoaringSet")
+        
+        containers: dict[int, Container] = {}
+        offset = cls.HEADER.size
+        for _ in range(containerCount):
+            chunk, kind, count = cls.CONTAINER_HEADER.unpack_from(data, offset)
+            offset += cls.CONTAINER_HEADER.size
+            if kind == ArrayContainer.kind:
+                containers[chunk] = ArrayContainer(readArray(offset, count))
+                offset += 2 * count
+            elif kind == BitmapContainer.kind:
+                containers[chunk] = BitmapContainer(int.from_bytes(data[offset:offset + BITMAP_BYTES], "little"), count)
+                offset += BITMAP_BYTES
+            else:
+                containers[chunk] = RunContainer(readArray(offset, count), readArray(offset + 2 * count, count))
+                offset += 4 * count
+        return cls._fromContainers(containers)
+    
+    def __repr__(self):
+        kinds = [type(container).__name__ for container in self.containers.values()]
+        return f"RoaringSet({len(self):,} values in {len(kinds)} containers: " + ", ".join(
+            f"{kinds.count(kind)} {kind}" for kind in sorted(set(kinds))) + ")"
+
+
+ids = RoaringSet([5, 21, 1, 0, 55, 10, 5, 70_000, *range(200_000, 300_000)])
+ids.runOptimize()
+print(ids, len(ids), 21 in ids, 22 in ids)
+print(sorted(ids & RoaringSet([1, 2, 3, 5, 70_000])), len(ids - RoaringSet(range(0, 250_000))))
+print(f"{len(ids.toBytes())} bytes serialized, round trip equal: {RoaringSet.fromBytes(ids.toBytes()) == ids}")
+
+
+def measureMemory(build) -> tuple[object, int]:
+    tracemalloc.start()
+    built = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, size
+
+
+def benchmarkRoaringSet(size: int = 1_000_000) -> None:
+    """ Memory and set-algebra speed of RoaringSet against set, for sparse, dense and consecutive IDs. """
+    
+    # random IDs spread over all 32 bits leave only ~15 values in each chunk, so every container is a tiny array and
+    # the set algebra is a Python loop over 65,536 of them; set is faster there, RoaringSet only saves memory. The
+    # denser the IDs, the more of the work happens inside a single big-int operation per chunk.
+    rng = random.Random(7)
+    layouts = {
+        "sparse (random 32-bit IDs)": lambda offset: rng.sample(range(1 << 32), size),
+        "dense (half of a range)": lambda offset: rng.sample(range(offset, offset + 2 * size), size),
+        "consecutive runs": lambda offset: [value for start in range(offset, offset + 4 * size, 4000) for value in range(start, start + 1000)],
+    }
+    
+    for name, makeValues in layouts.items():
+        first, second = makeValues(0), makeValues(size // 2)
+        builtinSets, builtinBytes = measureMemory(lambda: (set(first), set(second)))
+        roaringSets, roaringBytes = measureMemory(lambda: (RoaringSet(first), RoaringSet(second)))
+        for roaringSet in roaringSets:
+            roaringSet.runOptimize()
+        serialized = len(roaringSets[0].toBytes())
+        
+        print(f"{name}: {len(first):,} values per set")
+        print(f"    memory: set {builtinBytes / 2 / len(first):.1f} bytes/value, RoaringSet {roaringBytes / 2 / len(first):.1f} "
+              f"bytes/value in memory, {serialized / len(first):.2f} bytes/value serialized ({roaringSets[0]})")
+        for operation in ("__or__", "__and__", "__sub__"):
+            builtinSeconds = timeit(lambda: getattr(builtinSets[0], operation)(builtinSets[1]), number=3) / 3
+            roaringSeconds = timeit(lambda: getattr(roaringSets[0], operation)(roaringSets[1]), number=3) / 3
+            print(f"    {operation:>7}: set {builtinSeconds * 1000:8.1f} ms, RoaringSet {roaringSeconds * 1000:8.1f} ms")
+        builtinSeconds = timeit(lambda: len(builtinSets[0] & builtinSets[1]), number=3) / 3
+        roaringSeconds = timeit(lambda: roaringSets[0].intersectionSize(roaringSets[1]), number=3) / 3
+        print(f"    len(&): set {builtinSeconds * 1000:8.1f} ms, RoaringSet {roaringSeconds * 1000:8.1f} ms")
+
+
+
+
+
+#=================================
+# Approximate membership (filters)
+#=================================
+
+# Past a few hundred million keys even RoaringSet is too big, and the keys might not be ints anyway. When "have we
+# seen this key?" can sometimes answer "maybe" for a key that was never added (but never "no" for one that was), a
+# filter answers it in a handful of bits per key, however long the keys are:
+#   - BloomFilter: k bit positions per key; adding sets them, a lookup checks they're all set. For a false positive
+#     rate p it needs about 1.44 * log2(1/p) bits per key (~9.6 for 1%). Keys can't be removed, but two filters of the
+#     same shape merge with a bitwise OR, so separate processes can each fill one and combine them
+#   - CuckooFilter: a table of buckets holding short fingerprints of the keys. Each key has two possible buckets, and
+#     a full bucket makes room by moving ("kicking") a fingerprint to its other bucket. It supports remove(), and
+#     merging re-inserts the other filter's fingerprints. Packed bit by bit it would beat a Bloom filter's size below
+#     p ~3%; here each fingerprint takes a whole 2- or 4-byte array slot instead, which keeps lookups simple
+# Both are built on a buffer that's either a bytearray or an mmap of a file. With a file, the filter is saved as it
+# changes, can be bigger than RAM (the OS pages it in and out), and can be reopened later (or by another process)
+# with open().
+#
+# The hash has to be the same in every process, so it's blake2b instead of hash(). Each key is hashed once, into two
+# 40-bit numbers: a Bloom filter's k positions are h1 + i * h2 for i in range(k), and a cuckoo filter takes its bucket
+# from h1 and its fingerprint from h2. 40 bits is enough for filters of up to 2**40 bits (128 GB), and keeps
+# h1 + i * h2 within a 64-bit int so NumPy can do the same arithmetic for a whole batch of keys at once.
+
+HASH_BITS = 40
+HASH_MASK = (1 << HASH_BITS) - 1
+
+
+def keyHashes(key: str | bytes | int) -> tuple[int, int]:
+    if isinstance(key, str):
+        data = key.encode()
+    elif isinstance(key, int):
+        data = key.to_bytes(key.bit_length() // 8 + 1, "little", signed=True)
+    else:
+        data = bytes(key)
+    digest = int.from_bytes(hashlib.blake2b(data, digest_size=10).digest(), "little")
+    return digest & HASH_MASK, digest >> HASH_BITS
+
+
+def mapFile(path: str, size: int, create: bool) -> mmap.mmap:
+    with open(path, "w+b" if create else "r+b") as file:
+        if create:
+            file.truncate(size)
+        return mmap.mmap(file.fileno(), size)  # the mapping stays valid after the file is closed
+
+
+class MappedFilter:
+    """ What both filters share: a header followed by the filter's data, in a bytearray or a memory-mapped file. """
+    
+    HEADER: struct.Struct
+    
+    def _attach(self, size: int, path: str | None, create: bool) -> None:
+        self.path = path
+        self.buffer = bytearray(size) if path is None else mapFile(path, size, create)
+        self.data = memoryview(self.buffer)[self.HEADER.size:]
+    
+    @classmethod
+    def _readHeader(cls, path: str) -> tuple:
+        with open(path, "rb") as file:
+            fields = cls.HEADER.unpack(file.read(cls.HEADER.size))
+        if fields[0] != cls.MAGIC:
+            raise ValueError(f"{path} is not a saved {cls.__name__}")
+        return fields[1:]
+    
+    def flush(self) -> None:
+        self.buffer[:self.HEADER.size] = self._header()
+        if self.path is not None:
+            self.buffer.flush()
+    
+    def close(self) -> None:
+        self.flush()
+        self.data.release()  # an mmap can't be closed while a memoryview still points into it
+        if self.path is not None:
+            self.buffer.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exceptionInfo) -> None:
+        self.close()
+
+
+class BloomFilter(MappedFilter):
+    
+    HEADER = struct.Struct("<4sQQI")  # magic, number of bits, capacity, number of hashes
+    MAGIC = b"BLM1"
+    
+    def __init__(self, capacity: int, falsePositiveRate: float = 0.01, path: str | None = None):
+        """
+        :param capacity: how many keys it's sized for (more still works, but the false positive rate climbs)
+        :param falsePositiveRate: how often a key that was never added should come back as "maybe there"
+        :param path: file to keep the filter in, replacing any file already there (None keeps it in memory)
+        """
+        bitCount = math.ceil(-capacity * math.log(falsePositiveRate) / math.log(2) ** 2)
+        self._setup(8 * math.ceil(bitCount / 8), capacity, max(1, round(bitCount / capacity * math.log(2))))
+        self._attach(self.HEADER.size + self.bitCount // 8, path, create=True)
+        self.flush()
+    
+    def _setup(self, bitCount: int, capacity: int, hashCount: int) -> None:
+        self.bitCount = bitCount
+        self.capacity = capacity
+        self.hashCount = hashCount
+    
+    @classmethod
+    def open(cls, path: str) -> "BloomFilter":
+        bloom = cls.__new__(cls)
+        bloom._setup(*cls._readHeader(path))
+        bloom._attach(cls.HEADER.size + bloom.bitCount // 8, path, create=False)
+        return bloom
+    
+    def _header(self) -> bytes:
+        return self.HEADER.pack(self.MAGIC, self.bitCount, self.capacity, self.hashCount)
+    
+    def _positions(self, key) -> Iterator[int]:
+        first, second = keyHashes(key)
+        return ((first + index * second) % self.bitCount for index in range(self.hashCount))
+    
+    def add(self, key) -> None:
+        data = self.data
+        for position in self._positions(key):
+            data[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, key) -> bool:
+        data = self.data
+        return all(data[position >> 3] >> (position & 7) & 1 for position in self._positions(key))
+    
+    def _batchPositions(self, keys: list) -> "np.ndarray":
+        """ Every key's k positions as one (keys, k) array, computed together. """
+        hashes = np.array([keyHashes(key) for key in keys], dtype=np.uint64).reshape(-1, 2)
+        offsets = np.arange(self.hashCount, dtype=np.uint64) * hashes[:, 1:]
+        return (hashes[:, :1] + offsets) % np.uint64(self.bitCount)
+    
+    def addMany(self, keys: Iterable) -> None:
+        keys = list(keys)
+        if np is None or not keys:
+            for key in keys:
+                self.add(key)
+            return
+        
+        positions = self._batchPositions(keys).ravel()
+        data = np.frombuffer(self.data, dtype=np.uint8)
+        np.bitwise_or.at(data, positions >> np.uint64(3), (np.uint64(1) << (positions & np.uint64(7))).astype(np.uint8))
+    
+    def containsMany(self, keys: Iterable) -> list[bool]:
+        keys = list(keys)
+        if np is None or not keys:
+            return [key in self for key in keys]
+        
+        positions = self._batchPositions(keys)
+        data = np.frombuffer(self.data, dtype=np.uint8)
+        bits = data[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8) & 1
+        return bits.all(axis=1).tolist()
+    
+    def merge(self, other: "BloomFilter") -> None:
+        """ Add every key of ``other`` (which has to have the same size and number of hashes) to this filter. """
+        
+        if (other.bitCount, other.hashCount) != (self.bitCount, self.hashCount):
+            raise ValueError("only Bloom filters with the same size and number of hashes can be merged")
+        
+        step = 1 << 20  # OR a megabyte at a time, so two huge filters don't have to be turned into huge ints at once
+        for start in range(0, len(self.data), step):
+            mine, theirs = self.data[start:start + step], other.data[start:start + step]
+            merged = int.from_bytes(mine, "little") | int.from_bytes(theirs, "little")
+            mine[:] = merged.to_bytes(len(mine), "little")
+    
+    def estimatedCount(self) -> int:
+        """ Roughly how many different keys were added, worked out from how many bits are set. """
+        
+        setCount = sum(int.from_bytes(self.data[start:start + (1 << 20)], "little").bit_count()
+                       for start in range(0, len(self.data), 1 << 20))
+        if setCount == self.bitCount:
+            return self.capacity
+        return round(-self.bitCount / self.hashCount * math.log(1 - setCount / self.bitCount))
+    
+    def __repr__(self):
+        return f"BloomFilter({self.bitCount:,} bits, {self.hashCount} hashes, capacity {self.capacity:,})"
+
+
+class CuckooFilter(MappedFilter):
+    
+    HEADER = struct.Struct("<4sQQIIQQQ")  # magic, buckets, capacity, bucket size, fingerprint bits, count, victim bucket, victim fingerprint
+    MAGIC = b"CKO1"
+    MAX_KICKS = 500
+    
+    def __init__(self, capacity: int, falsePositiveRate: float = 0.01, bucketSize: int = 4, path: str | None = None):
+        """
+        :param capacity: how many keys it's sized for; adding many more raises RuntimeError once it's full
+        :param falsePositiveRate: how often a key that was never added should come back as "maybe there"
+        :param bucketSize: fingerprints per bucket; 4 lets the table fill to ~95% before inserts start failing
+        :param path: file to keep the filter in, replacing any file already there (None keeps it in memory)
+        """
+        
+        # a lookup compares against 2 * bucketSize fingerprints, each matching by chance with probability 2 ** -bits
+        fingerprintBits = min(32, max(4, math.ceil(math.log2(2 * bucketSize / falsePositiveRate))))
+        bucketCount = 1 << max(0, math.ceil(math.log2(capacity / (0.95 * bucketSize))))  # a power of two, see _alternate
+        self._setup(bucketCount, capacity, bucketSize, fingerprintBits, 0, 0, 0)
+        self._attach(self.HEADER.size + bucketCount * bucketSize * self.slots.itemsize, path, create=True)
+        self.slots = self.data.cast(self.slots.typecode)
+        self.flush()
+    
+    def _setup(self, bucketCount: int, capacity: int, bucketSize: int, fingerprintBits: int, count: int,
+               victimBucket: int, victimFingerprint: int) -> None:
+        self.bucketCount = bucketCount
+        self.bucketMask = bucketCount - 1
+        self.capacity = capacity
+        self.bucketSize = bucketSize
+        self.fingerprintBits = fingerprintBits
+        self.fingerprintMask = (1 << fingerprintBits) - 1
+        self.count = count
+        # a fingerprint that couldn't be placed when the table got full; 0 means there isn't one (0 marks empty slots)
+        self.victim = (victimBucket, victimFingerprint)
+        self.slots = array("H" if fingerprintBits <= 16 else "I")  # replaced by a view of the buffer once it is attached
+        self.rng = random.Random()
+    
+    @classmethod
+    def open(cls, path: str) -> "CuckooFilter":
+        cuckoo = cls.__new__(cls)
+        cuckoo._setup(*cls._readHeader(path))
+        cuckoo._attach(cls.HEADER.size + cuckoo.bucketCount * cuckoo.bucketSize * cuckoo.slots.itemsize, path, create=False)
+        cuckoo.slots = cuckoo.data.cast(cuckoo.slots.typecode)
+        return cuckoo
+    
+    def _header(self) -> bytes:
+        return self.HEADER.pack(self.MAGIC, self.bucketCount, self.capacity, self.bucketSize, self.fingerprintBits,
+                                self.count, *self.victim)
+    
+    def close(self) -> None:
+        self.slots.release()
+        super().close()
+    
+    def _locate(self, key) -> tuple[int, int, int]:
+        """ The key's fingerprint and its two buckets. """
+        first, second = keyHashes(key)
+        fingerprint = second & self.fingerprintMask or 1
+        bucket = first & self.bucketMask
+        return fingerprint, bucket, self._alternate(bucket, fingerprint)
+    
+    def _alternate(self, bucket: int, fingerprint: int) -> int:
+        # XOR with something that only depends on the fingerprint, so the alternate of the alternate is the bucket we
+        # started from, and a fingerprint being kicked out can find its other bucket without knowing the original key
+        return (bucket ^ (fingerprint * 0x5BD1E995)) & self.bucketMask
+    
+    def _place(self, bucket: int, fingerprint: int) -> bool:
+        start = bucket * self.bucketSize
+        for slot in range(start, start + self.bucketSize):
+            if self.slots[slot] == 0:
+                self.slots[slot] = fingerprint
+                return True
+        return False
+    
+    def _insert(self, fingerprint: int, first: int, second: int) -> None:
+        if self.victim[1]:
+            raise RuntimeError(f"CuckooFilter is full ({self.count:,} keys)")
+        
+        self.count += 1
+        if self._place(first, fingerprint) or self._place(second, fingerprint):
+            return
+        
+        bucket = self.rng.choice((first, second))
+        for _ in range(self.MAX_KICKS):
+            slot = bucket * self.bucketSize + self.rng.randrange(self.bucketSize)
+            fingerprint, self.slots[slot] = self.slots[slot], fingerprint
+            bucket = self._alternate(bucket, fingerprint)
+            if self._place(bucket, fingerprint):
+                return
+        
+        # the key itself made it in; the fingerprint left over waits here, and the next add() reports the filter full
+        self.victim = (bucket, fingerprint)
+    
+    def add(self, key) -> None:
+        self._insert(*self._locate(key))
+    
+    def addMany(self, keys: Iterable) -> None:
+        # every insert can move fingerprints other inserts depend on, so unlike lookups they can't be done as a batch
+        for key in keys:
+            self.add(key)
+    
+    def _bucketHas(self, bucket: int, fingerprint: int) -> int:
+        """ The slot holding the fingerprint in this bucket, or -1. """
+        start = bucket * self.bucketSize
+        for slot in range(start, start + self.bucketSize):
+            if self.slots[slot] == fingerprint:
+                return slot
+        return -1
+    
+    def __contains__(self, key) -> bool:
+        fingerprint, first, second = self._locate(key)
+        return (self._bucketHas(first, fingerprint) >= 0 or self._bucketHas(second, fingerprint) >= 0
+                or self.victim[1] == fingerprint and self.victim[0] in (first, second))
+    
+    def containsMany(self, keys: Iterable) -> list[bool]:
+        keys = list(keys)
+        if np is None or not keys:
+            return [key in self for key in keys]
+        
+        located = np.array([self._locate(key) for key in keys], dtype=np.int64)
+        fingerprints, first, second = located[:, 0:1], located[:, 1], located[:, 2]
+        table = np.frombuffer(self.slots, dtype=self.slots.format).reshape(self.bucketCount, self.bucketSize)
+        found = (table[first] == fingerprints).any(axis=1) | (table[second] == fingerprints).any(axis=1)
+        if self.victim[1]:
+            found |= (fingerprints[:, 0] == self.victim[1]) & ((first == self.victim[0]) | (second == self.victim[0]))
+        return found.tolist()
+    
+    def remove(self, key) -> None:
+        """ Remove a key that was added. Removing one that never was can remove a different key with the same fingerprint. """
+        
+        fingerprint, first, second = self._locate(key)
+        if self.victim[1] == fingerprint and self.victim[0] in (first, second):
+            self.victim = (0, 0)
+            self.count -= 1
+            return
+        
+        for bucket in (first, second):
+            slot = self._bucketHas(bucket, fingerprint)
+            if slot >= 0:
+                self.slots[slot] = 0
+                self.count -= 1
+                if self.victim[1]:
+                    # there's room again, so the waiting fingerprint gets another go
+                    bucket, waiting = self.victim
+                    self.victim = (0, 0)
+                    self.count -= 1
+                    self._insert(waiting, bucket, self._alternate(bucket, waiting))
+                return
+        raise KeyError(key)
+    
+    def merge(self, other: "CuckooFilter") -> None:
+        """
+        Add every fingerprint of ``other`` (which has to have the same number of buckets and fingerprint size). If they
+        don't all fit, this raises RuntimeError and leaves the filter as it was.
+        """
+        
+        if (other.bucketCount, other.fingerprintBits) != (self.bucketCount, self.fingerprintBits):
+            raise ValueError("only cuckoo filters with the same number of buckets and fingerprint size can be merged")
+        
+        # whether everything fits depends on where the kicks end up, so there's no telling beforehand; instead the
+        # table is copied first and put back if it fills up partway through
+        saved = (bytes(self.data), self.count, self.victim)
+        try:
+            # a fingerprint's two buckets only depend on the bucket it's in and the fingerprint itself, so it can be
+            # moved over without the key it came from
+            for slot, fingerprint in enumerate(other.slots):
+                if fingerprint:
+                    bucket = slot // other.bucketSize
+                    self._insert(fingerprint, bucket, self._alternate(bucket, fingerprint))
+            if other.victim[1]:
+                self._insert(other.victim[1], other.victim[0], self._alternate(*other.victim))
+        except RuntimeError:
+            data, self.count, self.victim = saved
+            self.data[:] = data
+            raise
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __repr__(self):
+        return (f"CuckooFilter({self.count:,} keys in {self.bucketCount:,} buckets of {self.bucketSize}, "
+                f"{self.fingerprintBits}-bit fingerprints)")
+
+
+seen = BloomFilter(capacity=1_000, falsePositiveRate=0.01)
+seen.addMany(["USB-A", "USB-C", "HDMI"])
+print(seen, "USB-C" in seen, "VGA" in seen, seen.containsMany(["HDMI", "DVI"]))
+recent = CuckooFilter(capacity=1_000, falsePositiveRate=0.01)
+recent.addMany(["USB-A", "USB-C", "HDMI"])
+recent.remove("USB-C")
+print(recent, "USB-A" in recent, "USB-C" in recent)
+print()
+
+
+def fillBloomFile(path: str, keys: list, capacity: int, falsePositiveRate: float) -> str:
+    with BloomFilter(capacity, falsePositiveRate, path) as bloom:
+        bloom.addMany(keys)
+    return path
+
+
+def buildBloomInParallel(chunks: list[list], capacity: int, falsePositiveRate: float, directory: str) -> BloomFilter:
+    """ Every worker fills a Bloom filter file from its chunk of keys, then they're merged into the first one. """
+    
+    paths = [os.path.join(directory, f"part{index}.bloom") for index in range(len(chunks))]
+    with ProcessPoolExecutor() as executor:
+        filled = list(executor.map(fillBloomFile, paths, chunks, [capacity] * len(chunks), [falsePositiveRate] * len(chunks)))
+    
+    merged = BloomFilter.open(filled[0])
+    for path in filled[1:]:
+        with BloomFilter.open(path) as part:
+            merged.merge(part)
+    return merged
+
+
+def benchmarkFilters(size: int = 1_000_000, falsePositiveRate: float = 0.01) -> None:
+    """ Memory, measured false positive rate and throughput of both filters against set, plus a parallel build. """
+    
+    keys = [f"user-{index}" for index in range(size)]
+    absent = [f"visitor-{index}" for index in range(100_000)]
+    
+    builtinSet, builtinBytes = measureMemory(lambda: set(keys))
+    print(f"set: {builtinBytes / size:.1f} bytes/key (not counting the key strings themselves)")
+    
+    for name, makeFilter in (("BloomFilter", lambda: BloomFilter(size, falsePositiveRate)),
+                             ("CuckooFilter", lambda: CuckooFilter(size, falsePositiveRate))):
+        membership = makeFilter()
+        started = time.perf_counter()
+        membership.addMany(keys)
+        addSeconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        falsePositives = sum(membership.containsMany(absent))
+        querySeconds = time.perf_counter() - started
+        singleSeconds = timeit(lambda: [key in membership for key in absent[:10_000]], number=1)
+        
+        print(f"{membership}: {len(membership.buffer) / size:.2f} bytes/key, false positives {falsePositives / len(absent):.2%} "
+              f"(asked for {falsePositiveRate:.2%})")
+        print(f"    addMany {size / addSeconds:,.0f} keys/sec, containsMany {len(absent) / querySeconds:,.0f} keys/sec, "
+              f"one at a time {10_000 / singleSeconds:,.0f} keys/sec")
+    
+    setSeconds = timeit(lambda: [key in builtinSet for key in absent], number=1)
+    print(f"set lookups: {len(absent) / setSeconds:,.0f} keys/sec")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        chunks = [keys[start::4] for start in range(4)]
+        started = time.perf_counter()
+        with buildBloomInParallel(chunks, size, falsePositiveRate, directory) as merged:
+            seconds = time.perf_counter() - started
+            missing = sum(1 for key in keys[::1000] if key not in merged)
+            print(f"parallel build into mmap files: {seconds:.2f}s, merged {merged.estimatedCount():,} keys (estimated), "
+                  f"{missing} sampled keys missing")
+
+
+
+
+#=====================
+# Packed record tables
+#=====================
+
+# A tuple is the natural thing for a fixed-shape record, but a million of them is a million tuple objects plus an
+# object for every value in them, and handing them to another process pickles and unpickles every one. RecordTable
+# keeps the records the way C would: one flat buffer, each record packed with struct at a fixed size, so the i-th
+# record starts at i * size and each field is at a fixed offset inside it.
+#   - table[i] gives a small view with tuple-like indexing and attribute access (made for the schema, like
+#     namedtuple does) that reads the values straight out of the buffer when asked; nothing is copied or unpacked up
+#     front, and moveTo() points an existing view at another record so a loop doesn't even need a new view each time
+#   - column() unpacks one field from every record in a single C-level pass
+#   - in shared memory, another process attaches to the same buffer by name: only a tiny TableHandle gets pickled,
+#     never the records
+# The tables are read-only once built (the records are immutable, like tuples), so any number of processes can read
+# them at the same time without locks.
+
+class RecordSchema:
+    
+    def __init__(self, name: str, fields: dict[str, str]):
+        """
+        :param name: what the record views are called
+        :param fields: field name -> struct format code ("q" for an 8-byte int, "d" for a float, "8s" for 8 bytes, ...)
+        """
+        self.name = name
+        self.fields = dict(fields)
+        self.names = tuple(fields)
+        self.layout = struct.Struct("<" + "".join(fields.values()))  # "<" packs the fields with no padding between
+        self.size = self.layout.size
+        self.offsets = {}
+        self.fieldStructs = {}
+        offset = 0
+        for fieldName, code in fields.items():
+            self.offsets[fieldName] = offset
+            self.fieldStructs[fieldName] = struct.Struct("<" + code)
+            offset += self.fieldStructs[fieldName].size
+        self.viewType = self._makeViewType()
+    
+    def _makeViewType(self) -> type:
+        def fieldReader(fieldStruct: struct.Struct, offset: int) -> property:
+            return property(lambda view: fieldStruct.unpack_from(view.buffer, view.offset + offset)[0])
+        
+        attributes = {fieldName: fieldReader(self.fieldStructs[fieldName], offset) for fieldName, offset in self.offsets.items()}
+        return type(self.name, (RecordView,), {"__slots__": (), "schema": self, **attributes})
+    
+    def __reduce__(self):
+        return RecordSchema, (self.name, self.fields)  # rebuild the view type on the other side instead of pickling it
+
+
+class RecordView:
+    """ One record of a RecordTable, read from the table's buffer on demand. """
+    
+    __slots__ = ("buffer", "offset")
+    schema: RecordSchema
+    
+    def __init__(self, buffer: memoryview, offset: int):
+        self.buffer = buffer
+        self.offset = offset
+    
+    def moveTo(self, index: int) -> "RecordView":
+        self.offset = index * self.schema.size
+        return self
+    
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return self.totuple()[index]
+        fieldName = self.schema.names[index]
+        return self.schema.fieldStructs[fieldName].unpack_from(self.buffer, self.offset + self.schema.offsets[fieldName])[0]
+    
+    def totuple(self) -> tuple:
+        return self.schema.layout.unpack_from(self.buffer, self.offset)
+    
+    def __len__(self) -> int:
+        return len(self.schema.names)
+    
+    def __iter__(self) -> Iterator:
+        return iter(self.totuple())
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RecordView):
+            other = other.totuple()
+        return self.totuple() == other
+    
+    # not hashable: moveTo() changes which record a view shows, and with it what the view is equal to, which would
+    # lose it inside a set or dict -- totuple() gives a key that can't change
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"{self.schema.name}(" + ", ".join(f"{name}={value!r}" for name, value in zip(self.schema.names, self.totuple())) + ")"
+
+
+@dataclass(frozen=True)
+class TableHandle:
+    """ Everything another process needs to attach to a RecordTable in shared memory. """
+    schema: RecordSchema
+    memoryName: str
+    count: int
+
+
+class RecordTable:
+    
+    def __init__(self, schema: RecordSchema, buffer: bytearray | memoryview, count: int,
+                 memory: shared_memory.SharedMemory | None = None):
+        self.schema = schema
+        self.count = count
+        self.memory = memory
+        # read-only, and cut to the records (shared memory can be rounded up to a whole page)
+        self.buffer = memoryview(buffer)[:count * schema.size].toreadonly()
+    
+    @classmethod
+    def fromRecords(cls, schema: RecordSchema, records: Iterable[tuple], shared: bool = False) -> "RecordTable":
+        records = records if isinstance(records, list) else list(records)
+        size = max(1, len(records) * schema.size)  # shared memory can't be 0 bytes
+        memory = shared_memory.SharedMemory(create=True, size=size) if shared else None
+        buffer = memory.buf if shared else bytearray(size)
+        
+        packInto, recordSize = schema.layout.pack_into, schema.size
+        try:
+            for index, record in enumerate(records):
+                packInto(buffer, index * recordSize, *record)
+        except BaseException:
+            if memory is not None:
+                # nothing else knows the block's name yet, so it would stay allocated until the machine restarts
+                del buffer  # close() fails while this still points into the block
+                memory.close()
+                memory.unlink()
+            raise
+        return cls(schema, buffer, len(records), memory)
+    
+    @classmethod
+    def attach(cls, handle: TableHandle) -> "RecordTable":
+        memory = shared_memory.SharedMemory(name=handle.memoryName)
+        return cls(handle.schema, memory.buf, handle.count, memory)
+    
+    @property
+    def handle(self) -> TableHandle:
+        if self.memory is None:
+            raise ValueError("only a table in shared memory (fromRecords(..., shared=True)) has a handle")
+        return TableHandle(self.schema, self.memory.name, self.count)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __getitem__(self, index: int) -> RecordView:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("RecordTable index out of range")
+        return self.schema.viewType(self.buffer, index * self.schema.size)
+    
+    def __iter__(self) -> Iterator[RecordView]:
+        viewType, buffer, size = self.schema.viewType, self.buffer, self.schema.size
+        return (viewType(buffer, index * size) for index in range(self.count))
+    
+    def rows(self) -> Iterator[tuple]:
+        """ Every record as a plain tuple. """
+        return self.schema.layout.iter_unpack(self.buffer)
+    
+    def column(self, fieldName: str) -> list:
+        # a struct that skips (x) every byte of the record except this field reads just that field from each record
+        offset, fieldStruct = self.schema.offsets[fieldName], self.schema.fieldStructs[fieldName]
+        skipping = struct.Struct(f"<{offset}x{fieldStruct.format[1:]}{self.schema.size - offset - fieldStruct.size}x")
+        return [value for (value,) in skipping.iter_unpack(self.buffer)]
+    
+    def close(self) -> None:
+        self.buffer.release()
+        if self.memory is not None:
+            self.memory.close()
+    
+    def unlink(self) -> None:
+        """ Free the shared memory for good; call it once, from the process that created the table. """
+        self.close()
+        if self.memory is not None:
+            self.memory.unlink()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exceptionInfo) -> None:
+        self.close()
+    
+    def __repr__(self):
+        where = f"shared memory {self.memory.name}" if self.memory is not None else "memory"
+        return f"RecordTable({self.count:,} {self.schema.name} records of {self.schema.size} bytes in {where})"
+
+
+Product = RecordSchema("Product", {"id": "q", "price": "d", "stock": "i", "connector": "8s"})
+products = RecordTable.fromRecords(Product, [(1, 9.99, 40, b"USB-A"), (2, 14.5, 0, b"USB-C"), (3, 21.0, 7, b"HDMI")])
+print(products, products[1], products[1].price, products[1][0], tuple(products[2]), products.column("stock"))
+try:
+    products[0].price = 0  # type: ignore
+except AttributeError:
+    print("records cannot be changed (they are immutable)")
+print()
+
+
+def sumColumn(handle: TableHandle, fieldName: str, start: int, stop: int) -> float:
+    with RecordTable.attach(handle) as table:
+        view = table[start] if stop > start else None
+        total = 0
+        for index in range(start, stop):
+            total += getattr(view.moveTo(index), fieldName)
+        return total
+
+
+def sumTuples(records: list[tuple], position: int) -> float:
+    return sum(record[position] for record in records)
+
+
+def benchmarkRecordTable(size: int = 1_000_000, workers: int = 4) -> None:
+    """ Memory of a RecordTable against a list of tuples, and handing the records to a process pool both ways. """
+    
+    rng = random.Random(11)
+    tuples, tupleBytes = measureMemory(lambda: [(index, rng.uniform(1, 100), rng.randrange(1000), b"USB-C") for index in range(size)])
+    table, tableBytes = measureMemory(lambda: RecordTable.fromRecords(Product, tuples, shared=True))
+    print(f"{size:,} records: list of tuples {tupleBytes / size:.1f} bytes/record, RecordTable {Product.size} bytes/record "
+          f"({tableBytes / size:.1f} of Python heap, the rest is in shared memory)")
+    print(f"pickled for another process: tuples {len(pickle.dumps(tuples)) / 1e6:.1f} MB, handle {len(pickle.dumps(table.handle))} bytes")
+    
+    step = math.ceil(size / workers)
+    ranges = [(start, min(start + step, size)) for start in range(0, size, step)]
+    with ProcessPoolExecutor(workers) as executor:
+        executor.submit(sum, ()).result()  # start the workers before timing
+        
+        started = time.perf_counter()
+        total = sum(executor.map(sumTuples, [tuples[start:stop] for start, stop in ranges], [1] * len(ranges)))
+        print(f"    workers summing prices from pickled tuples: {time.perf_counter() - started:.2f}s (total {total:,.0f})")
+        
+        started = time.perf_counter()
+        total = sum(executor.map(sumColumn, [table.handle] * len(ranges), ["price"] * len(ranges), *zip(*ranges)))
+        print(f"    workers summing prices from shared memory:  {time.perf_counter() - started:.2f}s (total {total:,.0f})")
+    
+    started = time.perf_counter()
+    total = sum(table.column("price"))
+    print(f"    column() in this process: {time.perf_counter() - started:.2f}s (total {total:,.0f})")
+    table.unlink()
+
+
+if __name__ == "__main__":
+    benchmarkRoaringSet()
+    benchmarkFilters()
+    benchmarkRecordTable()
@@ -0,0 +1,33 @@
+from contextlib import redirect_stdout
+import importlib.util
+import io
+import pathlib
+import sys
+
+import pytest
+
+
+REPOSITORY = pathlib.Path(__file__).parent.parent
+
+
+# The lessons are scripts rather than a package (and some of their names, like "Tuple and Set.py", can't be imported
+# the normal way), so they're loaded straight from their files. Loading one runs its demo code, whose printing is
+# hidden; the benchmarks are behind `if __name__ == "__main__":`, so they don't run.
+@pytest.fixture(scope="session")
+def lesson():
+    loaded = {}
+    
+    def load(relativePath: str):
+        if relativePath not in loaded:
+            path = REPOSITORY / relativePath
+            name = path.stem.replace(" ", "").replace("-", "")
+            sys.path.insert(0, str(path.parent))
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module  # dataclasses and pickle look modules up by name
+            with redirect_stdout(io.StringIO()):
+                spec.loader.exec_module(module)
+            loaded[relativePath] = module
+        return loaded[relativePath]
+    
+    return load
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+
+
+### FIXTURES ###
+
+@pytest.fixture
+def closures(lesson):
+    return lesson("Closures.py")
+
+
+class GatedSink:
+    """ Holds the writer thread inside write() until it's opened, so the tests control when the buffer drains. """
+    
+    def __init__(self, failure: Exception | None = None):
+        self.lines = []
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+        self.failure = failure
+    
+    def write(self, text):
+        self.entered.set()
+        self.gate.wait(5)
+        if self.failure is not None:
+            raise self.failure
+        self.lines.extend(text.splitlines())
+    
+    def flush(self):
+        pass
+
+
+def startLogger(closures, sink, **options):
+    logger = closures.BufferedLogger(sink, batchSize=1, **options)
+    logger.log(0)
+    assert sink.entered.wait(5)  # the writer now holds record 0 and the buffer is empty
+    return logger
+
+
+### TESTS ###
+
+def test_buffered_logger_drops_records_once_full(closures):
+    sink = GatedSink()
+    logger = startLogger(closures, sink, capacity=4, policy=closures.BackpressurePolicy.DROP)
+    
+    for record in range(1, 11):
+        logger.log(record)
+    assert logger.metrics()["queued"] == 4
+    
+    sink.gate.set()
+    logger.close()
+    assert sink.lines == ["0", "1", "2", "3", "4"]
+    assert (logger.accepted, logger.dropped, logger.written) == (5, 6, 5)
+
+
+def test_buffered_logger_samples_once_half_full(closures):
+    sink = GatedSink()
+    logger = startLogger(closures, sink, capacity=10, sampleRate=5, policy=closures.BackpressurePolicy.SAMPLE)
+    
+    for record in range(1, 26):
+        logger.log(record)
+    
+    sink.gate.set()
+    logger.close()
+    # 1-5 fill it to half, then only every 5th of the remaining 20 is kept
+    assert sink.lines == ["0", "1", "2", "3", "4", "5", "10", "15", "20", "25"]
+    assert (logger.sampledOut, logger.dropped) == (16, 0)
+
+
+def test_buffered_logger_blocks_until_theres_room(closures):
+    sink = GatedSink()
+    logger = startLogger(closures, sink, capacity=2, policy=closures.BackpressurePolicy.BLOCK)
+    logger.log(1)
+    logger.log(2)
+    
+    caller = threading.Thread(target=logger.log, args=(3,))
+    caller.start()
+    caller.join(0.1)
+    assert caller.is_alive()
+    
+    sink.gate.set()
+    caller.join(5)
+    assert not caller.is_alive()
+    logger.close()
+    assert sink.lines == ["0", "1", "2", "3"]
+    assert logger.dropped == 0
+
+
+def test_buffered_logger_releases_blocked_callers_when_the_sink_fails(closures):
+    sink = GatedSink(OSError("disk full"))
+    logger = startLogger(closures, sink, capacity=1, policy=closures.BackpressurePolicy.BLOCK)
+    logger.log(1)
+    
+    caller = threading.Thread(target=logger.log, args=(2,))
+    caller.start()
+    caller.join(0.1)
+    assert caller.is_alive()
+    
+    sink.gate.set()
+    caller.join(5)
+    assert not caller.is_alive()
+    
+    with pytest.raises(RuntimeError) as raised:
+        logger.close()
+    assert isinstance(raised.value.__cause__, OSError)
+    assert (logger.written, logger.dropped) == (0, 3)
+
+
+def test_buffered_logger_close_writes_everything_and_drops_later_records(closures):
+    sink = GatedSink()
+    logger = startLogger(closures, sink, capacity=100)
+    for record in range(1, 50):
+        logger.log(record)
+    
+    sink.gate.set()
+    logger.close()
+    assert sink.lines == [str(record) for record in range(50)]
+    
+    logger.log(50)
+    assert (logger.metrics()["queued"], logger.dropped, logger.written) == (0, 1, 50)
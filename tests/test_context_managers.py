@@ -0,0 +1,118 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+
+
+
+### FIXTURES ###
+
+@pytest.fixture
+def contexts(lesson):
+    return lesson("ContextManagers.py")
+
+
+### TESTS ###
+
+def test_collapsed_stacks_sum_before_rounding(contexts):
+    tracer = contexts.Tracer()
+    with tracer.span("outer"):
+        for _ in range(1000):
+            with tracer.span("inner"):
+                pass
+    
+    inner = [span for span in tracer.finished if span.name == "inner"]
+    assert tracer.collapsedStacks()["outer;inner"] == sum(span.selfDuration for span in inner) // 1000
+
+
+def test_indented_writer_levels_per_thread(contexts):
+    stream = io.StringIO()
+    writer = contexts.IndentedWriter(stream, indent="  ")
+    
+    def nested():
+        with writer:
+            writer.print("other thread")
+    
+    with writer:
+        writer.print("a")
+        with writer:
+            writer.print("b")
+            thread = threading.Thread(target=nested)
+            thread.start()
+            thread.join()
+        writer.print("c")
+        with writer:
+            writer.print("d")
+    
+    assert stream.getvalue() == "a\n  b\nother thread\nc\n  d\n"
+    assert writer.state.prefixes == ["", "  "]
+
+
+# Lines reach the file within about flushInterval even when nothing else is written after them.
+def test_append_writer_flushes_when_idle(contexts, tmp_path):
+    path = tmp_path / "append.log"
+    with contexts.BufferedAppendWriter(str(path), flushInterval=0.05) as writer:
+        writer.writeLine("first line")
+        deadline = time.monotonic() + 5
+        while not path.read_text() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert path.read_text() == "first line\n"
+        writer.writeLine("second line")
+    assert path.read_text() == "first line\nsecond line\n"
+
+
+@pytest.mark.parametrize("minSize, maxSize", ((-1, 2), (3, 2), (0, 0)))
+def test_resource_pool_rejects_bad_sizes(contexts, minSize, maxSize):
+    with pytest.raises(ValueError):
+        contexts.ResourcePool(object, minSize=minSize, maxSize=maxSize)
+
+
+def test_resource_pool_reuses_resources(contexts):
+    created = []
+    
+    def create():
+        created.append(io.StringIO())
+        return created[-1]
+    
+    with contexts.ResourcePool(create, minSize=0, maxSize=2) as pool:
+        for _ in range(5):
+            with pool.checkout():
+                pass
+        with pytest.raises(ValueError):
+            with pool.checkout():
+                raise ValueError("breaks the resource")
+        
+        assert len(created) == 1 and created[0].closed  # broken, so it was closed rather than put back
+        assert (pool.metrics()["hits"], pool.metrics()["misses"]) == (5, 1)
+
+
+# Slow creation and health checks happen on a worker thread, so other tasks keep running meanwhile.
+def test_resource_pool_async_checkout_does_not_block_the_loop(contexts):
+    def slowlyCreate():
+        time.sleep(0.2)
+        return io.StringIO()
+    
+    def slowlyCheck(resource):
+        time.sleep(0.2)
+        return True
+    
+    async def run():
+        ticks = 0
+        
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        ticking = asyncio.create_task(tick())
+        with contexts.ResourcePool(slowlyCreate, isHealthy=slowlyCheck, minSize=0, maxSize=1) as pool:
+            for _ in range(2):  # created the first time, health-checked the second
+                async with pool.checkout():
+                    pass
+        ticking.cancel()
+        return ticks
+    
+    assert asyncio.run(run()) >= 10
@@ -0,0 +1,112 @@
+from collections import Counter
+import random
+
+import pytest
+
+
+
+### FIXTURES ###
+
+@pytest.fixture
+def dictionary(lesson):
+    return lesson("Dictionary.py")
+
+
+def assertBounds(summary, stream):
+    """ Every tracked key's count is an overestimate by at most its error. """
+    
+    trueCounts = Counter(stream)
+    for key, count, error in summary.heavyHitters():
+        assert count - error <= trueCounts[key] <= count, key
+
+
+### TESTS ###
+
+def test_space_saving_merge_keeps_bounds(dictionary):
+    first = ["x"] * 5
+    second = ["x"] * 5 + ["y"] * 7 + ["z"] * 7 + ["w"] * 7 + ["v"] * 7
+    
+    a = dictionary.SpaceSaving(k=4)
+    b = dictionary.SpaceSaving(k=4)
+    for key in first:
+        a.add(key)
+    for key in second:
+        b.add(key)
+    a.merge(b)
+    
+    assertBounds(a, first + second)
+    assert len(a.counts) == 4
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_space_saving_merge_random_streams(dictionary, seed):
+    rng = random.Random(seed)
+    streams = [[rng.choice("abcdefghij") for _ in range(rng.randrange(1, 200))] for _ in range(3)]
+    
+    merged = dictionary.SpaceSaving(k=4)
+    for stream in streams:
+        summary = dictionary.SpaceSaving(k=4)
+        for key in stream:
+            summary.add(key)
+        assertBounds(summary, stream)
+        merged.merge(summary)
+    
+    assertBounds(merged, [key for stream in streams for key in stream])
+
+
+@pytest.fixture
+def persistent(dictionary, tmp_path):
+    with dictionary.PersistentDict(str(tmp_path / "test.sqlite"), cacheSize=2) as persistent:
+        yield persistent
+
+
+def test_persistent_dict_equal_keys_match(persistent):
+    persistent[1] = "one"
+    persistent.cache.clear()  # make the lookups go to the database
+    assert persistent[True] == "one"
+    assert True in persistent
+    
+    persistent[2 ** 100] = "big"
+    persistent[-5] = "negative"
+    persistent["".join(["ke", "y"])] = "string"
+    persistent[b"key"] = "bytes"
+    persistent.cache.clear()
+    assert (persistent[2 ** 100], persistent[-5], persistent["key"], persistent[b"key"]) == ("big", "negative", "string", "bytes")
+    assert sorted(persistent, key=repr) == sorted([1, 2 ** 100, -5, "key", b"key"], key=repr)
+
+
+@pytest.mark.parametrize("key", (1.0, ("a", "b"), None))
+def test_persistent_dict_rejects_other_keys(persistent, key):
+    with pytest.raises(TypeError):
+        persistent[key] = "value"
+    with pytest.raises(TypeError):
+        persistent.get(key)
+    with pytest.raises(TypeError):
+        key in persistent
+
+
+# Changing a value that was read doesn't change what's stored, whether or not the entry is still cached.
+def test_persistent_dict_reads_are_copies(persistent):
+    persistent["a"] = [1]
+    persistent["a"].append(2)
+    assert persistent["a"] == [1]  # cached
+    
+    persistent["b"] = []
+    persistent["c"] = []  # the cache only holds 2, so "a" is gone from it now
+    assert "a" not in persistent.cache
+    assert persistent["a"] == [1]
+    
+    value = persistent["a"]
+    value.append(3)
+    persistent["a"] = value  # assigning it back is what stores the change
+    assert persistent["a"] == [1, 3]
+
+
+def test_frozen_string_map_lookup_of_unencodable_key(dictionary):
+    frozen = dictionary.FrozenStringMap({"a": 1, "é": 2})
+    
+    assert "\ud800" not in frozen
+    assert frozen.get("\ud800") is None
+    with pytest.raises(KeyError):
+        frozen["\ud800"]
+    assert (frozen["é"], frozen.get("a")) == (2, 1)
@@ -0,0 +1,102 @@
+import os
+import zlib
+
+import pytest
+
+
+
+### FIXTURES ###
+
+@pytest.fixture
+def factory(lesson):
+    return lesson("Patterns/Factory-ArjanCodes.py")
+
+
+def failingChunks(chunks):
+    yield from chunks
+    raise ConnectionError("lost the connection to the source")
+
+
+### TESTS ###
+
+@pytest.mark.parametrize("stage", ("submit", "encode"))
+def test_orchestrator_removes_partial_output_when_a_stage_fails(factory, tmp_path, stage):
+    chunks = [zlib.compress(bytes(1000))] * 4
+    job = factory.ExportJob(
+        "video",
+        factory.LowQVideoExporter,
+        "video data sample",
+        str(tmp_path / "video.bin"),
+        failingChunks(chunks) if stage == "submit" else chunks + [b"not compressed"],
+        zlib.decompress
+    )
+    
+    with factory.ExportOrchestrator(cpuWorkers=1, ioWorkers=1) as orchestrator:
+        with pytest.raises(ConnectionError if stage == "submit" else zlib.error):
+            orchestrator.run([job])
+    
+    assert not os.path.exists(job.path)
+
+
+def test_streaming_export_ignores_a_checkpoint_from_another_export(factory, tmp_path):
+    exporter = factory.HighQStreamingVideoExporter()
+    output = str(tmp_path / "output.raw")
+    first, second = tmp_path / "first.raw", tmp_path / "second.raw"
+    first.write_bytes(b"a" * 4096)
+    second.write_bytes(b"b" * 4096)
+    
+    def crashHalfway(path):
+        for number, buffer in enumerate(factory.readBuffers(path, 1024)):
+            if number == 2:
+                raise ConnectionError("lost the connection to the source")
+            yield buffer
+    
+    # a crashed export of the first file leaves a checkpoint behind, which a plain export mustn't leave lying around
+    with pytest.raises(ConnectionError):
+        exporter.exportStream(crashHalfway(first), output, checkpointEvery=1024, source=str(first))
+    exporter.exportStream(factory.readBuffers(str(second), 1024), output, source=str(second))
+    assert not os.path.exists(output + ".checkpoint")
+    
+    # and one from a different input isn't resumed from
+    with pytest.raises(ConnectionError):
+        exporter.exportStream(crashHalfway(first), output, checkpointEvery=1024, source=str(first))
+    progress = exporter.exportStream(factory.readBuffers(str(second), 1024), output, resume=True, source=str(second))
+    assert progress.inputBytes == 4096
+    with open(output, "rb") as file:
+        assert file.read() == b"b" * 4096
+
+
+def test_streaming_export_resumes_from_a_checkpoint_of_the_same_input(factory, tmp_path):
+    exporter = factory.HighQStreamingVideoExporter()
+    output, source = str(tmp_path / "output.raw"), tmp_path / "source.raw"
+    source.write_bytes(bytes(range(256)) * 16)
+    
+    def crashHalfway():
+        for number, buffer in enumerate(factory.readBuffers(str(source), 1024)):
+            if number == 2:
+                raise ConnectionError("lost the connection to the source")
+            yield buffer
+    
+    with pytest.raises(ConnectionError):
+        exporter.exportStream(crashHalfway(), output, checkpointEvery=1024, source=str(source))
+    
+    skipped = []
+    def recordSkipped(buffer):
+        skipped.append(len(buffer))
+        return buffer
+    exporter.transform = recordSkipped
+    exporter.exportStream(factory.readBuffers(str(source), 1024), output, resume=True, source=str(source))
+    
+    assert skipped == [1024, 1024]  # the first two buffers came from the checkpoint
+    with open(output, "rb") as file:
+        assert file.read() == source.read_bytes()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="peakMemory() needs fork and the resource module")
+def test_peak_memory_raises_when_the_measured_function_does(factory):
+    def failing():
+        raise ValueError("no such file")
+    
+    with pytest.raises(RuntimeError):
+        factory.peakMemory(failing)
+    assert factory.peakMemory(len, b"") > 0
@@ -0,0 +1,74 @@
+import pytest
+
+
+
+### FIXTURES ###
+
+@pytest.fixture
+def lists(lesson):
+    return lesson("List.py")
+
+
+### TESTS ###
+
+@pytest.mark.parametrize("arguments", ((0,), (0, -1), (3, -1), (4, -3), (0, 2, 100), (5, -100, 100), (4, 100), (0, 0, 0)))
+def test_numeric_list_index_matches_list(lists, arguments):
+    values = [3.0, 4.0, 5.0, 6.0, 0.0]
+    numbers = lists.NumericList(values)
+    numbers.pop(0)
+    numbers.insert(0, 3.0)  # leaves the values at an offset inside the array
+    
+    try:
+        expected = values.index(*arguments)
+    except ValueError:
+        with pytest.raises(ValueError):
+            numbers.index(*arguments)
+    else:
+        assert numbers.index(*arguments) == expected
+
+
+@pytest.mark.parametrize("arguments", ((1,), (1, 1), (1, 2, 3), (1, 3), (1, -2), (2, -1), (2, 0, 3), (1, 2, 1), (0,), (1, -100, 100)))
+def test_sorted_list_index_matches_list(lists, arguments):
+    values = [1, 1, 1, 2]
+    
+    try:
+        expected = values.index(*arguments)
+    except ValueError:
+        with pytest.raises(ValueError):
+            lists.SortedList(values).index(*arguments)
+    else:
+        assert lists.SortedList(values).index(*arguments) == expected
+
+
+@pytest.fixture(params=("array", "numpy"))
+def numericPath(request, lists, monkeypatch):
+    """ Runs a test once on the array.array fallback and once on the NumPy path (skipped without NumPy). """
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        assert lists.np is not None
+    else:
+        monkeypatch.setattr(lists, "np", None)
+    return request.param
+
+
+def test_numeric_list_equality(lists, numericPath):
+    numbers = lists.NumericList([2.0, 3.0])
+    numbers.insert(0, 1.0)  # leaves the values at an offset inside the array
+    
+    assert numbers == lists.NumericList([1, 2, 3], typecode="q")
+    assert numbers == [1.0, 2.0, 3.0]
+    assert numbers == (1, 2, 3)
+    assert numbers != lists.NumericList([1.0, 2.0])
+    assert numbers != [1.0, 2.0, 4.0]
+    assert numbers != {1.0, 2.0, 3.0}
+    assert lists.NumericList() == []
+
+
+def test_numeric_list_methods(lists, numericPath):
+    numbers = lists.NumericList([5.0, 0.0, 3.0, 5.0])
+    numbers.insert(0, 1.0)
+    
+    assert (numbers.min(), numbers.max(), numbers.sum()) == (0.0, 5.0, 14.0)
+    assert (numbers.count(5.0), numbers.count(0.0), numbers.index(5.0, 2)) == (2, 1, 4)
+    numbers.sort(reverse=True)
+    assert numbers == [5.0, 5.0, 3.0, 1.0, 0.0]
@@ -0,0 +1,169 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+
+
+### FIXTURES ###
+
+@pytest.fixture
+def observer(lesson):
+    return lesson("Patterns/Observer.py")
+
+
+### TESTS ###
+
+# Builtins can't be weakly referenced, so they're held strongly instead of failing.
+@pytest.mark.parametrize("makeHandler", (lambda: print, lambda: [].append))
+def test_subscribe_builtin(observer, makeHandler):
+    bus = observer.EventBus()
+    bus.subscribe("a", makeHandler())
+    bus.publish("a", "event")
+    assert bus.subscriptions[0].delivered == 1
+
+
+def test_async_handler_error_does_not_stop_delivery(observer):
+    received = []
+    
+    async def handler(event):
+        if event == 1:
+            raise ValueError(event)
+        received.append(event)
+    
+    async def run():
+        bus = observer.EventBus(observer.DispatchMode.ASYNC)
+        bus.subscribe("a", handler, weak=False)
+        for event in range(4):
+            bus.publish("a", event)
+        await asyncio.wait_for(bus.drain(), timeout=5)
+        await bus.close()
+        return bus.subscriptions[0]
+    
+    subscription = asyncio.run(run())
+    assert received == [0, 2, 3]
+    assert (subscription.delivered, subscription.failed) == (3, 1)
+
+
+def test_sync_handler_error_does_not_skip_other_subscribers(observer):
+    received, batches = [], []
+    
+    def failing(event):
+        raise ValueError(event)
+    
+    bus = observer.EventBus()
+    bus.subscribe("a", failing, weak=False)
+    bus.subscribe("a", received.append)
+    bus.subscribe("a", batches.append, batchSize=2)
+    
+    with pytest.raises(ExceptionGroup) as raised:
+        bus.publish("a", 1)
+    assert [str(error) for error in raised.value.exceptions] == ["1"]
+    
+    with pytest.raises(ExceptionGroup) as raised:
+        bus.publishMany("a", [2, 3, 4])
+    assert [str(error) for error in raised.value.exceptions] == ["2", "3", "4"]
+    
+    assert received == [1, 2, 3, 4]
+    assert batches == [[1, 2], [3, 4]]
+    assert [(subscription.delivered, subscription.failed) for subscription in bus.subscriptions] == [(0, 4), (4, 0), (4, 0)]
+
+
+@pytest.mark.parametrize("value", (memoryview(bytes(range(16))).cast("I"), memoryview(b"abcdef")[::2], b"", bytearray(b"xyz")))
+def test_encode_bytes_counts_bytes_not_items(observer, value):
+    out = bytearray()
+    observer.encodeValue(value, out)
+    assert observer.decodeValue(memoryview(out)) == (memoryview(value).tobytes(), len(out))
+
+
+def connect(path):
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(path)
+    return connection
+
+
+def receiveFrame(observer, connection):
+    header = connection.recv(observer.FRAME_HEADER.size, socket.MSG_WAITALL)
+    length, _, topicLength = observer.FRAME_HEADER.unpack(header)
+    body = connection.recv(length, socket.MSG_WAITALL)
+    return str(body[:topicLength], "utf-8"), observer.decodeValue(body, topicLength)[0]
+
+
+# A frame that's never followed by enough others to fill the buffer still goes out within maxDelay.
+def test_process_publisher_flushes_after_max_delay(observer, tmp_path):
+    path = str(tmp_path / "events.sock")
+    publisher = observer.ProcessPublisher(observer.EventBus(), path, maxDelay=0.01)
+    reader = connect(path)
+    publisher.waitForSubscribers(1)
+    
+    publisher.publish("orders", {"id": 1})
+    reader.settimeout(2)
+    assert receiveFrame(observer, reader) == ("orders", {"id": 1})
+    
+    publisher.close()
+    reader.close()
+
+
+# A subscriber that never reads is cut off once it has been too far behind for sendTimeout, without publish() ever
+# waiting for it, and the others still get every event.
+def test_process_publisher_stuck_subscriber(observer, tmp_path):
+    path = str(tmp_path / "events.sock")
+    publisher = observer.ProcessPublisher(observer.EventBus(), path, flushBytes=1024, maxBacklog=4096, sendTimeout=0.3)
+    stuck = connect(path)
+    reader = connect(path)
+    publisher.waitForSubscribers(2)
+    
+    received = []
+    
+    def receive():
+        while len(header := reader.recv(observer.FRAME_HEADER.size, socket.MSG_WAITALL)) == observer.FRAME_HEADER.size:
+            length, _, topicLength = observer.FRAME_HEADER.unpack(header)
+            received.append(observer.decodeValue(reader.recv(length, socket.MSG_WAITALL), topicLength)[0])
+    
+    receiving = threading.Thread(target=receive)
+    receiving.start()
+    
+    published = 0
+    slowest = 0.0
+    deadline = time.monotonic() + 10
+    while len(publisher.subscribers) > 1 and time.monotonic() < deadline:
+        started = time.monotonic()
+        publisher.publish("numbers", "x" * 50 + str(published))
+        slowest = max(slowest, time.monotonic() - started)
+        published += 1
+        if published % 200 == 0:
+            time.sleep(0.001)
+    
+    assert len(publisher.subscribers) == 1
+    assert slowest < 0.2  # well under sendTimeout: nothing waited for the stuck subscriber
+    publisher.close()
+    receiving.join(timeout=10)
+    assert received == ["x" * 50 + str(number) for number in range(published)]
+    stuck.close()
+    reader.close()
+
+
+# A connection that ends partway through a frame ends the stream, rather than failing to decode half a frame.
+def test_process_subscriber_short_frame(observer, tmp_path):
+    path = str(tmp_path / "events.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    
+    received = []
+    bus = observer.EventBus()
+    bus.subscribe("orders", received.append, weak=False)
+    subscriber = observer.ProcessSubscriber(bus, path)
+    connection, _ = server.accept()
+    
+    frames = bytearray()
+    observer.encodeFrame("orders", {"id": 1}, frames, time.monotonic_ns())
+    observer.encodeFrame("orders", {"id": 2}, frames, time.monotonic_ns())
+    connection.sendall(frames[:-3])
+    connection.close()
+    
+    subscriber.receiveAll()
+    assert received == [{"id": 1}]
+    server.close()
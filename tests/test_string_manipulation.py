@@ -0,0 +1,92 @@
+import pytest
+
+
+
+### FIXTURES ###
+
+@pytest.fixture
+def strings(lesson):
+    return lesson("StringManipulation.py")
+
+
+@pytest.fixture
+def connectors():
+    return ["usb-a ", " USB-C", "Lightning", "usb-a ", "hdmi"] * 3
+
+
+### TESTS ###
+
+def test_pipeline_matches_string_methods(strings, connectors):
+    pipeline = strings.StringPipeline().strip().lower().replace("-", " - ").title().split(" - ", 1)
+    expected = [value.strip().lower().replace("-", " - ").title().split(" - ", 1) for value in connectors]
+    assert pipeline(connectors) == expected
+    assert pipeline.applyToList(connectors) == expected
+    assert strings.StringPipeline()(connectors) == connectors
+
+
+def test_pipeline_rejects_unknown_steps(strings):
+    with pytest.raises(ValueError):
+        strings.StringPipeline([("center", (10,))])
+
+
+def test_pipeline_split_results_are_not_shared(strings, connectors):
+    pipeline = strings.StringPipeline().strip().split("-")
+    first = pipeline(connectors)
+    first[0].append("changed")
+    
+    assert first[3] == ["usb", "a"]  # the same input as first[0]
+    assert pipeline(connectors)[0] == ["usb", "a"]
+
+
+def test_pipeline_numpy(strings, connectors):
+    np = pytest.importorskip("numpy")
+    pipeline = strings.StringPipeline().strip().upper().replace("-", " - ")
+    assert pipeline(np.array(connectors)).tolist() == pipeline.applyToList(connectors)
+    
+    splitting = pipeline.split(" - ")
+    assert pipeline(np.array(connectors)).tolist() == pipeline.applyToList(connectors)
+    assert splitting(np.array(connectors)).tolist() == splitting.applyToList(connectors)
+
+
+def test_pipeline_arrow(strings, connectors):
+    pa = pytest.importorskip("pyarrow")
+    pipeline = strings.StringPipeline().strip().lower().replace("-", " - ").title()
+    assert pipeline(pa.array(connectors)).to_pylist() == pipeline.applyToList(connectors)
+    
+    splitting = pipeline.split(" - ")
+    assert splitting(pa.chunked_array([connectors[:7], connectors[7:]])).to_pylist() == splitting.applyToList(connectors)
+    whitespace = strings.StringPipeline().strip().split()
+    assert whitespace(pa.array(connectors)).to_pylist() == whitespace.applyToList(connectors)
+
+
+@pytest.mark.parametrize("text", ("İSTANBUL, istanbul and İstanbul", "İİİ İstanbul İİ ıstanbul", "STRASSE or Straße"))
+def test_multi_replacer_ignore_case_non_ascii(strings, text):
+    # "İ".lower() and "ß".casefold() are both two characters long
+    replacer = strings.MultiReplacer({"İstanbul": "Constantinople", "straße": "street"}, ignoreCase=True)
+    expected = {
+        "İSTANBUL, istanbul and İstanbul": "Constantinople, Constantinople and Constantinople",
+        "İİİ İstanbul İİ ıstanbul": "İİİ Constantinople İİ Constantinople",  # re counts ı as a case of İ
+        "STRASSE or Straße": "STRASSE or street",
+    }[text]
+    assert replacer.replace(text) == expected
+    
+    for chunkSize in range(1, len(text) + 1):
+        chunks = [text[start:start + chunkSize] for start in range(0, len(text), chunkSize)]
+        assert "".join(replacer.replaceStream(chunks)) == expected
+
+
+def test_multi_replacer_streaming_matches_replace(strings):
+    replacer = strings.MultiReplacer({"USB-A": "USB Type-A", "USB-C": "USB Type-C", "USB": "Universal Serial Bus"})
+    text = "USB-C to USB-A, USB hub, usb-c " * 5
+    for chunkSize in (1, 2, 3, 7, 50):
+        chunks = [text[start:start + chunkSize] for start in range(0, len(text), chunkSize)]
+        assert "".join(replacer.replaceStream(chunks)) == replacer.replace(text)
+
+
+# "ß" and "ss" fold to the same string, but they're different rules, and IGNORECASE only matches "ß" with "ß" or "ẞ".
+def test_multi_replacer_rules_that_fold_the_same(strings):
+    replacer = strings.MultiReplacer({"ß": "X", "ss": "Y"}, ignoreCase=True)
+    assert replacer.replace("ß ss SS ẞ") == "X Y Y X"
+    assert "".join(replacer.replaceStream(["ß s", "s S", "S ẞ"])) == "X Y Y X"
+    
+    assert strings.MultiReplacer({"usb": "a", "USB": "b"}, ignoreCase=True).replace("usb Usb") == "b b"
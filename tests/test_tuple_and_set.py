@@ -0,0 +1,106 @@
+import struct
+
+import pytest
+
+
+
+### FIXTURES ###
+
+@pytest.fixture
+def sets(lesson):
+    return lesson("Tuple and Set.py")
+
+
+### TESTS ###
+
+def test_roaring_set_round_trip_at_the_limit(sets):
+    largest = (1 << 48) - 1
+    roaring = sets.RoaringSet([0, 70_000, largest])
+    assert list(sets.RoaringSet.fromBytes(roaring.toBytes())) == [0, 70_000, largest]
+
+
+@pytest.mark.parametrize("value", (-1, 1 << 48, 1 << 64))
+def test_roaring_set_rejects_out_of_range(sets, value):
+    with pytest.raises(ValueError):
+        sets.RoaringSet([value])
+    with pytest.raises(ValueError):
+        sets.RoaringSet().add(value)
+
+
+def test_cuckoo_filter_merge_that_does_not_fit_changes_nothing(sets):
+    first = sets.CuckooFilter(capacity=100)
+    second = sets.CuckooFilter(capacity=100)
+    first.addMany(f"first-{index}" for index in range(90))
+    second.addMany(f"second-{index}" for index in range(90))
+    before = (bytes(first.data), first.count, first.victim)
+    
+    with pytest.raises(RuntimeError):
+        first.merge(second)
+    
+    assert (bytes(first.data), first.count, first.victim) == before
+    assert all(f"first-{index}" in first for index in range(90))
+
+
+def test_cuckoo_filter_merge(sets):
+    first = sets.CuckooFilter(capacity=100)
+    second = sets.CuckooFilter(capacity=100)
+    first.addMany(f"first-{index}" for index in range(20))
+    second.addMany(f"second-{index}" for index in range(20))
+    
+    first.merge(second)
+    assert len(first) == 40
+    assert all(f"{name}-{index}" in first for name in ("first", "second") for index in range(20))
+
+
+def test_roaring_set_methods_take_any_iterable(sets):
+    roaring = sets.RoaringSet([1, 2, 70_000])
+    
+    union = roaring.union([3], (70_001,))
+    assert isinstance(union, sets.RoaringSet) and set(union) == {1, 2, 3, 70_000, 70_001}
+    assert set(roaring.intersection([2, 70_000, -1, "a"], {2, 5})) == {2}
+    assert set(roaring.difference([1], range(70_000, 70_002))) == {2}
+    assert set(roaring.union()) == {1, 2, 70_000} and roaring.union() is not roaring
+    assert set(roaring) == {1, 2, 70_000}  # none of them changed it
+
+
+def test_roaring_set_operators_with_other_sets(sets):
+    roaring = sets.RoaringSet([1, 2, 70_000])
+    
+    assert set(roaring | {3}) == {1, 2, 3, 70_000}
+    assert set({3} | roaring) == {1, 2, 3, 70_000}
+    assert set(roaring & {2, "a"}) == {2}
+    assert set(roaring - {1}) == {2, 70_000}
+    assert set({1, 5} - roaring) == {5}
+    assert roaring | sets.RoaringSet([3]) == sets.RoaringSet([1, 2, 3, 70_000])
+    assert "a" not in roaring
+    assert set(roaring | [3]) == {1, 2, 3, 70_000}  # the Set mixin's operators take any iterable
+
+
+def test_record_views_are_not_hashable(sets):
+    schema = sets.RecordSchema("Point", {"x": "q", "y": "q"})
+    table = sets.RecordTable.fromRecords(schema, [(1, 2), (3, 4)])
+    view = table[0]
+    
+    with pytest.raises(TypeError):
+        hash(view)
+    assert view.moveTo(1) == (3, 4)
+    assert {view.totuple()} == {(3, 4)}
+
+
+def test_shared_record_table_frees_its_memory_when_packing_fails(sets, monkeypatch):
+    created = []
+    
+    class RecordingSharedMemory(sets.shared_memory.SharedMemory):
+        def __init__(self, *arguments, **options):
+            super().__init__(*arguments, **options)
+            created.append(self.name)
+    
+    monkeypatch.setattr(sets.shared_memory, "SharedMemory", RecordingSharedMemory)
+    schema = sets.RecordSchema("Point", {"x": "q", "y": "q"})
+    
+    with pytest.raises(struct.error):
+        sets.RecordTable.fromRecords(schema, [(1, 2), (3, "four")], shared=True)
+    
+    monkeypatch.undo()
+    with pytest.raises(FileNotFoundError):
+        sets.shared_memory.SharedMemory(name=created[0])